@@ -0,0 +1,22 @@
+-- Migration : Emplacement du document brut archivé pour company_filings
+-- Date : 2026-10-16
+-- Description : Les workers parser-13f et parser-company-filing archivent chaque document EDGAR
+--               téléchargé (archive adressée par contenu, S3 ou local). fund_filings.raw_storage_path
+--               existe déjà; on ajoute la même colonne à company_filings.
+--               Cette migration est idempotente et peut être exécutée même si la colonne existe déjà
+
+DO $$ 
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.columns 
+    WHERE table_schema = 'public'
+    AND table_name = 'company_filings' 
+    AND column_name = 'raw_storage_path'
+  ) THEN
+    ALTER TABLE company_filings ADD COLUMN raw_storage_path TEXT; -- s3://... ou file://... (objects/<aa>/<sha256>.z)
+    
+    RAISE NOTICE 'Column raw_storage_path added to company_filings';
+  ELSE
+    RAISE NOTICE 'Column raw_storage_path already exists in company_filings';
+  END IF;
+END $$;
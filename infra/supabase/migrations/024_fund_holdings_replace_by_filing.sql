@@ -0,0 +1,124 @@
+-- Migration : Chargement des holdings 13F par remplacement, par filing
+-- Date : 2026-10-16
+-- Description : Un retry du parser 13F ré-insérait tous les holdings du filing (doublons qui gonflent
+--               les agrégats). On supprime les copies prouvées d'un retry, on agrège les autres lignes
+--               d'une même clé, on pose une clé unique (filing_id, cusip, type) et on expose une RPC
+--               qui remplace les holdings d'un filing en une transaction.
+--               Cette migration est idempotente
+
+-- 1. Supprimer les copies d'un filing inséré plusieurs fois en entier par des retries
+-- L'ancien parser postait les holdings un par un, dans l'ordre du document: un retry
+-- ré-insère la même séquence. Seule une séquence répétée à l'identique (même rang,
+-- mêmes valeurs), dont chaque copie commence au moins une minute après la fin de la
+-- précédente (délai minimal d'un retry Lambda asynchrone), est traitée comme un retry.
+-- Des lignes égales d'un même run (même CUSIP sous plusieurs gestionnaires ou
+-- discrétions, mêmes montants) ne sont jamais supprimées: l'étape 2 les agrège.
+WITH ordered AS (
+  SELECT id, filing_id, cusip, type, shares, market_value, created_at,
+         ROW_NUMBER() OVER (PARTITION BY filing_id ORDER BY id) - 1 AS pos,
+         COUNT(*) OVER (PARTITION BY filing_id) AS total
+  FROM fund_holdings
+  WHERE filing_id IS NOT NULL
+),
+-- Taille candidate d'une insertion: première réapparition de la première ligne du filing
+copy_size AS (
+  SELECT o.filing_id, MIN(o.pos) AS size, MIN(o.total) AS total
+  FROM ordered o
+  JOIN ordered f ON f.filing_id = o.filing_id AND f.pos = 0
+  WHERE o.pos > 0
+    AND (o.cusip, o.type, o.shares, o.market_value) IS NOT DISTINCT FROM (f.cusip, f.type, f.shares, f.market_value)
+  GROUP BY o.filing_id
+),
+retried AS (
+  SELECT c.filing_id, c.size
+  FROM copy_size c
+  WHERE c.total % c.size = 0
+    -- Chaque ligne égale à la ligne de même rang de la première insertion
+    AND NOT EXISTS (
+      SELECT 1
+      FROM ordered o
+      JOIN ordered f ON f.filing_id = o.filing_id AND f.pos = o.pos % c.size
+      WHERE o.filing_id = c.filing_id
+        AND o.pos >= c.size
+        AND (o.cusip, o.type, o.shares, o.market_value) IS DISTINCT FROM (f.cusip, f.type, f.shares, f.market_value)
+    )
+    -- Chaque copie insérée par un run ultérieur
+    AND NOT EXISTS (
+      SELECT 1
+      FROM ordered o
+      JOIN ordered p ON p.filing_id = o.filing_id AND p.pos = o.pos - 1
+      WHERE o.filing_id = c.filing_id
+        AND o.pos > 0
+        AND o.pos % c.size = 0
+        AND (o.created_at IS NULL OR p.created_at IS NULL OR o.created_at < p.created_at + INTERVAL '1 minute')
+    )
+)
+DELETE FROM fund_holdings h
+USING ordered o, retried r
+WHERE h.id = o.id
+  AND o.filing_id = r.filing_id
+  AND o.pos >= r.size;
+
+-- 2. Agréger les lignes restantes d'une même clé (une ligne par gestionnaire/discrétion dans le 13F)
+WITH grouped AS (
+  SELECT MIN(id) AS keep_id,
+         filing_id, cusip, type,
+         SUM(shares)::BIGINT AS shares,
+         SUM(market_value)::BIGINT AS market_value
+  FROM fund_holdings
+  WHERE filing_id IS NOT NULL
+  GROUP BY filing_id, cusip, type
+  HAVING COUNT(*) > 1
+),
+updated AS (
+  UPDATE fund_holdings h
+  SET shares = g.shares, market_value = g.market_value
+  FROM grouped g
+  WHERE h.id = g.keep_id
+  RETURNING g.keep_id, g.filing_id, g.cusip, g.type
+)
+DELETE FROM fund_holdings h
+USING updated u
+WHERE h.filing_id = u.filing_id
+  AND h.cusip IS NOT DISTINCT FROM u.cusip
+  AND h.type IS NOT DISTINCT FROM u.type
+  AND h.id <> u.keep_id;
+
+-- 3. Clé d'upsert
+CREATE UNIQUE INDEX IF NOT EXISTS idx_fund_holdings_filing_cusip_type
+  ON fund_holdings(filing_id, cusip, type);
+
+-- 4. Remplacer tous les holdings d'un filing depuis un seul payload JSON
+-- p_holdings: [{"ticker", "cusip", "shares", "market_value", "type"}, ...]
+-- Les lignes d'une même clé (cusip, type) sont agrégées. Retourne le nombre de lignes stockées.
+CREATE OR REPLACE FUNCTION replace_fund_holdings(
+  p_filing_id INTEGER,
+  p_fund_id INTEGER,
+  p_cik TEXT,
+  p_holdings JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+  stored_count INTEGER;
+BEGIN
+  DELETE FROM fund_holdings WHERE filing_id = p_filing_id;
+
+  INSERT INTO fund_holdings (fund_id, filing_id, cik, ticker, cusip, shares, market_value, type)
+  SELECT p_fund_id, p_filing_id, p_cik,
+         MIN(r.ticker), r.cusip,
+         SUM(r.shares)::BIGINT, SUM(r.market_value)::BIGINT, r.type
+  FROM jsonb_to_recordset(COALESCE(p_holdings, '[]'::jsonb))
+       AS r(ticker TEXT, cusip TEXT, shares BIGINT, market_value BIGINT, type TEXT)
+  GROUP BY r.cusip, r.type
+  -- Deux retries concurrents: le second écrase le premier au lieu d'échouer
+  ON CONFLICT (filing_id, cusip, type) DO UPDATE
+  SET ticker = EXCLUDED.ticker,
+      shares = EXCLUDED.shares,
+      market_value = EXCLUDED.market_value,
+      fund_id = EXCLUDED.fund_id,
+      cik = EXCLUDED.cik;
+
+  GET DIAGNOSTICS stored_count = ROW_COUNT;
+  RETURN stored_count;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,26 @@
+-- Migration : Clé (cusip, type) pour fund_holdings_diff
+-- Date : 2026-10-16
+-- Description : Le parser 13F calcule les diffs entre un filing et le précédent du même fund par
+--               merge join sur (cusip, type) juste après le parsing. On stocke la clé complète
+--               (le ticker seul est ambigu: options, classes d'actions) et on indexe filing_id_new
+--               (les diffs d'un filing sont remplacés à chaque reparse).
+--               Cette migration est idempotente
+
+ALTER TABLE fund_holdings_diff ADD COLUMN IF NOT EXISTS cusip TEXT;
+ALTER TABLE fund_holdings_diff ADD COLUMN IF NOT EXISTS type TEXT;
+
+DO $$ 
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.constraint_column_usage
+    WHERE table_schema = 'public'
+    AND table_name = 'fund_holdings_diff'
+    AND constraint_name = 'fund_holdings_diff_type_check'
+  ) THEN
+    ALTER TABLE fund_holdings_diff
+      ADD CONSTRAINT fund_holdings_diff_type_check CHECK (type IN ('stock', 'call', 'put'));
+  END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_fund_holdings_diff_filing_id_new ON fund_holdings_diff(filing_id_new);
+CREATE INDEX IF NOT EXISTS idx_fund_holdings_diff_cusip ON fund_holdings_diff(cusip);
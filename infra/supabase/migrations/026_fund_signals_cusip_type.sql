@@ -0,0 +1,12 @@
+-- Migration : Clé (cusip, type) et index par filing pour fund_signals
+-- Date : 2026-10-16
+-- Description : scripts/score-fund-signals.py calcule impact_score pour chaque changement de position
+--               (tier_influence x poids en portefeuille x taille du mouvement) et remplace les signaux
+--               d'un filing en masse. On stocke la clé complète de la position et on indexe filing_id.
+--               Cette migration est idempotente
+
+ALTER TABLE fund_signals ADD COLUMN IF NOT EXISTS cusip TEXT;
+ALTER TABLE fund_signals ADD COLUMN IF NOT EXISTS type TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_fund_signals_filing_id ON fund_signals(filing_id);
+CREATE INDEX IF NOT EXISTS idx_fund_signals_fund_id ON fund_signals(fund_id);
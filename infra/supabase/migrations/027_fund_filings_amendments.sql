@@ -0,0 +1,100 @@
+-- Migration : Application incrémentale des amendements 13F-HR/A
+-- Date : 2026-10-16
+-- Description : Le parser 13F lit le type d'amendement sur la cover page (primary_doc.xml):
+--               - RESTATEMENT: remplace atomiquement les holdings du 13F-HR original
+--               - NEW HOLDINGS: ajoute uniquement le delta aux holdings de l'original
+--               L'amendement appliqué ne garde pas de holdings propres: un seul jeu effectif
+--               par (fund, période), exposé par fund_filings_effective / fund_holdings_effective.
+--               Cette migration est idempotente
+
+-- 1. Traçabilité de l'amendement
+ALTER TABLE fund_filings ADD COLUMN IF NOT EXISTS amends_filing_id INTEGER REFERENCES fund_filings(id);
+ALTER TABLE fund_filings ADD COLUMN IF NOT EXISTS amendment_type TEXT;
+ALTER TABLE fund_filings ADD COLUMN IF NOT EXISTS amendment_applied_at TIMESTAMPTZ;
+
+DO $$ 
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM information_schema.constraint_column_usage
+    WHERE table_schema = 'public'
+    AND table_name = 'fund_filings'
+    AND constraint_name = 'fund_filings_amendment_type_check'
+  ) THEN
+    ALTER TABLE fund_filings
+      ADD CONSTRAINT fund_filings_amendment_type_check CHECK (amendment_type IN ('RESTATEMENT', 'NEW HOLDINGS'));
+  END IF;
+END $$;
+
+-- Recherche de l'original et du filing précédent par (fund, période)
+CREATE INDEX IF NOT EXISTS idx_fund_filings_fund_period ON fund_filings(fund_id, period_of_report);
+
+-- 2. Appliquer un amendement aux holdings de l'original, en une transaction
+-- p_holdings: même format que replace_fund_holdings. Retourne le nombre de lignes écrites.
+CREATE OR REPLACE FUNCTION apply_fund_holdings_amendment(
+  p_original_filing_id INTEGER,
+  p_amendment_filing_id INTEGER,
+  p_amendment_type TEXT,
+  p_fund_id INTEGER,
+  p_cik TEXT,
+  p_holdings JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+  applied_at TIMESTAMPTZ;
+  stored_count INTEGER := 0;
+BEGIN
+  -- Verrou sur l'amendement: deux retries concurrents s'exécutent l'un après l'autre
+  SELECT amendment_applied_at INTO applied_at
+  FROM fund_filings WHERE id = p_amendment_filing_id
+  FOR UPDATE;
+
+  IF p_amendment_type = 'RESTATEMENT' THEN
+    stored_count := replace_fund_holdings(p_original_filing_id, p_fund_id, p_cik, p_holdings);
+  ELSIF p_amendment_type = 'NEW HOLDINGS' THEN
+    -- Le delta ne doit être ajouté qu'une fois
+    IF applied_at IS NOT NULL THEN
+      RETURN 0;
+    END IF;
+
+    INSERT INTO fund_holdings (fund_id, filing_id, cik, ticker, cusip, shares, market_value, type)
+    SELECT p_fund_id, p_original_filing_id, p_cik,
+           MIN(r.ticker), r.cusip,
+           SUM(r.shares)::BIGINT, SUM(r.market_value)::BIGINT, r.type
+    FROM jsonb_to_recordset(COALESCE(p_holdings, '[]'::jsonb))
+         AS r(ticker TEXT, cusip TEXT, shares BIGINT, market_value BIGINT, type TEXT)
+    GROUP BY r.cusip, r.type
+    ON CONFLICT (filing_id, cusip, type) DO UPDATE
+    SET shares = fund_holdings.shares + EXCLUDED.shares,
+        market_value = fund_holdings.market_value + EXCLUDED.market_value;
+
+    GET DIAGNOSTICS stored_count = ROW_COUNT;
+  ELSE
+    RAISE EXCEPTION 'Unknown amendment type: %', p_amendment_type;
+  END IF;
+
+  -- L'amendement n'a plus de holdings propres (ex: stocké seul avant l'arrivée de l'original)
+  DELETE FROM fund_holdings WHERE filing_id = p_amendment_filing_id;
+
+  UPDATE fund_filings
+  SET amends_filing_id = p_original_filing_id,
+      amendment_type = p_amendment_type,
+      amendment_applied_at = NOW()
+  WHERE id = p_amendment_filing_id;
+
+  RETURN stored_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 3. Un filing effectif par (fund, période): amendements appliqués exclus, puis le plus récent
+CREATE OR REPLACE VIEW fund_filings_effective AS
+SELECT DISTINCT ON (fund_id, COALESCE(period_of_report, filing_date))
+       id, fund_id, cik, accession_number, form_type, filing_date, period_of_report
+FROM fund_filings
+WHERE status = 'PARSED'
+  AND amendment_applied_at IS NULL
+ORDER BY fund_id, COALESCE(period_of_report, filing_date), filing_date DESC, id DESC;
+
+CREATE OR REPLACE VIEW fund_holdings_effective AS
+SELECT h.*, f.period_of_report
+FROM fund_filings_effective f
+JOIN fund_holdings h ON h.filing_id = f.id;
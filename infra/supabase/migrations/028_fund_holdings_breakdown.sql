@@ -0,0 +1,108 @@
+-- Migration : Détail ligne à ligne des holdings 13F agrégés par (cusip, type)
+-- Date : 2026-10-16
+-- Description : Un 13F répète un CUSIP par discrétion d'investissement / autre gestionnaire.
+--               Le parser agrège ces lignes avant écriture (HOLDINGS_COLLAPSE) et garde le détail
+--               dans fund_holdings.breakdown: [[discretion, other_manager, shares, market_value], ...]
+--               (NULL quand la clé n'a qu'une ligne source). Les RPC d'écriture propagent la colonne.
+--               Cette migration est idempotente
+
+-- 1. Colonne de détail
+ALTER TABLE fund_holdings ADD COLUMN IF NOT EXISTS breakdown JSONB;
+
+-- 2. Remplacement par filing, avec breakdown
+-- p_holdings: [{"ticker", "cusip", "shares", "market_value", "type", "breakdown"?}, ...]
+CREATE OR REPLACE FUNCTION replace_fund_holdings(
+  p_filing_id INTEGER,
+  p_fund_id INTEGER,
+  p_cik TEXT,
+  p_holdings JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+  stored_count INTEGER;
+BEGIN
+  DELETE FROM fund_holdings WHERE filing_id = p_filing_id;
+
+  INSERT INTO fund_holdings (fund_id, filing_id, cik, ticker, cusip, shares, market_value, type, breakdown)
+  SELECT p_fund_id, p_filing_id, p_cik,
+         MIN(r.ticker), r.cusip,
+         SUM(r.shares)::BIGINT, SUM(r.market_value)::BIGINT, r.type,
+         (ARRAY_AGG(r.breakdown) FILTER (WHERE r.breakdown IS NOT NULL))[1]
+  FROM jsonb_to_recordset(COALESCE(p_holdings, '[]'::jsonb))
+       AS r(ticker TEXT, cusip TEXT, shares BIGINT, market_value BIGINT, type TEXT, breakdown JSONB)
+  GROUP BY r.cusip, r.type
+  -- Deux retries concurrents: le second écrase le premier au lieu d'échouer
+  ON CONFLICT (filing_id, cusip, type) DO UPDATE
+  SET ticker = EXCLUDED.ticker,
+      shares = EXCLUDED.shares,
+      market_value = EXCLUDED.market_value,
+      breakdown = EXCLUDED.breakdown,
+      fund_id = EXCLUDED.fund_id,
+      cik = EXCLUDED.cik;
+
+  GET DIAGNOSTICS stored_count = ROW_COUNT;
+  RETURN stored_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 3. Amendements: NEW HOLDINGS concatène le détail de l'original et celui du delta
+CREATE OR REPLACE FUNCTION apply_fund_holdings_amendment(
+  p_original_filing_id INTEGER,
+  p_amendment_filing_id INTEGER,
+  p_amendment_type TEXT,
+  p_fund_id INTEGER,
+  p_cik TEXT,
+  p_holdings JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+  applied_at TIMESTAMPTZ;
+  stored_count INTEGER := 0;
+BEGIN
+  -- Verrou sur l'amendement: deux retries concurrents s'exécutent l'un après l'autre
+  SELECT amendment_applied_at INTO applied_at
+  FROM fund_filings WHERE id = p_amendment_filing_id
+  FOR UPDATE;
+
+  IF p_amendment_type = 'RESTATEMENT' THEN
+    stored_count := replace_fund_holdings(p_original_filing_id, p_fund_id, p_cik, p_holdings);
+  ELSIF p_amendment_type = 'NEW HOLDINGS' THEN
+    -- Le delta ne doit être ajouté qu'une fois
+    IF applied_at IS NOT NULL THEN
+      RETURN 0;
+    END IF;
+
+    INSERT INTO fund_holdings (fund_id, filing_id, cik, ticker, cusip, shares, market_value, type, breakdown)
+    SELECT p_fund_id, p_original_filing_id, p_cik,
+           MIN(r.ticker), r.cusip,
+           SUM(r.shares)::BIGINT, SUM(r.market_value)::BIGINT, r.type,
+           (ARRAY_AGG(r.breakdown) FILTER (WHERE r.breakdown IS NOT NULL))[1]
+    FROM jsonb_to_recordset(COALESCE(p_holdings, '[]'::jsonb))
+         AS r(ticker TEXT, cusip TEXT, shares BIGINT, market_value BIGINT, type TEXT, breakdown JSONB)
+    GROUP BY r.cusip, r.type
+    ON CONFLICT (filing_id, cusip, type) DO UPDATE
+    SET shares = fund_holdings.shares + EXCLUDED.shares,
+        market_value = fund_holdings.market_value + EXCLUDED.market_value,
+        -- Une ligne sans détail devient une entrée de détail à part entière
+        breakdown = COALESCE(fund_holdings.breakdown,
+                             jsonb_build_array(jsonb_build_array('', '', fund_holdings.shares, fund_holdings.market_value)))
+                 || COALESCE(EXCLUDED.breakdown,
+                             jsonb_build_array(jsonb_build_array('', '', EXCLUDED.shares, EXCLUDED.market_value)));
+
+    GET DIAGNOSTICS stored_count = ROW_COUNT;
+  ELSE
+    RAISE EXCEPTION 'Unknown amendment type: %', p_amendment_type;
+  END IF;
+
+  -- L'amendement n'a plus de holdings propres (ex: stocké seul avant l'arrivée de l'original)
+  DELETE FROM fund_holdings WHERE filing_id = p_amendment_filing_id;
+
+  UPDATE fund_filings
+  SET amends_filing_id = p_original_filing_id,
+      amendment_type = p_amendment_type,
+      amendment_applied_at = NOW()
+  WHERE id = p_amendment_filing_id;
+
+  RETURN stored_count;
+END;
+$$ LANGUAGE plpgsql;
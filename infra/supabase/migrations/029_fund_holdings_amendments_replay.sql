@@ -0,0 +1,238 @@
+-- Migration : Amendements 13F-HR/A rejouables après réécriture de l'original
+-- Date : 2026-10-16
+-- Description : Réécrire les holdings d'un original (reparse, retry du handler) effaçait les lignes
+--               apportées par ses amendements appliqués, qui n'étaient jamais réappliqués. Le payload
+--               de chaque amendement est désormais conservé (fund_filings.amendment_holdings) et rejoué
+--               dans l'ordre de dépôt à chaque réécriture de l'original. Un amendement parsé avant son
+--               original reste en attente, puis est rattaché à l'écriture de l'original. Un NEW HOLDINGS
+--               en attente n'est qu'un delta: il est exclu du jeu effectif.
+--               Cette migration est idempotente
+
+-- 1. Payload de l'amendement (même format que p_holdings), pour le rejouer
+ALTER TABLE fund_filings ADD COLUMN IF NOT EXISTS amendment_holdings JSONB;
+
+CREATE INDEX IF NOT EXISTS idx_fund_filings_amends_filing_id ON fund_filings(amends_filing_id);
+
+-- 2. Ajouter le delta d'un NEW HOLDINGS aux holdings d'un filing (détail concaténé)
+CREATE OR REPLACE FUNCTION add_fund_holdings_delta(
+  p_filing_id INTEGER,
+  p_fund_id INTEGER,
+  p_cik TEXT,
+  p_holdings JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+  stored_count INTEGER;
+BEGIN
+  INSERT INTO fund_holdings (fund_id, filing_id, cik, ticker, cusip, shares, market_value, type, breakdown)
+  SELECT p_fund_id, p_filing_id, p_cik,
+         MIN(r.ticker), r.cusip,
+         SUM(r.shares)::BIGINT, SUM(r.market_value)::BIGINT, r.type,
+         (ARRAY_AGG(r.breakdown) FILTER (WHERE r.breakdown IS NOT NULL))[1]
+  FROM jsonb_to_recordset(COALESCE(p_holdings, '[]'::jsonb))
+       AS r(ticker TEXT, cusip TEXT, shares BIGINT, market_value BIGINT, type TEXT, breakdown JSONB)
+  GROUP BY r.cusip, r.type
+  ON CONFLICT (filing_id, cusip, type) DO UPDATE
+  SET shares = fund_holdings.shares + EXCLUDED.shares,
+      market_value = fund_holdings.market_value + EXCLUDED.market_value,
+      -- Une ligne sans détail devient une entrée de détail à part entière
+      breakdown = COALESCE(fund_holdings.breakdown,
+                           jsonb_build_array(jsonb_build_array('', '', fund_holdings.shares, fund_holdings.market_value)))
+               || COALESCE(EXCLUDED.breakdown,
+                           jsonb_build_array(jsonb_build_array('', '', EXCLUDED.shares, EXCLUDED.market_value)));
+
+  GET DIAGNOSTICS stored_count = ROW_COUNT;
+  RETURN stored_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 3. Rejouer les amendements d'un original dont les holdings propres viennent d'être écrits
+-- Les amendements en attente de la même période (parsés avant l'original) y sont d'abord
+-- rattachés. Puis, dans l'ordre de dépôt: le dernier RESTATEMENT remplace le jeu, les
+-- NEW HOLDINGS déposés après lui ajoutent leur delta. Retourne le nombre d'amendements rejoués.
+CREATE OR REPLACE FUNCTION replay_fund_holdings_amendments(
+  p_original_filing_id INTEGER,
+  p_fund_id INTEGER,
+  p_cik TEXT
+)
+RETURNS INTEGER AS $$
+DECLARE
+  original fund_filings%ROWTYPE;
+  restatement fund_filings%ROWTYPE;
+  amendment fund_filings%ROWTYPE;
+  replayed INTEGER := 0;
+BEGIN
+  -- Verrou sur l'original: réécriture et application d'un amendement s'exécutent l'une après l'autre
+  SELECT * INTO original FROM fund_filings WHERE id = p_original_filing_id FOR UPDATE;
+  IF NOT FOUND OR original.form_type IS DISTINCT FROM '13F-HR' THEN
+    RETURN 0;
+  END IF;
+
+  -- Même règle que find_original_filing: l'original est le premier 13F-HR PARSED de la période
+  IF original.period_of_report IS NOT NULL AND NOT EXISTS (
+    SELECT 1 FROM fund_filings o
+    WHERE o.fund_id = original.fund_id
+      AND o.period_of_report = original.period_of_report
+      AND o.form_type = '13F-HR'
+      AND o.status = 'PARSED'
+      AND (o.filing_date, o.id) < (original.filing_date, original.id)
+  ) THEN
+    UPDATE fund_filings
+    SET amends_filing_id = p_original_filing_id,
+        amendment_applied_at = NOW()
+    WHERE fund_id = original.fund_id
+      AND period_of_report = original.period_of_report
+      AND id <> p_original_filing_id
+      AND amendment_applied_at IS NULL
+      AND amendment_type IS NOT NULL
+      AND amendment_holdings IS NOT NULL;
+
+    -- Un amendement appliqué n'a plus de holdings propres, ni de diff propre
+    DELETE FROM fund_holdings h
+    USING fund_filings a
+    WHERE h.filing_id = a.id
+      AND a.amends_filing_id = p_original_filing_id;
+
+    DELETE FROM fund_holdings_diff d
+    USING fund_filings a
+    WHERE d.filing_id_new = a.id
+      AND a.amends_filing_id = p_original_filing_id;
+  END IF;
+
+  IF EXISTS (
+    SELECT 1 FROM fund_filings
+    WHERE amends_filing_id = p_original_filing_id
+      AND amendment_applied_at IS NOT NULL
+      AND amendment_holdings IS NULL
+  ) THEN
+    RAISE WARNING 'Filing %: amendements appliqués avant la migration 029 sans payload, à reparser',
+      p_original_filing_id;
+  END IF;
+
+  SELECT * INTO restatement FROM fund_filings
+  WHERE amends_filing_id = p_original_filing_id
+    AND amendment_applied_at IS NOT NULL
+    AND amendment_type = 'RESTATEMENT'
+    AND amendment_holdings IS NOT NULL
+  ORDER BY filing_date DESC, id DESC
+  LIMIT 1;
+
+  IF restatement.id IS NOT NULL THEN
+    PERFORM replace_fund_holdings(p_original_filing_id, p_fund_id, p_cik, restatement.amendment_holdings);
+    replayed := 1;
+  END IF;
+
+  FOR amendment IN
+    SELECT * FROM fund_filings
+    WHERE amends_filing_id = p_original_filing_id
+      AND amendment_applied_at IS NOT NULL
+      AND amendment_type = 'NEW HOLDINGS'
+      AND amendment_holdings IS NOT NULL
+      AND (restatement.id IS NULL OR (filing_date, id) > (restatement.filing_date, restatement.id))
+    ORDER BY filing_date, id
+  LOOP
+    PERFORM add_fund_holdings_delta(p_original_filing_id, p_fund_id, p_cik, amendment.amendment_holdings);
+    replayed := replayed + 1;
+  END LOOP;
+
+  RETURN replayed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 4. Écrire les holdings propres d'un filing, puis rejouer ses amendements, en une transaction
+-- Retourne {"stored": lignes du jeu effectif, "amendments": amendements rejoués}
+CREATE OR REPLACE FUNCTION replace_original_fund_holdings(
+  p_filing_id INTEGER,
+  p_fund_id INTEGER,
+  p_cik TEXT,
+  p_holdings JSONB
+)
+RETURNS JSONB AS $$
+DECLARE
+  stored_count INTEGER;
+  replayed INTEGER;
+BEGIN
+  stored_count := replace_fund_holdings(p_filing_id, p_fund_id, p_cik, p_holdings);
+  replayed := replay_fund_holdings_amendments(p_filing_id, p_fund_id, p_cik);
+  IF replayed > 0 THEN
+    SELECT COUNT(*) INTO stored_count FROM fund_holdings WHERE filing_id = p_filing_id;
+  END IF;
+  RETURN jsonb_build_object('stored', stored_count, 'amendments', replayed);
+END;
+$$ LANGUAGE plpgsql;
+
+-- 5. Appliquer un amendement (payload conservé), ou le mettre en attente sans original connu
+-- p_original_filing_id NULL: holdings propres écrits, rattaché à l'écriture de l'original.
+-- RESTATEMENT: jeu rejoué depuis le dernier RESTATEMENT. NEW HOLDINGS: delta ajouté une seule
+-- fois, sauf si un RESTATEMENT déposé après lui est déjà appliqué.
+CREATE OR REPLACE FUNCTION apply_fund_holdings_amendment(
+  p_original_filing_id INTEGER,
+  p_amendment_filing_id INTEGER,
+  p_amendment_type TEXT,
+  p_fund_id INTEGER,
+  p_cik TEXT,
+  p_holdings JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+  amendment fund_filings%ROWTYPE;
+  stored_count INTEGER := 0;
+BEGIN
+  IF p_amendment_type IS NULL OR p_amendment_type NOT IN ('RESTATEMENT', 'NEW HOLDINGS') THEN
+    RAISE EXCEPTION 'Unknown amendment type: %', p_amendment_type;
+  END IF;
+
+  IF p_original_filing_id IS NULL THEN
+    UPDATE fund_filings
+    SET amendment_type = p_amendment_type,
+        amendment_holdings = p_holdings
+    WHERE id = p_amendment_filing_id
+      AND amendment_applied_at IS NULL;
+    IF NOT FOUND THEN
+      RETURN 0;
+    END IF;
+    RETURN replace_fund_holdings(p_amendment_filing_id, p_fund_id, p_cik, p_holdings);
+  END IF;
+
+  -- Verrous: original puis amendement (même ordre que replay_fund_holdings_amendments)
+  PERFORM 1 FROM fund_filings WHERE id = p_original_filing_id FOR UPDATE;
+  SELECT * INTO amendment FROM fund_filings WHERE id = p_amendment_filing_id FOR UPDATE;
+
+  UPDATE fund_filings
+  SET amends_filing_id = p_original_filing_id,
+      amendment_type = p_amendment_type,
+      amendment_holdings = p_holdings,
+      amendment_applied_at = COALESCE(amendment_applied_at, NOW())
+  WHERE id = p_amendment_filing_id;
+
+  -- L'amendement n'a plus de holdings ni de diff propres (ex: RESTATEMENT stocké en attente
+  -- avant l'arrivée de l'original)
+  DELETE FROM fund_holdings WHERE filing_id = p_amendment_filing_id;
+  DELETE FROM fund_holdings_diff WHERE filing_id_new = p_amendment_filing_id;
+
+  IF p_amendment_type = 'RESTATEMENT' THEN
+    PERFORM replay_fund_holdings_amendments(p_original_filing_id, p_fund_id, p_cik);
+    SELECT COUNT(*) INTO stored_count FROM fund_holdings WHERE filing_id = p_original_filing_id;
+  ELSIF amendment.amendment_applied_at IS NULL AND NOT EXISTS (
+    SELECT 1 FROM fund_filings r
+    WHERE r.amends_filing_id = p_original_filing_id
+      AND r.amendment_applied_at IS NOT NULL
+      AND r.amendment_type = 'RESTATEMENT'
+      AND (r.filing_date, r.id) > (amendment.filing_date, amendment.id)
+  ) THEN
+    stored_count := add_fund_holdings_delta(p_original_filing_id, p_fund_id, p_cik, p_holdings);
+  END IF;
+
+  RETURN stored_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 6. Jeu effectif: un NEW HOLDINGS en attente (delta sans original) n'est pas un jeu complet
+CREATE OR REPLACE VIEW fund_filings_effective AS
+SELECT DISTINCT ON (fund_id, COALESCE(period_of_report, filing_date))
+       id, fund_id, cik, accession_number, form_type, filing_date, period_of_report
+FROM fund_filings
+WHERE status = 'PARSED'
+  AND amendment_applied_at IS NULL
+  AND amendment_type IS DISTINCT FROM 'NEW HOLDINGS'
+ORDER BY fund_id, COALESCE(period_of_report, filing_date), filing_date DESC, id DESC;
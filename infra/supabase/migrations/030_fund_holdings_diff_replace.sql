@@ -0,0 +1,65 @@
+-- Migration : Diff des holdings 13F remplacé en une transaction
+-- Date : 2026-10-16
+-- Description : Le parser 13F supprimait le diff d'un filing puis le réinsérait par chunks: un échec
+--               entre les deux laissait le filing sans diff, ou avec un diff partiel. Une RPC remplace
+--               désormais le diff d'un filing en une transaction. Elle n'écrit rien si le filing précédent
+--               a changé entre la lecture et l'écriture (filings d'un même fund parsés en parallèle):
+--               le parser recalcule alors le diff.
+--               Cette migration est idempotente
+
+-- Remplacer le diff d'un filing depuis un seul payload JSON
+-- p_diffs: [{"ticker", "cusip", "type", "diff_shares", "diff_value", "diff_pct_shares", "action"}, ...]
+-- Retourne le nombre de lignes écrites, ou NULL si p_filing_id_old n'est plus le filing précédent.
+CREATE OR REPLACE FUNCTION replace_fund_holdings_diff(
+  p_filing_id_new INTEGER,
+  p_fund_id INTEGER,
+  p_filing_id_old INTEGER,
+  p_diffs JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+  current_filing fund_filings%ROWTYPE;
+  previous_id INTEGER;
+  stored_count INTEGER;
+BEGIN
+  -- Verrou sur le filing: deux calculs concurrents de son diff s'écrivent l'un après l'autre
+  SELECT * INTO current_filing FROM fund_filings WHERE id = p_filing_id_new FOR UPDATE;
+  IF NOT FOUND THEN
+    RETURN NULL;
+  END IF;
+
+  -- Même règle que previous_filing_params (parser-13f): période de report, sinon date de dépôt,
+  -- amendements appliqués et NEW HOLDINGS en attente exclus
+  SELECT p.id INTO previous_id
+  FROM fund_filings p
+  WHERE p.fund_id = p_fund_id
+    AND p.status = 'PARSED'
+    AND p.id <> p_filing_id_new
+    AND p.amendment_applied_at IS NULL
+    AND p.amendment_type IS DISTINCT FROM 'NEW HOLDINGS'
+    AND CASE WHEN current_filing.period_of_report IS NOT NULL
+             THEN p.period_of_report < current_filing.period_of_report
+             ELSE p.filing_date < current_filing.filing_date
+        END
+  ORDER BY CASE WHEN current_filing.period_of_report IS NOT NULL THEN p.period_of_report END DESC,
+           p.filing_date DESC, p.id DESC
+  LIMIT 1;
+
+  IF previous_id IS DISTINCT FROM p_filing_id_old THEN
+    RETURN NULL;
+  END IF;
+
+  DELETE FROM fund_holdings_diff WHERE filing_id_new = p_filing_id_new;
+
+  INSERT INTO fund_holdings_diff (fund_id, filing_id_new, filing_id_old, ticker, cusip, type,
+                                  diff_shares, diff_value, diff_pct_shares, action)
+  SELECT p_fund_id, p_filing_id_new, p_filing_id_old, r.ticker, r.cusip, r.type,
+         r.diff_shares, r.diff_value, r.diff_pct_shares, r.action
+  FROM jsonb_to_recordset(COALESCE(p_diffs, '[]'::jsonb))
+       AS r(ticker TEXT, cusip TEXT, type TEXT, diff_shares BIGINT, diff_value BIGINT,
+            diff_pct_shares NUMERIC, action TEXT);
+
+  GET DIAGNOSTICS stored_count = ROW_COUNT;
+  RETURN stored_count;
+END;
+$$ LANGUAGE plpgsql;
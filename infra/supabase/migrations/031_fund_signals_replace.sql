@@ -0,0 +1,33 @@
+-- Migration : Signaux 13F remplacés en une transaction
+-- Date : 2026-10-16
+-- Description : scripts/score-fund-signals.py supprimait les signaux d'un lot de filings puis les
+--               réinsérait par chunks: un échec entre les deux laissait les filings sans signaux, ou
+--               avec des signaux partiels. Une RPC remplace désormais les signaux du lot en une
+--               transaction.
+--               Cette migration est idempotente
+
+-- Remplacer les signaux d'un lot de filings depuis un seul payload JSON
+-- p_signals: [{"fund_id", "filing_id", "ticker", "cusip", "type", "action", "impact_score"}, ...]
+-- Retourne le nombre de signaux écrits.
+CREATE OR REPLACE FUNCTION replace_fund_signals(
+  p_filing_ids INTEGER[],
+  p_signals JSONB
+)
+RETURNS INTEGER AS $$
+DECLARE
+  stored_count INTEGER;
+BEGIN
+  DELETE FROM fund_signals WHERE filing_id = ANY(p_filing_ids);
+
+  INSERT INTO fund_signals (fund_id, filing_id, ticker, cusip, type, action, impact_score)
+  SELECT r.fund_id, r.filing_id, r.ticker, r.cusip, r.type, r.action, r.impact_score
+  FROM jsonb_to_recordset(COALESCE(p_signals, '[]'::jsonb))
+       AS r(fund_id INTEGER, filing_id INTEGER, ticker TEXT, cusip TEXT, type TEXT, action TEXT,
+            impact_score NUMERIC)
+  -- Un signal hors du lot n'est jamais écrit (il ne serait pas remplacé au prochain run)
+  WHERE r.filing_id = ANY(p_filing_ids);
+
+  GET DIAGNOSTICS stored_count = ROW_COUNT;
+  RETURN stored_count;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,52 @@
+# Archive brute des documents EDGAR (adressée par contenu, partagée par les parsers)
+# Layout: objects/<aa>/<sha256>.z (zlib + dictionnaire 13F), refs/<aa>/<sha256(url)>
+
+resource "aws_s3_bucket" "edgar_archive" {
+  bucket = "${var.project}-${var.stage}-edgar-archive"
+}
+
+resource "aws_s3_bucket_public_access_block" "edgar_archive" {
+  bucket                  = aws_s3_bucket.edgar_archive.id
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+# Lecture/écriture de l'archive pour les parsers
+data "aws_iam_policy_document" "edgar_archive_access" {
+  statement {
+    actions = [
+      "s3:GetObject",
+      "s3:PutObject",
+    ]
+    resources = [
+      "${aws_s3_bucket.edgar_archive.arn}/*",
+    ]
+  }
+
+  statement {
+    # ListBucket: HeadObject renvoie 404 (et non 403) pour un objet absent
+    actions = [
+      "s3:ListBucket",
+    ]
+    resources = [
+      aws_s3_bucket.edgar_archive.arn,
+    ]
+  }
+}
+
+resource "aws_iam_policy" "edgar_archive_access" {
+  name   = "${var.project}-${var.stage}-edgar-archive-access"
+  policy = data.aws_iam_policy_document.edgar_archive_access.json
+}
+
+resource "aws_iam_role_policy_attachment" "parser_13f_edgar_archive" {
+  role       = aws_iam_role.parser_13f_role.name
+  policy_arn = aws_iam_policy.edgar_archive_access.arn
+}
+
+resource "aws_iam_role_policy_attachment" "parser_company_filing_edgar_archive" {
+  role       = aws_iam_role.parser_company_filing_role.name
+  policy_arn = aws_iam_policy.edgar_archive_access.arn
+}
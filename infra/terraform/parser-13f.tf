@@ -22,6 +22,8 @@ resource "aws_lambda_function" "parser_13f" {
     variables = {
       SUPABASE_URL        = var.supabase_url
       SUPABASE_SERVICE_KEY = var.supabase_service_key
+      RAW_ARCHIVE_URI     = "s3://${aws_s3_bucket.edgar_archive.bucket}"
+      PARSER_13F_PIPELINE = "sync"
     }
   }
 }
@@ -22,6 +22,7 @@ resource "aws_lambda_function" "parser_company_filing" {
     variables = {
       SUPABASE_URL        = var.supabase_url
       SUPABASE_SERVICE_KEY = var.supabase_service_key
+      RAW_ARCHIVE_URI     = "s3://${aws_s3_bucket.edgar_archive.bucket}"
     }
   }
 }
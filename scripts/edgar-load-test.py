@@ -0,0 +1,1047 @@
+#!/usr/bin/env python3
+"""
+Harness de charge local pour les handlers parser-13f et parser-company-filing
+Deux serveurs HTTP locaux remplacent sec.gov et Supabase:
+- EDGAR: répertoires d'accession synthétiques (index.json, -index.htm, listing,
+  primary_doc.xml, information table, 8-K, Form 4) ou enregistrés (--fixtures,
+  arborescence Archives/edgar/data/<cik>/<accession>/... servie telle quelle)
+- PostgREST: tables en mémoire (fund_filings, fund_holdings, fund_holdings_diff,
+  company_filings, company_events, insider_trades, earnings_alerts, ...), filtres
+  eq/neq/lt/lte/gt/gte/in/is/isdistinct, order/limit/offset, corps gzip, RPC des holdings 13F
+  (replace_fund_holdings, replace_original_fund_holdings et rejeu des amendements,
+  apply_fund_holdings_amendment, replace_fund_holdings_diff)
+Latence et erreurs injectables des deux côtés. Les handlers sont importés depuis
+workers/*/src (SEC_BASE_URL et SUPABASE_URL pointent vers les serveurs locaux) et
+reçoivent des events EventBridge en parallèle. Rapport: latences p50/p90/p99 par
+worker, codes de retour, requêtes EDGAR / PostgREST par filing (attribuées par
+accession, id / filing_id; les requêtes sans filing identifiable, comme la
+recherche du filing précédent d'un fund, sont comptées à part).
+
+Usage:
+  python3 scripts/edgar-load-test.py --events 2000 --concurrency 16
+  python3 scripts/edgar-load-test.py --mix 13f=1 --holdings 5000 --db-latency-ms 20
+  python3 scripts/edgar-load-test.py --sec-error-rate 0.02 --sec-error-status 429
+  python3 scripts/edgar-load-test.py --fixtures ./edgar-fixtures --events 500
+  python3 scripts/edgar-load-test.py --batch-size 10 --concurrency 4
+  python3 scripts/edgar-load-test.py --amendments --pipeline async
+
+--amendments rejoue des scénarios 13F-HR/A (amendement parsé avant l'original,
+original réécrit après un RESTATEMENT, NEW HOLDINGS après un RESTATEMENT) et
+vérifie le jeu effectif de l'original et les diffs; code de sortie 1 en cas d'écart.
+"""
+
+import argparse
+import contextlib
+import gzip
+import importlib.util
+import io
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+ROOT_DIR = Path(__file__).parent.parent
+WORKER_13F_DIR = ROOT_DIR / "workers" / "parser-13f"
+WORKER_COMPANY_DIR = ROOT_DIR / "workers" / "parser-company-filing"
+
+ACCESSION_PATH = re.compile(r"^/Archives/edgar/data/(\d+)/(\d{18})(?:/|$)")
+FILING_ID_FILTERS = ("id", "filing_id", "filing_id_new")
+FILING_ID_FIELDS = ("filing_id", "p_filing_id", "p_amendment_filing_id", "p_filing_id_new")
+EMULATED_RPCS = ("replace_fund_holdings", "replace_original_fund_holdings", "apply_fund_holdings_amendment",
+                 "replace_fund_holdings_diff")
+
+# Les ids des filings company sont décalés pour que l'attribution par id reste non ambiguë
+COMPANY_FILING_ID_OFFSET = 1_000_000
+
+
+# ─── Métriques par filing ────────────────────────────────────────────────
+
+class RequestLog:
+    """Compteurs de requêtes par filing (EDGAR / PostgREST) et par statut"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.accessions = {}
+        self.per_filing = defaultdict(Counter)
+        self.statuses = Counter()
+
+    def record(self, side: str, filing_id, status: int):
+        with self.lock:
+            self.per_filing[filing_id][side] += 1
+            self.statuses[(side, status)] += 1
+
+
+# ─── Emulation PostgREST ─────────────────────────────────────────────────
+
+def _coerce(value: str, sample):
+    if isinstance(sample, bool):
+        return value.lower() == "true"
+    if isinstance(sample, int):
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    if isinstance(sample, float):
+        return float(value)
+    return value
+
+
+def _matches(row: dict, column: str, expression: str) -> bool:
+    operator, _, operand = expression.partition(".")
+    value = row.get(column)
+    if operator == "is":
+        return (value is None) if operand == "null" else (value is not None)
+    if operator == "in":
+        items = [item.strip().strip('"') for item in operand.strip("()").split(",") if item.strip()]
+        return value is not None and value in [_coerce(item, value) for item in items]
+    if operator == "isdistinct":
+        return value is None or value != _coerce(operand, value)
+    if value is None:
+        return operator == "neq"
+    operand = _coerce(operand, value)
+    if operator == "eq":
+        return value == operand
+    if operator == "neq":
+        return value != operand
+    if operator == "lt":
+        return value < operand
+    if operator == "lte":
+        return value <= operand
+    if operator == "gt":
+        return value > operand
+    if operator == "gte":
+        return value >= operand
+    raise ValueError(f"Opérateur PostgREST non émulé: {operator}")
+
+
+def _order_key(row: dict, column: str):
+    value = row.get(column)
+    return (value is None, value if value is not None else 0)
+
+
+class PostgrestStore:
+    """Tables en mémoire, sémantique PostgREST minimale utilisée par les workers"""
+
+    def __init__(self):
+        # Réentrant: une RPC émulée enchaîne select / delete / insert sous le même verrou
+        self.lock = threading.RLock()
+        self.tables = defaultdict(list)
+        self.next_id = defaultdict(lambda: 1)
+
+    def insert(self, table: str, rows: list) -> list:
+        with self.lock:
+            stored = []
+            for row in rows:
+                row = dict(row)
+                if "id" not in row:
+                    row["id"] = self.next_id[table]
+                self.next_id[table] = max(self.next_id[table], row["id"] + 1)
+                self.tables[table].append(row)
+                stored.append(row)
+            return stored
+
+    def select(self, table: str, params: list) -> list:
+        filters, options = self._split(params)
+        with self.lock:
+            rows = [row for row in self.tables.get(table, []) if self._keep(row, filters)]
+        for clause in reversed(options.get("order", "").split(",") if options.get("order") else []):
+            column, _, direction = clause.partition(".")
+            rows.sort(key=lambda row: _order_key(row, column), reverse=direction.startswith("desc"))
+        offset = int(options.get("offset", 0))
+        limit = options.get("limit")
+        rows = rows[offset:offset + int(limit)] if limit is not None else rows[offset:]
+        columns = [c for c in options.get("select", "*").split(",") if c and "(" not in c]
+        if columns and "*" not in columns:
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+        return [dict(row) for row in rows]
+
+    def update(self, table: str, params: list, data: dict) -> list:
+        filters, _ = self._split(params)
+        with self.lock:
+            updated = []
+            for row in self.tables.get(table, []):
+                if self._keep(row, filters):
+                    row.update({k: v for k, v in data.items()})
+                    updated.append(dict(row))
+            return updated
+
+    def delete(self, table: str, params: list) -> int:
+        filters, _ = self._split(params)
+        with self.lock:
+            rows = self.tables.get(table, [])
+            kept = [row for row in rows if not self._keep(row, filters)]
+            self.tables[table] = kept
+            return len(rows) - len(kept)
+
+    @staticmethod
+    def _group_holdings(args: dict, filing_id) -> list:
+        """Lignes fund_holdings de p_holdings, agrégées par (cusip, type)"""
+        grouped = {}
+        for record in args.get("p_holdings") or []:
+            key = (record.get("cusip"), record.get("type"))
+            row = grouped.get(key)
+            if row is None:
+                grouped[key] = {
+                    "fund_id": args.get("p_fund_id"), "filing_id": filing_id,
+                    "cik": args.get("p_cik"), "ticker": record.get("ticker"), "cusip": key[0], "type": key[1],
+                    "shares": record.get("shares") or 0, "market_value": record.get("market_value") or 0,
+                    "breakdown": record.get("breakdown"),
+                }
+            else:
+                row["shares"] += record.get("shares") or 0
+                row["market_value"] += record.get("market_value") or 0
+        return list(grouped.values())
+
+    def _filing(self, filing_id):
+        return next((row for row in self.tables["fund_filings"] if row["id"] == filing_id), None)
+
+    def replace_fund_holdings(self, args: dict) -> int:
+        """Equivalent de la RPC replace_fund_holdings (migrations 024 / 028)"""
+        rows = self._group_holdings(args, args.get("p_filing_id"))
+        with self.lock:
+            self.delete("fund_holdings", [("filing_id", f"eq.{args.get('p_filing_id')}")])
+            self.insert("fund_holdings", rows)
+        return len(rows)
+
+    def add_fund_holdings_delta(self, args: dict) -> int:
+        """Equivalent de add_fund_holdings_delta (migration 029): delta ajouté, détail concaténé"""
+        filing_id = args.get("p_filing_id")
+        with self.lock:
+            existing = {(row["cusip"], row["type"]): row for row in self.tables["fund_holdings"]
+                        if row["filing_id"] == filing_id}
+            grouped = self._group_holdings(args, filing_id)
+            added = []
+            for row in grouped:
+                current = existing.get((row["cusip"], row["type"]))
+                if current is None:
+                    added.append(row)
+                    continue
+                current["breakdown"] = ((current.get("breakdown") or [["", "", current["shares"], current["market_value"]]])
+                                        + (row.get("breakdown") or [["", "", row["shares"], row["market_value"]]]))
+                current["shares"] += row["shares"]
+                current["market_value"] += row["market_value"]
+            self.insert("fund_holdings", added)
+            return len(grouped)
+
+    def _drop_own_rows(self, filing_ids: set):
+        """Un amendement appliqué n'a plus de holdings ni de diff propres"""
+        for table, column in (("fund_holdings", "filing_id"), ("fund_holdings_diff", "filing_id_new")):
+            self.tables[table] = [row for row in self.tables[table] if row.get(column) not in filing_ids]
+
+    def replay_fund_holdings_amendments(self, original_id, fund_id, cik) -> int:
+        """Equivalent de replay_fund_holdings_amendments (migration 029)"""
+        def filed(row):
+            return (row.get("filing_date") or "", row["id"])
+
+        with self.lock:
+            original = self._filing(original_id)
+            if original is None or original.get("form_type") != "13F-HR":
+                return 0
+            filings = self.tables["fund_filings"]
+            period = original.get("period_of_report")
+            if period and not any(
+                row["fund_id"] == original["fund_id"] and row.get("period_of_report") == period
+                and row.get("form_type") == "13F-HR" and row.get("status") == "PARSED" and filed(row) < filed(original)
+                for row in filings
+            ):
+                for row in filings:
+                    if (row["fund_id"] == original["fund_id"] and row.get("period_of_report") == period
+                            and row["id"] != original_id and row.get("amendment_applied_at") is None
+                            and row.get("amendment_type") and row.get("amendment_holdings") is not None):
+                        row.update({"amends_filing_id": original_id, "amendment_applied_at": time.time()})
+                self._drop_own_rows({row["id"] for row in filings if row.get("amends_filing_id") == original_id})
+
+            applied = sorted((row for row in filings if row.get("amends_filing_id") == original_id
+                              and row.get("amendment_applied_at") and row.get("amendment_holdings") is not None),
+                             key=filed)
+            restatements = [row for row in applied if row.get("amendment_type") == "RESTATEMENT"]
+            restatement = restatements[-1] if restatements else None
+            args = {"p_filing_id": original_id, "p_fund_id": fund_id, "p_cik": cik}
+            replayed = 0
+            if restatement is not None:
+                self.replace_fund_holdings({**args, "p_holdings": restatement["amendment_holdings"]})
+                replayed = 1
+            for row in applied:
+                if row.get("amendment_type") == "NEW HOLDINGS" and (restatement is None or filed(row) > filed(restatement)):
+                    self.add_fund_holdings_delta({**args, "p_holdings": row["amendment_holdings"]})
+                    replayed += 1
+            return replayed
+
+    def replace_original_fund_holdings(self, args: dict) -> dict:
+        """Equivalent de la RPC replace_original_fund_holdings (migration 029)"""
+        with self.lock:
+            stored = self.replace_fund_holdings(args)
+            replayed = self.replay_fund_holdings_amendments(args.get("p_filing_id"), args.get("p_fund_id"),
+                                                            args.get("p_cik"))
+            if replayed:
+                stored = sum(1 for row in self.tables["fund_holdings"] if row["filing_id"] == args.get("p_filing_id"))
+            return {"stored": stored, "amendments": replayed}
+
+    def apply_fund_holdings_amendment(self, args: dict) -> int:
+        """Equivalent de la RPC apply_fund_holdings_amendment (migration 029)"""
+        amendment_type = args.get("p_amendment_type")
+        if amendment_type not in ("RESTATEMENT", "NEW HOLDINGS"):
+            raise ValueError(f"Unknown amendment type: {amendment_type}")
+        original_id = args.get("p_original_filing_id")
+        holdings_args = {"p_fund_id": args.get("p_fund_id"), "p_cik": args.get("p_cik"),
+                         "p_holdings": args.get("p_holdings")}
+        with self.lock:
+            amendment = self._filing(args.get("p_amendment_filing_id"))
+            if amendment is None:
+                return 0
+            if original_id is None:
+                if amendment.get("amendment_applied_at") is not None:
+                    return 0
+                amendment.update({"amendment_type": amendment_type, "amendment_holdings": args.get("p_holdings")})
+                return self.replace_fund_holdings({**holdings_args, "p_filing_id": amendment["id"]})
+
+            was_applied = amendment.get("amendment_applied_at") is not None
+            amendment.update({"amends_filing_id": original_id, "amendment_type": amendment_type,
+                              "amendment_holdings": args.get("p_holdings"),
+                              "amendment_applied_at": amendment.get("amendment_applied_at") or time.time()})
+            self._drop_own_rows({amendment["id"]})
+
+            filed = (amendment.get("filing_date") or "", amendment["id"])
+            if amendment_type == "RESTATEMENT":
+                self.replay_fund_holdings_amendments(original_id, args.get("p_fund_id"), args.get("p_cik"))
+                return sum(1 for row in self.tables["fund_holdings"] if row["filing_id"] == original_id)
+            if not was_applied and not any(
+                row.get("amends_filing_id") == original_id and row.get("amendment_applied_at")
+                and row.get("amendment_type") == "RESTATEMENT" and (row.get("filing_date") or "", row["id"]) > filed
+                for row in self.tables["fund_filings"]
+            ):
+                return self.add_fund_holdings_delta({**holdings_args, "p_filing_id": original_id})
+            return 0
+
+    def replace_fund_holdings_diff(self, args: dict):
+        """Equivalent de la RPC replace_fund_holdings_diff (migration 030): None si le précédent a changé"""
+        filing_id = args.get("p_filing_id_new")
+        with self.lock:
+            current = next((row for row in self.tables["fund_filings"] if row["id"] == filing_id), None)
+            if current is None:
+                return None
+            params = [("fund_id", f"eq.{args.get('p_fund_id')}"), ("status", "eq.PARSED"), ("id", f"neq.{filing_id}"),
+                      ("amendment_applied_at", "is.null"), ("amendment_type", "isdistinct.NEW HOLDINGS"), ("limit", "1")]
+            if current.get("period_of_report"):
+                params += [("period_of_report", f"lt.{current['period_of_report']}"),
+                           ("order", "period_of_report.desc,filing_date.desc,id.desc")]
+            else:
+                params += [("filing_date", f"lt.{current.get('filing_date')}"), ("order", "filing_date.desc,id.desc")]
+            previous = self.select("fund_filings", params)
+            if (previous[0]["id"] if previous else None) != args.get("p_filing_id_old"):
+                return None
+            self.delete("fund_holdings_diff", [("filing_id_new", f"eq.{filing_id}")])
+            rows = [{**row, "fund_id": args.get("p_fund_id"), "filing_id_new": filing_id,
+                     "filing_id_old": args.get("p_filing_id_old")} for row in args.get("p_diffs") or []]
+            self.insert("fund_holdings_diff", rows)
+            return len(rows)
+
+    @staticmethod
+    def _split(params: list):
+        filters, options = [], {}
+        for key, value in params:
+            if key in ("select", "order", "limit", "offset"):
+                options[key] = value
+            else:
+                filters.append((key, value))
+        return filters, options
+
+    @staticmethod
+    def _keep(row: dict, filters: list) -> bool:
+        return all(_matches(row, column, expression) for column, expression in filters)
+
+
+# ─── Contenu EDGAR synthétique ───────────────────────────────────────────
+
+INFO_TABLE_NS = "http://www.sec.gov/edgar/document/thirteenf/informationtable"
+
+
+def accession_for(cik: int, sequence: int) -> str:
+    return f"{cik:010d}-25-{sequence:06d}"
+
+
+def build_info_table(rows: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>', f'<informationTable xmlns="{INFO_TABLE_NS}">']
+    for i in range(rows):
+        # ~5% de CUSIP répétés (autre gestionnaire), comme dans les vrais 13F
+        cusip = f"{rng.randrange(rows if i % 20 == 0 else 10 ** 8):09d}"
+        parts.append(
+            f"<infoTable><nameOfIssuer>ISSUER {cusip} CORP</nameOfIssuer><titleOfClass>COM</titleOfClass>"
+            f"<cusip>{cusip}</cusip><value>{rng.randrange(1, 10 ** 6)}</value>"
+            f"<shrsOrPrnAmt><sshPrnamt>{rng.randrange(1, 10 ** 7)}</sshPrnamt><sshPrnamtType>SH</sshPrnamtType></shrsOrPrnAmt>"
+            f"<investmentDiscretion>{'SOLE' if i % 3 else 'DFND'}</investmentDiscretion>"
+            f"<otherManager>{i % 4 or ''}</otherManager>"
+            f"<votingAuthority><Sole>0</Sole><Shared>0</Shared><None>0</None></votingAuthority></infoTable>"
+        )
+    parts.append("</informationTable>")
+    return "\n".join(parts).encode("utf-8")
+
+
+def build_primary_doc(period: str, amendment_type: str = None) -> bytes:
+    amendment = (f"<isAmendment>true</isAmendment><amendmentInfo><amendmentType>{amendment_type}"
+                 f"</amendmentType></amendmentInfo>") if amendment_type else "<isAmendment>false</isAmendment>"
+    return (f'<?xml version="1.0" encoding="UTF-8"?><edgarSubmission><headerData><submissionType>'
+            f'{"13F-HR/A" if amendment_type else "13F-HR"}</submissionType></headerData><formData><coverPage>'
+            f'<reportCalendarOrQuarter>{period}</reportCalendarOrQuarter>{amendment}</coverPage></formData>'
+            f'</edgarSubmission>').encode("utf-8")
+
+
+def build_positions_table(positions: dict) -> bytes:
+    """Information table d'un portefeuille {cusip: shares} (une ligne par CUSIP, value = shares x 10)"""
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>', f'<informationTable xmlns="{INFO_TABLE_NS}">']
+    for cusip, shares in sorted(positions.items()):
+        parts.append(
+            f"<infoTable><nameOfIssuer>ISSUER {cusip} CORP</nameOfIssuer><titleOfClass>COM</titleOfClass>"
+            f"<cusip>{cusip}</cusip><value>{shares * 10}</value>"
+            f"<shrsOrPrnAmt><sshPrnamt>{shares}</sshPrnamt><sshPrnamtType>SH</sshPrnamtType></shrsOrPrnAmt>"
+            f"<investmentDiscretion>SOLE</investmentDiscretion></infoTable>"
+        )
+    parts.append("</informationTable>")
+    return "\n".join(parts).encode("utf-8")
+
+
+def build_8k(company: str) -> bytes:
+    return (f"<html><body><p>{company} - FORM 8-K - CURRENT REPORT</p>"
+            f"<p>Item 2.02 - Results of Operations and Financial Condition</p>"
+            f"<p>On October 1, 2025, {company} announced revenue of $12.5 billion and diluted EPS of $1.23.</p>"
+            f"<p>Item 9.01 - Financial Statements and Exhibits</p><p>Exhibit 99.1 Press release.</p>"
+            f"</body></html>").encode("utf-8")
+
+
+def build_form4(seed: int) -> bytes:
+    rng = random.Random(seed)
+    rows = "".join(
+        f"<tr><td>10/0{day}/2025</td><td>{rng.choice('PSA')}</td><td>{rng.randrange(100, 50000)}</td>"
+        f"<td>${rng.uniform(10, 500):.2f}</td></tr>"
+        for day in range(1, 4)
+    )
+    return (f"<html><body><table><tr><th>Transaction Date</th><th>Transaction Code</th><th>Shares</th>"
+            f"<th>Price</th></tr>{rows}</table></body></html>").encode("utf-8")
+
+
+def build_listing(base_path: str, documents: dict) -> tuple:
+    """index.json et listing HTML d'un répertoire d'accession"""
+    names = sorted(path.rsplit("/", 1)[-1] for path in documents if path.startswith(base_path + "/"))
+    items = [{"name": name, "type": "text.gif", "size": str(len(documents[f"{base_path}/{name}"][0]))}
+             for name in names]
+    listing = json.dumps({"directory": {"name": base_path, "item": items}}).encode("utf-8")
+    links = "".join(f'<tr><td><a href="{base_path}/{name}">{name}</a></td></tr>' for name in names)
+    page = f"<html><body><table>{links}</table></body></html>".encode("utf-8")
+    return listing, page
+
+
+class EdgarSite:
+    """Documents servis par le faux sec.gov: chemin → (contenu, content-type)"""
+
+    def __init__(self, fixtures_dir=None):
+        self.documents = {}
+        self.fixtures_dir = Path(fixtures_dir) if fixtures_dir else None
+
+    def add(self, path: str, content: bytes, content_type: str):
+        self.documents[path] = (content, content_type)
+
+    def add_directory(self, base_path: str, index_page_rows: str = ""):
+        listing, page = build_listing(base_path, self.documents)
+        self.add(f"{base_path}/index.json", listing, "application/json")
+        self.add(f"{base_path}/", page, "text/html")
+        if index_page_rows:
+            accession = base_path.rsplit("/", 1)[-1]
+            dashed = f"{accession[:10]}-{accession[10:12]}-{accession[12:]}"
+            self.add(f"{base_path}/{dashed}-index.htm",
+                     f"<html><body><table>{index_page_rows}</table></body></html>".encode("utf-8"), "text/html")
+
+    def get(self, path: str):
+        path = unquote(path)
+        if self.fixtures_dir is not None:
+            candidate = (self.fixtures_dir / path.lstrip("/")).resolve()
+            if str(candidate).startswith(str(self.fixtures_dir.resolve())) and candidate.is_file():
+                content_type = "application/xml" if candidate.suffix == ".xml" else "text/html"
+                if candidate.suffix == ".json":
+                    content_type = "application/json"
+                return candidate.read_bytes(), content_type
+        return self.documents.get(path)
+
+
+# ─── Serveurs HTTP ───────────────────────────────────────────────────────
+
+class FaultInjector:
+    """Latence (moyenne + gigue uniforme) et taux d'erreur d'un côté du harness"""
+
+    def __init__(self, latency_ms: float, jitter_ms: float, error_rate: float, error_status: int):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    def apply(self):
+        """Attendre la latence injectée; retourne un statut d'erreur à renvoyer ou None"""
+        delay = self.latency_ms + random.uniform(0, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if self.error_rate and random.random() < self.error_rate:
+            return self.error_status
+        return None
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status: int, body: bytes = b"", content_type: str = "application/json", head=False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and not head:
+            self.wfile.write(body)
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if self.headers.get("Content-Encoding", "").lower() == "gzip":
+            body = gzip.decompress(body)
+        return body
+
+
+def make_edgar_handler(site: EdgarSite, faults: FaultInjector, log: RequestLog):
+    class EdgarHandler(QuietHandler):
+        def do_GET(self):
+            self.serve(head=False)
+
+        def do_HEAD(self):
+            self.serve(head=True)
+
+        def serve(self, head: bool):
+            path = urlsplit(self.path).path
+            match = ACCESSION_PATH.match(path)
+            filing_id = log.accessions.get(match.group(2)) if match else None
+            status = faults.apply()
+            if status is None:
+                document = site.get(path)
+                status = 200 if document is not None else 404
+            log.record("edgar", filing_id, status)
+            if status != 200:
+                return self.send_body(status, b"<html><body>Error</body></html>", "text/html", head)
+            content, content_type = document
+            self.send_body(200, content, content_type, head)
+
+    return EdgarHandler
+
+
+def make_postgrest_handler(store: PostgrestStore, faults: FaultInjector, log: RequestLog):
+    class PostgrestHandler(QuietHandler):
+        def do_GET(self):
+            self.dispatch("GET")
+
+        def do_POST(self):
+            self.dispatch("POST")
+
+        def do_PATCH(self):
+            self.dispatch("PATCH")
+
+        def do_DELETE(self):
+            self.dispatch("DELETE")
+
+        def dispatch(self, method: str):
+            url = urlsplit(self.path)
+            params = parse_qsl(url.query, keep_blank_values=True)
+            body = self.read_body() if method in ("POST", "PATCH") else b""
+            payload = json.loads(body) if body else None
+            filing_id = self.filing_id(params, payload)
+
+            status = faults.apply()
+            if status is not None:
+                log.record("postgrest", filing_id, status)
+                return self.send_body(status, json.dumps({"message": "injected error"}).encode("utf-8"))
+
+            table = url.path.rsplit("/", 1)[-1]
+            returning = "return=representation" in (self.headers.get("Prefer") or "")
+            try:
+                if url.path.startswith("/rest/v1/rpc/"):
+                    if table not in EMULATED_RPCS:
+                        status, result = 404, {"message": f"function {table} not emulated"}
+                    else:
+                        status, result = 200, getattr(store, table)(payload or {})
+                elif method == "GET":
+                    status, result = 200, store.select(table, params)
+                elif method == "POST":
+                    rows = store.insert(table, payload if isinstance(payload, list) else [payload])
+                    status, result = 201, rows if returning else None
+                elif method == "PATCH":
+                    rows = store.update(table, params, payload or {})
+                    status, result = 200, rows if returning else None
+                else:
+                    store.delete(table, params)
+                    status, result = 204, None
+            except Exception as e:
+                status, result = 400, {"message": str(e)}
+            log.record("postgrest", filing_id, status)
+            self.send_body(status, json.dumps(result).encode("utf-8") if result is not None else b"")
+
+        @staticmethod
+        def filing_id(params: list, payload):
+            for key, value in params:
+                if key in FILING_ID_FILTERS and value.startswith("eq."):
+                    try:
+                        return int(value[3:])
+                    except ValueError:
+                        return None
+                if key == "accession_number" and value.startswith("eq."):
+                    return log.accessions.get(value[3:].replace("-", ""))
+            rows = payload if isinstance(payload, list) else [payload] if isinstance(payload, dict) else []
+            for row in rows[:1]:
+                for field in FILING_ID_FIELDS:
+                    if row.get(field) is not None:
+                        return row[field]
+            return None
+
+    return PostgrestHandler
+
+
+def start_server(handler_class) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ─── Scénario ────────────────────────────────────────────────────────────
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        if kind.strip() not in ("13f", "8k", "form4"):
+            raise ValueError(f"Type d'event inconnu: {kind}")
+        weights[kind.strip()] = float(weight or 1)
+    return weights
+
+
+def eventbridge_event(detail_type: str, source: str, detail: dict) -> dict:
+    return {
+        "version": "0",
+        "id": f"load-{detail.get('filing_id')}-{random.getrandbits(32):08x}",
+        "detail-type": detail_type,
+        "source": source,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "detail": detail,
+    }
+
+
+def build_synthetic_filings(count: int, mix: dict, holdings: int, site: EdgarSite, store: PostgrestStore,
+                            log: RequestLog, sec_base_url: str) -> list:
+    """Filings synthétiques: documents EDGAR, lignes fund_filings / company_filings, events"""
+    rng = random.Random(13)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    filings = []
+    fund_count = max(1, count // 4)
+    for sequence in range(1, count + 1):
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "13f":
+            fund_id = rng.randrange(1, fund_count + 1)
+            cik = 1_000_000 + fund_id
+            filing_id = sequence
+        else:
+            company_id = rng.randrange(1, fund_count + 1)
+            cik = 2_000_000 + company_id
+            filing_id = COMPANY_FILING_ID_OFFSET + sequence
+        accession = accession_for(cik, sequence)
+        accession_path = accession.replace("-", "")
+        base_path = f"/Archives/edgar/data/{cik}/{accession_path}"
+        log.accessions[accession_path] = filing_id
+
+        if kind == "13f":
+            quarter = rng.choice(("03-31-2025", "06-30-2025", "09-30-2025"))
+            site.add(f"{base_path}/primary_doc.xml", build_primary_doc(quarter), "application/xml")
+            site.add(f"{base_path}/infotable.xml", build_info_table(holdings, sequence), "application/xml")
+            site.add_directory(base_path, (
+                f'<tr><td>1</td><td><a href="{base_path}/primary_doc.xml">primary_doc.xml</a></td><td>13F-HR</td></tr>'
+                f'<tr><td>2</td><td><a href="{base_path}/infotable.xml">infotable.xml</a></td>'
+                f'<td>INFORMATION TABLE</td></tr>'
+            ))
+            store.insert("fund_filings", [{
+                "id": filing_id, "fund_id": fund_id, "cik": f"{cik:010d}", "accession_number": accession,
+                "form_type": "13F-HR", "filing_date": f"2025-{rng.randrange(1, 12):02d}-15", "status": "DISCOVERED",
+            }])
+            filings.append(eventbridge_event("13F Discovered", "adel.signals", {
+                "fund_id": fund_id, "cik": f"{cik:010d}", "accession_number": accession,
+                "filing_url": f"{sec_base_url}{base_path}/{accession}-index.htm",
+                "filing_id": filing_id, "form_type": "13F-HR",
+            }))
+            continue
+
+        if kind == "8k":
+            document = f"{base_path}/d8k.htm"
+            site.add(document, build_8k(f"COMPANY {company_id}"), "text/html")
+            # Un 8-K sur deux arrive avec l'URL du viewer iXBRL (résolution par la page index)
+            document_url = f"{sec_base_url}/ix?doc={document}" if sequence % 2 else f"{sec_base_url}{document}"
+            form_type = "8-K"
+        else:
+            document = f"{base_path}/form4.htm"
+            site.add(document, build_form4(sequence), "text/html")
+            document_url = f"{sec_base_url}{document}"
+            form_type = "4"
+        site.add_directory(base_path)
+        store.insert("company_filings", [{
+            "id": filing_id, "company_id": company_id, "cik": f"{cik:010d}", "accession_number": accession,
+            "form_type": form_type, "status": "DISCOVERED",
+        }])
+        filings.append(eventbridge_event("Company Filing Discovered", "adel.signals", {
+            "filing_id": filing_id, "company_id": company_id, "cik": f"{cik:010d}", "form_type": form_type,
+            "accession_number": accession, "document_url": document_url, "ticker": f"CO{company_id}",
+        }))
+    return filings
+
+
+# Scénarios 13F-HR/A (--amendments): un fund par scénario, filings parsés dans l'ordre donné
+# clé: (période, date de dépôt, type d'amendement)
+AMENDMENT_FILINGS = {
+    "P": ("12-31-2024", "2025-02-14", None),
+    "O": ("03-31-2025", "2025-05-15", None),
+    "N0": ("03-31-2025", "2025-06-02", "NEW HOLDINGS"),
+    "R": ("03-31-2025", "2025-07-01", "RESTATEMENT"),
+    "N": ("03-31-2025", "2025-08-01", "NEW HOLDINGS"),
+    "S": ("06-30-2025", "2025-08-14", None),
+}
+# nom: (ordre de parsing, filings dont la somme est le jeu effectif attendu de l'original O)
+AMENDMENT_SCENARIOS = {
+    "amendement en attente avant l'original": (("P", "S", "R", "O"), ("R",)),
+    "original réécrit après un RESTATEMENT": (("P", "O", "R", "S", "O"), ("R",)),
+    "NEW HOLDINGS après un RESTATEMENT": (("P", "O", "S", "N0", "R", "N"), ("R", "N")),
+}
+AMENDMENT_FUND_OFFSET = 500_000
+
+
+def build_amendment_scenarios(site: EdgarSite, store: PostgrestStore, log: RequestLog, sec_base_url: str) -> list:
+    """
+    Scénarios d'amendements: [{"name", "events" (dans l'ordre), "ids", "positions", "expected"}]
+    Les positions sont tirées dans un petit univers de CUSIP: les filings se recouvrent.
+    """
+    scenarios = []
+    sequence = 0
+    for number, (name, (order, expected)) in enumerate(AMENDMENT_SCENARIOS.items(), start=1):
+        rng = random.Random(name)
+        fund_id = AMENDMENT_FUND_OFFSET + number
+        cik = 1_000_000 + fund_id
+        universe = [f"{fund_id:04d}{i:05d}"[-9:] for i in range(25)]
+        ids, positions, events = {}, {}, {}
+        for key in dict.fromkeys(order):
+            period, filing_date, amendment_type = AMENDMENT_FILINGS[key]
+            sequence += 1
+            filing_id = AMENDMENT_FUND_OFFSET + sequence
+            accession = accession_for(cik, sequence)
+            accession_path = accession.replace("-", "")
+            base_path = f"/Archives/edgar/data/{cik}/{accession_path}"
+            log.accessions[accession_path] = filing_id
+            size = rng.randrange(2, 5) if amendment_type == "NEW HOLDINGS" else rng.randrange(10, 20)
+            positions[key] = {cusip: rng.randrange(1, 10 ** 6) for cusip in rng.sample(universe, size)}
+            form_type = "13F-HR/A" if amendment_type else "13F-HR"
+            site.add(f"{base_path}/primary_doc.xml", build_primary_doc(period, amendment_type), "application/xml")
+            site.add(f"{base_path}/infotable.xml", build_positions_table(positions[key]), "application/xml")
+            site.add_directory(base_path, (
+                f'<tr><td>1</td><td><a href="{base_path}/primary_doc.xml">primary_doc.xml</a></td><td>{form_type}</td></tr>'
+                f'<tr><td>2</td><td><a href="{base_path}/infotable.xml">infotable.xml</a></td>'
+                f'<td>INFORMATION TABLE</td></tr>'
+            ))
+            store.insert("fund_filings", [{
+                "id": filing_id, "fund_id": fund_id, "cik": f"{cik:010d}", "accession_number": accession,
+                "form_type": form_type, "filing_date": filing_date, "status": "DISCOVERED",
+            }])
+            ids[key] = filing_id
+            events[key] = eventbridge_event("13F Discovered", "adel.signals", {
+                "fund_id": fund_id, "cik": f"{cik:010d}", "accession_number": accession,
+                "filing_url": f"{sec_base_url}{base_path}/{accession}-index.htm",
+                "filing_id": filing_id, "form_type": form_type,
+            })
+        effective = Counter()
+        for key in expected:
+            effective.update(positions[key])
+        scenarios.append({"name": name, "events": [events[key] for key in order], "ids": ids,
+                          "positions": positions, "expected": dict(effective)})
+    return scenarios
+
+
+def check_amendment_scenario(store: PostgrestStore, scenario: dict) -> list:
+    """Écarts entre la base et l'état attendu d'un scénario (liste vide si conforme)"""
+    ids, positions = scenario["ids"], scenario["positions"]
+    tables = store.tables
+
+    def holdings(filing_id) -> dict:
+        return {row["cusip"]: row["shares"] for row in tables["fund_holdings"] if row["filing_id"] == filing_id}
+
+    def stored_diff(filing_id) -> tuple:
+        rows = [row for row in tables["fund_holdings_diff"] if row["filing_id_new"] == filing_id]
+        return {row["cusip"]: row["diff_shares"] for row in rows}, {row["filing_id_old"] for row in rows}
+
+    def expected_diff(new: dict, old: dict) -> dict:
+        return {cusip: new.get(cusip, 0) - old.get(cusip, 0) for cusip in set(new) | set(old)
+                if new.get(cusip, 0) != old.get(cusip, 0)}
+
+    errors = []
+    effective = holdings(ids["O"])
+    if effective != scenario["expected"]:
+        errors.append(f"original: {len(effective)} positions, {len(scenario['expected'])} attendues "
+                      f"({sum(1 for c in effective if effective[c] != scenario['expected'].get(c))} écarts)")
+    for key, filing_id in ids.items():
+        if AMENDMENT_FILINGS[key][2] is None:
+            continue
+        if holdings(filing_id):
+            errors.append(f"{key}: holdings propres après application")
+        if stored_diff(filing_id)[0]:
+            errors.append(f"{key}: diff propre après application")
+    for new_key, old_key, old_positions in (("O", "P", positions["P"]), ("S", "O", scenario["expected"])):
+        diff, old_ids = stored_diff(ids[new_key])
+        if diff != expected_diff(holdings(ids[new_key]), old_positions) or old_ids - {ids[old_key]}:
+            errors.append(f"diff {new_key} vs {old_key}: {len(diff)} lignes (filing_id_old {sorted(old_ids)}), "
+                          f"{len(expected_diff(holdings(ids[new_key]), old_positions))} attendues")
+    return errors
+
+
+def build_fixture_filings(site: EdgarSite, store: PostgrestStore, log: RequestLog, sec_base_url: str) -> list:
+    """
+    Events depuis un répertoire enregistré (Archives/edgar/data/<cik>/<accession>/)
+    Un XML autre que primary_doc.xml → 13F, sinon le plus gros .htm → 8-K.
+    index.json est généré si l'enregistrement n'en a pas.
+    """
+    filings = []
+    data_dir = site.fixtures_dir / "Archives" / "edgar" / "data"
+    for sequence, accession_dir in enumerate(sorted(p for p in data_dir.glob("*/*") if p.is_dir()), start=1):
+        cik, accession_path = accession_dir.parent.name, accession_dir.name
+        accession = f"{accession_path[:10]}-{accession_path[10:12]}-{accession_path[12:]}"
+        base_path = f"/Archives/edgar/data/{cik}/{accession_path}"
+        files = {f"{base_path}/{p.name}": (p.read_bytes(), "") for p in accession_dir.iterdir() if p.is_file()}
+        if not (accession_dir / "index.json").exists():
+            listing, _ = build_listing(base_path, files)
+            site.add(f"{base_path}/index.json", listing, "application/json")
+
+        xml_files = [p for p in accession_dir.glob("*.xml") if p.name.lower() != "primary_doc.xml"]
+        html_files = sorted(accession_dir.glob("*.htm"), key=lambda p: p.stat().st_size, reverse=True)
+        if xml_files:
+            filing_id = sequence
+            log.accessions[accession_path] = filing_id
+            store.insert("fund_filings", [{"id": filing_id, "fund_id": sequence, "cik": cik,
+                                           "accession_number": accession, "form_type": "13F-HR",
+                                           "status": "DISCOVERED"}])
+            filings.append(eventbridge_event("13F Discovered", "adel.signals", {
+                "fund_id": sequence, "cik": cik, "accession_number": accession,
+                "filing_url": f"{sec_base_url}{base_path}/{accession}-index.htm",
+                "filing_id": filing_id, "form_type": "13F-HR",
+            }))
+        elif html_files:
+            filing_id = COMPANY_FILING_ID_OFFSET + sequence
+            log.accessions[accession_path] = filing_id
+            store.insert("company_filings", [{"id": filing_id, "company_id": sequence, "cik": cik,
+                                              "accession_number": accession, "form_type": "8-K",
+                                              "status": "DISCOVERED"}])
+            filings.append(eventbridge_event("Company Filing Discovered", "adel.signals", {
+                "filing_id": filing_id, "company_id": sequence, "cik": cik, "form_type": "8-K",
+                "accession_number": accession, "document_url": f"{sec_base_url}{base_path}/{html_files[0].name}",
+            }))
+    return filings
+
+
+def load_handlers() -> dict:
+    """
+    Importer les deux handlers (modules partagés http_client / raw_archive identiques)
+    parser-13f est importé sous son nom Lambda (index), comme le fait async_pipeline.
+    Les modules propres à parser-company-filing (parsed_document, ...) sont
+    résolus après ceux de parser-13f.
+    """
+    sys.path[:0] = [str(WORKER_13F_DIR / "src"), str(WORKER_13F_DIR)]
+    sys.path.append(str(WORKER_COMPANY_DIR / "src"))
+    spec = importlib.util.spec_from_file_location("parser_company_filing",
+                                                  WORKER_COMPANY_DIR / "src" / "index.py")
+    company = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser_13f = importlib.import_module("index")
+        spec.loader.exec_module(company)
+    return {"parser-13f": parser_13f.handler, "parser-company-filing": company.handler}
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def print_report(results: list, log: RequestLog, store: PostgrestStore, elapsed: float, sec_limits: dict,
+                 checks: dict = None):
+    elapsed = max(elapsed, 1e-9)
+    print("")
+    print("═══════════════════════════════════════════════════════════")
+    print(f"✅ TERMINÉ en {elapsed:.1f}s: {len(results)} events, {len(results) / elapsed:.1f} events/s")
+    for worker in sorted({r["worker"] for r in results}):
+        worker_results = [r for r in results if r["worker"] == worker]
+        latencies = [r["seconds"] * 1000 for r in worker_results]
+        codes = Counter(r["status"] for r in worker_results)
+        print(f"   {worker}: {len(worker_results)} events, codes {dict(codes)}")
+        print(f"     Latence (ms): p50 {percentile(latencies, 50):.0f}  p90 {percentile(latencies, 90):.0f}  "
+              f"p99 {percentile(latencies, 99):.0f}  max {max(latencies):.0f}")
+        wall = [r["handler_seconds"] * 1000 for r in worker_results if r.get("handler_seconds") is not None]
+        if wall:
+            print(f"     Wall-clock par filing (elapsed_seconds, ms): p50 {percentile(wall, 50):.0f}  "
+                  f"p90 {percentile(wall, 90):.0f}  p99 {percentile(wall, 99):.0f}")
+        for side in ("edgar", "postgrest"):
+            counts = [log.per_filing[r["filing_id"]][side] for r in worker_results]
+            print(f"     Requêtes {side:<9}/ filing: moy {sum(counts) / len(counts):.1f}  "
+                  f"p50 {percentile(counts, 50):.0f}  p99 {percentile(counts, 99):.0f}  max {max(counts)}")
+    unattributed = log.per_filing.get(None, Counter())
+    if unattributed:
+        print(f"   Requêtes sans filing identifiable: {dict(unattributed)}")
+    print(f"   Statuts HTTP servis: {dict(sorted((f'{side} {status}', n) for (side, status), n in log.statuses.items()))}")
+    print(f"   Rate limit SEC: {sec_limits}")
+    print(f"   Lignes en base: " + ", ".join(f"{table}={len(rows)}" for table, rows in sorted(store.tables.items())))
+    if checks:
+        print("   Scénarios d'amendements:")
+        for name, errors in checks.items():
+            print(f"     {'❌' if errors else '✅'} {name}{': ' + '; '.join(errors) if errors else ''}")
+    print("═══════════════════════════════════════════════════════════")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1000, help="Nombre d'events envoyés aux handlers")
+    parser.add_argument("--filings", type=int, help="Filings distincts (défaut: un par event; sinon events répétés)")
+    parser.add_argument("--mix", default="13f=2,8k=1,form4=1", help="Poids des types d'events (13f, 8k, form4)")
+    parser.add_argument("--holdings", type=int, default=500, help="Lignes par information table synthétique")
+    parser.add_argument("--fixtures", help="Répertoire enregistré (Archives/edgar/data/...) à servir et rejouer")
+    parser.add_argument("--concurrency", type=int, default=8, help="Handlers exécutés en parallèle")
+    parser.add_argument("--sec-latency-ms", type=float, default=0, help="Latence EDGAR injectée (ms)")
+    parser.add_argument("--db-latency-ms", type=float, default=0, help="Latence PostgREST injectée (ms)")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Gigue uniforme ajoutée aux latences (ms)")
+    parser.add_argument("--sec-error-rate", type=float, default=0, help="Part des requêtes EDGAR en erreur")
+    parser.add_argument("--sec-error-status", type=int, default=503, help="Statut des erreurs EDGAR (403, 429, 503)")
+    parser.add_argument("--db-error-rate", type=float, default=0, help="Part des requêtes PostgREST en erreur (503)")
+    parser.add_argument("--pipeline", choices=("sync", "async"), default="sync",
+                        help="Pipeline du handler 13F (PARSER_13F_PIPELINE)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Events par invocation (batch SQS, voir batch_events; 1 = event unitaire)")
+    parser.add_argument("--sec-rate-limit", type=float, help="SEC_RATE_LIMIT des workers (req/s, 0 = désactivé)")
+    parser.add_argument("--archive", action="store_true", help="Activer l'archive brute (répertoire temporaire)")
+    parser.add_argument("--amendments", action="store_true",
+                        help="Rejouer les scénarios 13F-HR/A (ordre de parsing imposé par fund) et vérifier la base")
+    parser.add_argument("--verbose", action="store_true", help="Afficher les logs des handlers")
+    args = parser.parse_args()
+
+    log = RequestLog()
+    store = PostgrestStore()
+    site = EdgarSite(args.fixtures)
+    edgar = start_server(make_edgar_handler(
+        site, FaultInjector(args.sec_latency_ms, args.jitter_ms, args.sec_error_rate, args.sec_error_status), log))
+    postgrest = start_server(make_postgrest_handler(
+        store, FaultInjector(args.db_latency_ms, args.jitter_ms, args.db_error_rate, 503), log))
+    sec_base_url = f"http://127.0.0.1:{edgar.server_address[1]}"
+
+    # Avant l'import des workers: leurs constantes sont lues à l'import
+    archive_dir = tempfile.mkdtemp(prefix="edgar-load-archive-") if args.archive else None
+    os.environ.update({
+        "SEC_BASE_URL": sec_base_url,
+        "SUPABASE_URL": f"http://127.0.0.1:{postgrest.server_address[1]}",
+        "SUPABASE_SERVICE_KEY": "load-test",
+        "RAW_ARCHIVE_URI": f"file://{archive_dir}" if archive_dir else "none",
+    })
+    os.environ["PARSER_13F_PIPELINE"] = args.pipeline
+    if args.sec_rate_limit is not None:
+        os.environ["SEC_RATE_LIMIT"] = str(args.sec_rate_limit)
+    handlers = load_handlers()
+
+    scenarios = []
+    if args.amendments:
+        scenarios = build_amendment_scenarios(site, store, log, sec_base_url)
+        filings = [event for scenario in scenarios for event in scenario["events"]]
+    elif args.fixtures:
+        filings = build_fixture_filings(site, store, log, sec_base_url)
+    else:
+        filings = build_synthetic_filings(args.filings or args.events, parse_mix(args.mix), args.holdings,
+                                          site, store, log, sec_base_url)
+    if not filings:
+        print("❌ Aucun filing à rejouer")
+        sys.exit(1)
+    events = filings if scenarios else [filings[i % len(filings)] for i in range(args.events)]
+    print(f"📄 {len(events)} events sur {len(filings)} filings, concurrence {args.concurrency}, "
+          f"pipeline 13F {args.pipeline}, batch {args.batch_size}")
+    print(f"   EDGAR {sec_base_url}, PostgREST {os.environ['SUPABASE_URL']}"
+          f"{', archive ' + archive_dir if archive_dir else ''}")
+
+    def run(event: dict) -> dict:
+        worker = "parser-13f" if event["detail-type"] == "13F Discovered" else "parser-company-filing"
+        start = time.perf_counter()
+        handler_seconds = None
+        try:
+            response = handlers[worker](event, None)
+            status = response.get("statusCode")
+            handler_seconds = json.loads(response.get("body") or "{}").get("elapsed_seconds")
+        except Exception as e:
+            status = f"exception {type(e).__name__}"
+        return {"worker": worker, "filing_id": event["detail"]["filing_id"], "status": status,
+                "seconds": time.perf_counter() - start, "handler_seconds": handler_seconds}
+
+    def run_batch(batch: list) -> list:
+        """Un batch SQS par invocation; latence de l'invocation attribuée à chaque item"""
+        worker = "parser-13f" if batch[0]["detail-type"] == "13F Discovered" else "parser-company-filing"
+        records = [{"messageId": str(position), "body": json.dumps(event)} for position, event in enumerate(batch)]
+        start = time.perf_counter()
+        try:
+            response = handlers[worker]({"Records": records}, None)
+            failed = {failure["itemIdentifier"] for failure in response.get("batchItemFailures", [])}
+            statuses = [500 if str(position) in failed else 200 for position in range(len(batch))]
+        except Exception as e:
+            statuses = [f"exception {type(e).__name__}"] * len(batch)
+        seconds = time.perf_counter() - start
+        return [{"worker": worker, "filing_id": event["detail"]["filing_id"], "status": status,
+                 "seconds": seconds, "handler_seconds": None} for event, status in zip(batch, statuses)]
+
+    if scenarios:
+        # Scénarios en parallèle, events d'un scénario dans l'ordre
+        units = [scenario["events"] for scenario in scenarios]
+        run_unit = lambda unit: [run(event) for event in unit]  # noqa: E731
+    elif args.batch_size > 1:
+        units = []
+        for detail_type in sorted({event["detail-type"] for event in events}):
+            same_worker = [event for event in events if event["detail-type"] == detail_type]
+            units += [same_worker[i:i + args.batch_size] for i in range(0, len(same_worker), args.batch_size)]
+        run_unit = run_batch
+    else:
+        units = events
+        run_unit = lambda event: [run(event)]  # noqa: E731
+
+    results = []
+    start = time.perf_counter()
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    errors = contextlib.nullcontext() if args.verbose else contextlib.redirect_stderr(io.StringIO())
+    progress = sys.__stdout__
+    with output, errors, ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(run_unit, unit) for unit in units]
+        step = max(1, len(events) // 10)
+        for future in as_completed(futures):
+            done = len(results)
+            results.extend(future.result())
+            if len(results) // step > done // step:
+                print(f"   [{len(results)}/{len(events)}] {time.perf_counter() - start:.1f}s", file=progress,
+                      flush=True)
+    elapsed = time.perf_counter() - start
+
+    edgar.shutdown()
+    postgrest.shutdown()
+    checks = {scenario["name"]: check_amendment_scenario(store, scenario) for scenario in scenarios}
+    print_report(results, log, store, elapsed, sys.modules["http_client"].rate_limit_stats(), checks)
+    if any(checks.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Ingestion hors ligne des companyfacts SEC dans le store local de parser-company-filing
+Source: l'archive bulk companyfacts.zip de la SEC
+(https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip) ou un
+répertoire de CIK##########.json. Chaque CIK est réduit à un fichier compact
+(voir workers/parser-company-filing/src/companyfacts_store.py): concepts des
+métriques earnings, trimestres seulement, index mois -> fins de trimestre.
+Le parser lit ensuite les métriques d'un 8-K par CIK et trimestre (celui des
+faits iXBRL du document, sinon déduit de sa date), sans scraper le document; un
+CIK ou un trimestre absent du store garde l'extraction HTML / XBRL.
+
+Le store est empaqueté avec la Lambda (build.sh copie src/data) ou monté
+ailleurs via COMPANYFACTS_STORE.
+
+Usage:
+  python3 scripts/ingest-companyfacts.py companyfacts.zip
+  python3 scripts/ingest-companyfacts.py ./companyfacts --ciks 1045810,320193
+  python3 scripts/ingest-companyfacts.py companyfacts.zip --output /mnt/companyfacts
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import zipfile
+from pathlib import Path
+
+# Charger .env depuis la racine du projet si disponible
+try:
+    from dotenv import load_dotenv
+    env_path = Path(__file__).parent.parent / ".env"
+    if env_path.exists():
+        load_dotenv(env_path)
+except ImportError:
+    pass
+
+WORKER_DIR = Path(__file__).parent.parent / "workers" / "parser-company-filing"
+sys.path.insert(0, str(WORKER_DIR / "src"))
+
+from companyfacts_store import build_cik_store, normalize_cik, write_cik_store  # noqa: E402
+
+DEFAULT_OUTPUT = WORKER_DIR / "src" / "data" / "companyfacts"
+
+
+def iter_sources(source: Path, ciks=None):
+    """(nom, bytes) de chaque CIK##########.json de l'archive ou du répertoire"""
+    def wanted(name: str) -> bool:
+        base = os.path.basename(name)
+        if not (base.startswith("CIK") and base.endswith(".json")):
+            return False
+        return ciks is None or base[3:-5] in ciks
+
+    if source.is_dir():
+        for path in sorted(source.glob("CIK*.json")):
+            if wanted(path.name):
+                yield path.name, path.read_bytes()
+    else:
+        with zipfile.ZipFile(source) as archive:
+            for name in sorted(archive.namelist()):
+                if wanted(name):
+                    yield name, archive.read(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", type=Path, help="companyfacts.zip ou répertoire de CIK##########.json")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Répertoire du store")
+    parser.add_argument("--ciks", help="Limiter à ces CIK (séparés par ,)")
+    args = parser.parse_args()
+
+    if not args.source.exists():
+        print(f"❌ Source introuvable: {args.source}")
+        sys.exit(1)
+
+    ciks = {normalize_cik(c) for c in args.ciks.split(",")} if args.ciks else None
+    start = time.perf_counter()
+    files = written = skipped = errors = 0
+    read_bytes = written_bytes = 0
+    for name, content in iter_sources(args.source, ciks):
+        files += 1
+        read_bytes += len(content)
+        try:
+            store = build_cik_store(json.loads(content))
+        except (ValueError, TypeError) as e:
+            errors += 1
+            print(f"   ⚠️  {name}: {e}")
+            continue
+        if store is None:
+            skipped += 1
+            continue
+        written_bytes += os.path.getsize(write_cik_store(store, str(args.output)))
+        written += 1
+        if files % 1000 == 0:
+            print(f"   [{files}] {written} CIK écrits")
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print("")
+    print("═══════════════════════════════════════════════════════════")
+    print(f"✅ TERMINÉ en {elapsed:.1f}s → {args.output}")
+    print(f"   Fichiers: {files} ({skipped} sans métrique earnings, {errors} illisibles)")
+    print(f"   CIK écrits: {written}")
+    print(f"   Volume:  {read_bytes / 1e6:,.1f} Mo lus → {written_bytes / 1e6:,.1f} Mo écrits")
+    print(f"   Débit:   {files / elapsed:,.0f} fichiers/s")
+    print("═══════════════════════════════════════════════════════════")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Moteur de reparsing 13F en batch, depuis l'archive des documents bruts
+Sélectionne les filings par statut, fund et/ou période, puis les parse en
+parallèle (pool de processus) avec le code du Lambda parser-13f:
+- document lu via fund_filings.raw_storage_path ou l'archive (RAW_ARCHIVE_URI),
+  sec.gov seulement en dernier recours (désactivé avec --offline)
+- holdings écrits comme par le handler: RPC transactionnelle par filing
+  (amendements 13F-HR/A appliqués à l'original), puis fund_holdings_diff
+- rapport final: filings/s, lignes/s, échecs par cause
+
+Usage:
+  python3 scripts/reparse-13f-filings.py --status FAILED,DISCOVERED
+  python3 scripts/reparse-13f-filings.py --status PARSED --from 2025-01-01 --to 2025-03-31 --workers 8
+  python3 scripts/reparse-13f-filings.py --fund-id 12 --offline --dry-run
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# Charger .env depuis la racine du projet si disponible
+try:
+    from dotenv import load_dotenv
+    env_path = Path(__file__).parent.parent / ".env"
+    if env_path.exists():
+        load_dotenv(env_path)
+except ImportError:
+    pass
+
+WORKER_DIR = Path(__file__).parent.parent / "workers" / "parser-13f"
+sys.path[:0] = [str(WORKER_DIR / "src"), str(WORKER_DIR)]
+
+import http_client  # noqa: E402
+import index  # noqa: E402
+import raw_archive  # noqa: E402
+
+PAGE_SIZE = 1000
+FILING_COLUMNS = "id,fund_id,cik,accession_number,form_type,filing_date,status,raw_storage_path,funds(cik)"
+
+
+class NotArchivedError(Exception):
+    """Document absent de l'archive en mode --offline"""
+
+
+def postgrest_headers() -> dict:
+    return {
+        "apikey": index.SUPABASE_KEY,
+        "Authorization": f"Bearer {index.SUPABASE_KEY}",
+    }
+
+
+def select_filings(statuses, fund_id=None, date_from=None, date_to=None, limit=None) -> list:
+    """Filings à reparser (filtres PostgREST in/gte/lte, paginés par id)"""
+    params = [("select", FILING_COLUMNS), ("order", "id")]
+    if statuses:
+        params.append(("status", f"in.({','.join(statuses)})"))
+    if fund_id:
+        params.append(("fund_id", f"eq.{fund_id}"))
+    if date_from:
+        params.append(("filing_date", f"gte.{date_from}"))
+    if date_to:
+        params.append(("filing_date", f"lte.{date_to}"))
+
+    filings = []
+    while limit is None or len(filings) < limit:
+        page_size = PAGE_SIZE if limit is None else min(PAGE_SIZE, limit - len(filings))
+        response = http_client.get(
+            f"{index.SUPABASE_URL}/rest/v1/fund_filings",
+            headers=postgrest_headers(),
+            params=params + [("limit", str(page_size)), ("offset", str(len(filings)))],
+            timeout=60,
+        )
+        response.raise_for_status()
+        page = response.json()
+        filings.extend(page)
+        if len(page) < page_size:
+            break
+    return filings
+
+
+def filing_cik(filing: dict) -> str:
+    return filing.get("cik") or (filing.get("funds") or {}).get("cik") or ""
+
+
+def failure_cause(error: Exception) -> str:
+    """Cause d'échec agrégeable (type d'erreur, code HTTP)"""
+    response = getattr(error, "response", None)
+    if response is not None and getattr(response, "status_code", None):
+        return f"HTTP {response.status_code}"
+    if isinstance(error, NotArchivedError):
+        return "not archived"
+    return type(error).__name__
+
+
+def filing_base_url(filing: dict) -> str:
+    accession_no_dashes = filing["accession_number"].replace("-", "")
+    return f"{index.SEC_BASE_URL}/Archives/edgar/data/{filing_cik(filing).lstrip('0') or '0'}/{accession_no_dashes}"
+
+
+def load_holdings(filing: dict, offline: bool):
+    """
+    Holdings d'un filing: objet archivé (raw_storage_path), puis archive par URL, puis sec.gov
+    Retourne (holdings, raw_storage_path, source, primary_doc_url).
+    """
+    cik = filing_cik(filing)
+    accession_number = filing["accession_number"]
+    archive = raw_archive.get_archive()
+    base_url = filing_base_url(filing)
+
+    if archive is not None and filing.get("raw_storage_path"):
+        archived = archive.open_object(filing["raw_storage_path"])
+        if archived is not None:
+            holdings = index.parse_13f_archived(archived, filing["raw_storage_path"])
+            return holdings, filing["raw_storage_path"], "archive", f"{base_url}/primary_doc.xml"
+
+    filing_url = f"{base_url}/{accession_number}-index.htm"
+    headers = {"User-Agent": index.SEC_USER_AGENT}
+
+    if offline:
+        # Listing et information table doivent être dans l'archive
+        if archive is None or archive.lookup(f"{base_url}/index.json") is None:
+            raise NotArchivedError(f"{accession_number}: index.json absent de l'archive")
+        documents = index.resolve_filing_documents(cik, accession_number, filing_url, headers)
+        archived = archive.open(documents["info_table_url"])
+        if archived is None:
+            raise NotArchivedError(f"{accession_number}: information table absente de l'archive")
+        holdings = index.parse_13f_archived(archived, documents["info_table_url"])
+        return holdings, archived.storage_path, "archive", documents.get("primary_doc_url")
+
+    documents = index.resolve_filing_documents(cik, accession_number, filing_url, headers)
+    holdings, raw_storage_path = index.parse_13f_document(documents["info_table_url"], headers)
+    return holdings, raw_storage_path, "document", documents.get("primary_doc_url")
+
+
+def reparse_filing(filing: dict, offline: bool, dry_run: bool) -> dict:
+    """Tâche d'un processus du pool: parse + écriture d'un filing, jamais d'exception"""
+    start = time.perf_counter()
+    waits_before = http_client.rate_limit_stats()
+    result = {"filing_id": filing["id"], "accession_number": filing["accession_number"], "rows": 0}
+    try:
+        holdings, raw_storage_path, source, primary_doc_url = load_holdings(filing, offline)
+        result["source"] = source
+        result["rows"] = len(holdings)
+
+        if not dry_run:
+            # Même chemin d'écriture que le handler (amendements, statut PARSED, diffs)
+            cover = index.read_cover_page(primary_doc_url, {"User-Agent": index.SEC_USER_AGENT}, offline=offline)
+            store_stats = index.store_filing_holdings(filing["id"], filing["fund_id"], filing_cik(filing),
+                                                      filing.get("form_type"), holdings, cover,
+                                                      raw_storage_path=raw_storage_path)
+            result["diff_rows"] = store_stats["diff"]["rows"]
+        result["ok"] = True
+    except Exception as e:
+        result["ok"] = False
+        result["cause"] = failure_cause(e)
+        result["error"] = str(e)[:200]
+        if not dry_run and not isinstance(e, NotArchivedError):
+            try:
+                index.supabase_request("PATCH", "fund_filings",
+                    data={"status": "FAILED", "updated_at": "now()"},
+                    filters={"id": filing["id"]}
+                )
+            except Exception:
+                pass
+    result["seconds"] = time.perf_counter() - start
+    waits = http_client.rate_limit_stats()
+    result["sec_wait_seconds"] = waits["wait_seconds"] - waits_before["wait_seconds"]
+    result["sec_retries"] = (waits["retries"] + waits["gave_up"]) - (waits_before["retries"] + waits_before["gave_up"])
+    return result
+
+
+def print_report(results: list, elapsed: float):
+    ok = [r for r in results if r["ok"]]
+    failed = [r for r in results if not r["ok"]]
+    rows = sum(r["rows"] for r in ok)
+    elapsed = max(elapsed, 1e-9)
+
+    print("")
+    print("═══════════════════════════════════════════════════════════")
+    print(f"✅ TERMINÉ en {elapsed:.1f}s")
+    print(f"   Filings: {len(results)} ({len(ok)} OK, {len(failed)} échecs)")
+    print(f"   Débit:   {len(results) / elapsed:.2f} filings/s, {rows / elapsed:,.0f} lignes/s ({rows} lignes)")
+    sources = Counter(r.get("source", "-") for r in ok)
+    sec_wait = sum(r.get("sec_wait_seconds", 0) for r in results)
+    sec_retries = sum(r.get("sec_retries", 0) for r in results)
+    if sec_wait or sec_retries:
+        print(f"   SEC:     {sec_wait:.1f}s d'attente du rate limiter, {sec_retries} retries 429/403/503")
+    if sources:
+        print(f"   Sources: {dict(sources)}")
+    if failed:
+        print("   Échecs par cause:")
+        for cause, count in Counter(r["cause"] for r in failed).most_common():
+            example = next(r for r in failed if r["cause"] == cause)
+            print(f"     {count:>5}  {cause}  (ex: {example['accession_number']}: {example['error']})")
+    print("═══════════════════════════════════════════════════════════")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", default="FAILED,DISCOVERED", help="Statuts à reparser, séparés par des virgules")
+    parser.add_argument("--fund-id", type=int, help="Limiter à un fund")
+    parser.add_argument("--from", dest="date_from", help="filing_date minimale (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="filing_date maximale (YYYY-MM-DD)")
+    parser.add_argument("--limit", type=int, help="Nombre maximal de filings")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Processus parallèles")
+    parser.add_argument("--offline", action="store_true", help="Archive uniquement, jamais sec.gov")
+    parser.add_argument("--dry-run", action="store_true", help="Parser sans rien écrire en base")
+    args = parser.parse_args()
+
+    if not index.SUPABASE_URL or not index.SUPABASE_KEY:
+        print("❌ Variables d'environnement manquantes!")
+        print("Définir SUPABASE_URL et SUPABASE_SERVICE_KEY ou créer un fichier .env")
+        sys.exit(1)
+
+    statuses = [s.strip().upper() for s in args.status.split(",") if s.strip()]
+    filings = select_filings(statuses, args.fund_id, args.date_from, args.date_to, args.limit)
+    print(f"📄 {len(filings)} filings sélectionnés (statuts {statuses}), {args.workers} processus")
+    if not filings:
+        return
+
+    # Le débit EDGAR autorisé est partagé entre les processus (lu à l'import par les processus spawn)
+    os.environ["SEC_RATE_LIMIT"] = str(http_client.SEC_RATE_LIMIT / max(args.workers, 1))
+
+    results = []
+    start = time.perf_counter()
+    # spawn: les processus ne doivent pas hériter des connexions ouvertes du parent
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(reparse_filing, filing, args.offline, args.dry_run) for filing in filings]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = f"{result['rows']} holdings" if result["ok"] else f"❌ {result['cause']}"
+            print(f"   [{len(results)}/{len(filings)}] {result['accession_number']}: {status} ({result['seconds']:.2f}s)")
+    print_report(results, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Batch de scoring des signaux 13F (fund_signals.impact_score)
+Pour chaque filing PARSED de la période: holdings du filing et du filing
+précédent du fund, merge join sur (cusip, type), score pondéré par
+funds.tier_influence, le poids en portefeuille et la taille du mouvement
+(voir workers/parser-13f/src/signal_scorer.py). Les signaux d'un lot de
+filings sont remplacés en une transaction (RPC replace_fund_signals).
+
+Les holdings sont chargés par lots de filings (filing_id=in.(...)), les
+filings précédents sont résolus en mémoire: aucune requête par ticker.
+
+Usage:
+  python3 scripts/score-fund-signals.py --period 2025-03-31
+  python3 scripts/score-fund-signals.py --from 2025-04-01 --to 2025-06-30 --min-score 5
+  python3 scripts/score-fund-signals.py --fund-id 12 --dry-run
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+# Charger .env depuis la racine du projet si disponible
+try:
+    from dotenv import load_dotenv
+    env_path = Path(__file__).parent.parent / ".env"
+    if env_path.exists():
+        load_dotenv(env_path)
+except ImportError:
+    pass
+
+WORKER_DIR = Path(__file__).parent.parent / "workers" / "parser-13f"
+sys.path[:0] = [str(WORKER_DIR / "src"), str(WORKER_DIR)]
+
+import index  # noqa: E402
+from holdings_diff import PositionSet  # noqa: E402
+from holdings_table import HOLDING_TYPES  # noqa: E402
+from signal_scorer import score_filing  # noqa: E402
+
+FILING_COLUMNS = "id,fund_id,period_of_report,filing_date"
+
+
+def in_filter(values) -> str:
+    return f"in.({','.join(str(v) for v in values)})"
+
+
+def select_scope(period=None, date_from=None, date_to=None, fund_id=None) -> list:
+    """Filings PARSED à scorer (les amendements appliqués n'ont pas de holdings propres)"""
+    params = [("select", FILING_COLUMNS), ("status", "eq.PARSED"), ("amendment_applied_at", "is.null"),
+              ("order", "id")]
+    if period:
+        params.append(("period_of_report", f"eq.{period}"))
+    if date_from:
+        params.append(("filing_date", f"gte.{date_from}"))
+    if date_to:
+        params.append(("filing_date", f"lte.{date_to}"))
+    if fund_id:
+        params.append(("fund_id", f"eq.{fund_id}"))
+    return index.supabase_select("fund_filings", params)
+
+
+def filing_order_key(filing: dict):
+    return (filing.get("period_of_report") or filing.get("filing_date") or "", filing.get("filing_date") or "",
+            filing["id"])
+
+
+def resolve_previous_filings(filings: list) -> dict:
+    """
+    filing_id → filing PARSED précédent du même fund (ou None)
+    Une requête pour tous les filings des funds concernés, tri en mémoire.
+    """
+    fund_ids = sorted({f["fund_id"] for f in filings})
+    history = defaultdict(list)
+    for start in range(0, len(fund_ids), 200):
+        for filing in index.supabase_select("fund_filings", [
+            ("select", FILING_COLUMNS), ("status", "eq.PARSED"), ("amendment_applied_at", "is.null"),
+            ("fund_id", in_filter(fund_ids[start:start + 200])), ("order", "id")
+        ]):
+            history[filing["fund_id"]].append(filing)
+
+    previous = {}
+    for fund_filings in history.values():
+        fund_filings.sort(key=filing_order_key)
+        # Le précédent est le dernier filing de la période strictement antérieure
+        before = None
+        group_period = None
+        group_last = None
+        for filing in fund_filings:
+            period = filing_order_key(filing)[0]
+            if period != group_period:
+                before = group_last or before
+                group_period = period
+            previous[filing["id"]] = before
+            group_last = filing
+    return previous
+
+
+def load_tiers(filings: list) -> dict:
+    fund_ids = sorted({f["fund_id"] for f in filings})
+    tiers = {}
+    for start in range(0, len(fund_ids), 200):
+        for fund in index.supabase_select("funds", [("select", "id,tier_influence"),
+                                                    ("id", in_filter(fund_ids[start:start + 200]))]):
+            tiers[fund["id"]] = fund.get("tier_influence")
+    return tiers
+
+
+def load_positions(filing_ids) -> dict:
+    """filing_id → PositionSet, holdings de tous les filings du lot en une requête paginée"""
+    rows_by_filing = defaultdict(list)
+    for row in index.supabase_select("fund_holdings", [
+        ("select", "filing_id,ticker,cusip,shares,market_value,type"),
+        ("filing_id", in_filter(sorted(filing_ids))), ("order", "id")
+    ]):
+        rows_by_filing[row["filing_id"]].append(row)
+    return {filing_id: PositionSet.from_rows(rows_by_filing.get(filing_id, [])) for filing_id in filing_ids}
+
+
+def replace_signals(filing_ids, signals: list) -> int:
+    """Remplacer les signaux des filings du lot en une transaction (RPC replace_fund_signals)"""
+    stored, _, _ = index.supabase_rpc("replace_fund_signals", {"p_filing_ids": sorted(filing_ids)},
+                                      "p_signals", signals)
+    return stored
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--period", help="period_of_report du trimestre (YYYY-MM-DD)")
+    parser.add_argument("--from", dest="date_from", help="filing_date minimale (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="filing_date maximale (YYYY-MM-DD)")
+    parser.add_argument("--fund-id", type=int, help="Limiter à un fund")
+    parser.add_argument("--min-score", type=float, default=0.0, help="Score minimal pour écrire un signal")
+    parser.add_argument("--batch-size", type=int, default=50, help="Filings par lot de chargement")
+    parser.add_argument("--dry-run", action="store_true", help="Scorer sans rien écrire en base")
+    args = parser.parse_args()
+
+    if not index.SUPABASE_URL or not index.SUPABASE_KEY:
+        print("❌ Variables d'environnement manquantes!")
+        print("Définir SUPABASE_URL et SUPABASE_SERVICE_KEY ou créer un fichier .env")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    filings = select_scope(args.period, args.date_from, args.date_to, args.fund_id)
+    print(f"📄 {len(filings)} filings PARSED à scorer")
+    if not filings:
+        return
+
+    previous = resolve_previous_filings(filings)
+    tiers = load_tiers(filings)
+
+    signal_count = 0
+    actions = Counter()
+    skipped = 0
+    for batch_start in range(0, len(filings), args.batch_size):
+        batch = filings[batch_start:batch_start + args.batch_size]
+        filing_ids = {f["id"] for f in batch}
+        needed = filing_ids | {previous[f["id"]]["id"] for f in batch if previous.get(f["id"])}
+        positions = load_positions(needed)
+
+        signals = []
+        for filing in batch:
+            prior = previous.get(filing["id"])
+            if prior is None:
+                skipped += 1
+                continue
+            for signal in score_filing(positions[filing["id"]], positions[prior["id"]],
+                                       tiers.get(filing["fund_id"]), args.min_score):
+                actions[signal["action"]] += 1
+                signals.append({
+                    "fund_id": filing["fund_id"],
+                    "filing_id": filing["id"],
+                    "ticker": signal["ticker"],
+                    "cusip": signal["cusip"],
+                    "type": HOLDING_TYPES[signal["type_code"]],
+                    "action": signal["action"],
+                    "impact_score": signal["impact_score"]
+                })
+
+        signal_count += len(signals)
+        if not args.dry_run:
+            replace_signals(filing_ids, signals)
+        print(f"   [{min(batch_start + len(batch), len(filings))}/{len(filings)}] {len(signals)} signaux")
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print("")
+    print("═══════════════════════════════════════════════════════════")
+    print(f"✅ TERMINÉ en {elapsed:.1f}s")
+    print(f"   Filings: {len(filings)} ({skipped} sans filing précédent)")
+    print(f"   Signaux: {signal_count} {dict(actions)}")
+    print(f"   Débit:   {len(filings) / elapsed:.2f} filings/s, {signal_count / elapsed:,.0f} signaux/s")
+    print("═══════════════════════════════════════════════════════════")
+
+
+if __name__ == "__main__":
+    main()
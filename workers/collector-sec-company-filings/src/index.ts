@@ -178,6 +178,7 @@ async function checkFormType(company: Company, formType: string): Promise<number
                 ticker: company.ticker,
                 form_type: formType,
                 accession_number: accessionNumber,
+                filing_date: filingDate,
                 filing_url: documentUrl,
               }),
               EventBusName: EVENT_BUS_NAME,
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Benchmark de débit et de mémoire des parsers 13F
+Fixtures synthétiques (information tables de 100 à 100k lignes) en trois
+variantes: XML sans namespace, XML namespacé (n1:) et XML enveloppé dans du
+HTML (ce que sec.gov renvoie parfois). Chaque chemin de parsing est mesuré en
+lignes/s (meilleur de --repeat) et en pic mémoire (tracemalloc, exécution à part).
+
+Les résultats peuvent être sauvés comme baseline (--save) puis comparés
+(--compare): code de sortie 1 si un chemin perd plus de --threshold % de débit
+ou prend plus de --threshold % de mémoire. Aucune baseline n'est versionnée (les
+mesures dépendent de la machine): la générer d'abord avec --save sur la machine
+qui compare, sinon --compare sort avec le code 2.
+
+--malformed compare en plus le fallback tolérant à l'ancien chemin BeautifulSoup
+sur du XML invalide (entités non échappées).
+
+Usage:
+  python3 scripts/bench_parsers.py
+  python3 scripts/bench_parsers.py --rows 100,1000,10000 --save      # baseline locale
+  python3 scripts/bench_parsers.py --rows 100,1000,10000 --compare --threshold 15
+  python3 scripts/bench_parsers.py --paths etree,stream --variants namespaced
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+WORKER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(WORKER_DIR, "src"), WORKER_DIR]
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import index  # noqa: E402
+from tolerant_parser import parse_holdings_tolerant  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(WORKER_DIR, "scripts", "bench_baseline.json")
+DEFAULT_ROWS = "100,1000,10000,100000"
+VARIANTS = ("plain", "namespaced", "html")
+
+INFO_TABLE_NS = "http://www.sec.gov/edgar/document/thirteenf/informationtable"
+
+
+def build_info_table(rows: int, variant: str = "namespaced") -> str:
+    """
+    Information table 13F valide
+    plain: sans namespace, namespaced: préfixe n1:, html: XML enveloppé dans une page HTML
+    """
+    prefix = "n1:" if variant == "namespaced" else ""
+    if prefix:
+        root_open = f'<n1:informationTable xmlns:n1="{INFO_TABLE_NS}">'
+    else:
+        root_open = f'<informationTable xmlns="{INFO_TABLE_NS}">' if variant == "plain" else "<informationTable>"
+    parts = [root_open]
+    for i in range(rows):
+        put_call = "<n1:putCall>Call</n1:putCall>" if i % 50 == 0 else ""
+        parts.append(
+            f"<n1:infoTable><n1:nameOfIssuer>ISSUER {i} CORP</n1:nameOfIssuer>"
+            f"<n1:titleOfClass>COM</n1:titleOfClass><n1:cusip>{i:09d}</n1:cusip>"
+            f"<n1:value>{(i + 1) * 1000}</n1:value>"
+            f"<n1:shrsOrPrnAmt><n1:sshPrnamt>{(i + 1) * 10}</n1:sshPrnamt><n1:sshPrnamtType>SH</n1:sshPrnamtType></n1:shrsOrPrnAmt>"
+            f"{put_call}<n1:investmentDiscretion>SOLE</n1:investmentDiscretion>"
+            f"<n1:votingAuthority><n1:Sole>{i}</n1:Sole><n1:Shared>0</n1:Shared><n1:None>0</n1:None></n1:votingAuthority>"
+            f"</n1:infoTable>"
+        )
+    parts.append(f"</{prefix}informationTable>")
+    body = "\n".join(parts).replace("n1:", prefix) if not prefix else "\n".join(parts)
+
+    if variant == "html":
+        return ("<!DOCTYPE html>\n<html><head><title>13F Information Table</title></head><body>\n"
+                + body + "\n</body></html>")
+    return '<?xml version="1.0" encoding="UTF-8"?>\n' + body
+
+
+def build_malformed_info_table(rows: int, prefix: str = "n1:") -> str:
+    """Information table avec des '&' non échappés (XML invalide), namespacée ou non"""
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>',
+             f'<n1:informationTable xmlns:n1="{INFO_TABLE_NS}">']
+    for i in range(rows):
+        parts.append(
+            f"<n1:infoTable><n1:nameOfIssuer>AT&T HOLDING {i}</n1:nameOfIssuer>"
+            f"<n1:titleOfClass>COM</n1:titleOfClass><n1:cusip>{i:09d}</n1:cusip>"
+            f"<n1:value>{(i + 1) * 1000}</n1:value>"
+            f"<n1:shrsOrPrnAmt><n1:sshPrnamt>{(i + 1) * 10}</n1:sshPrnamt><n1:sshPrnamtType>SH</n1:sshPrnamtType></n1:shrsOrPrnAmt>"
+            f"<n1:investmentDiscretion>SOLE</n1:investmentDiscretion>"
+            f"<n1:votingAuthority><n1:Sole>{i}</n1:Sole><n1:Shared>0</n1:Shared><n1:None>0</n1:None></n1:votingAuthority>"
+            f"</n1:infoTable>"
+        )
+    parts.append("</n1:informationTable>")
+    return "\n".join(parts).replace("n1:", prefix)
+
+
+# Chemins de parsing mesurés: contenu (str) → HoldingsTable
+
+def bench_parse_13f_file(content: str):
+    return index.parse_13f_file(content, "bench")
+
+
+def bench_etree(content: str):
+    root = ET.fromstring(content)
+    info_tables = [elem for elem in root.iter()
+                   if elem.tag.rsplit("}", 1)[-1].lower() == "infotable"]
+    return index.parse_holdings_from_etree(info_tables)
+
+
+def bench_beautifulsoup(content: str):
+    soup = BeautifulSoup(content, "html.parser")
+    info_tables = [t for t in soup.find_all(True) if t.name and t.name.rsplit(":", 1)[-1].lower() == "infotable"]
+    return index.parse_holdings_from_beautifulsoup(info_tables)
+
+
+def bench_stream(data: bytes):
+    # BytesIO partage le buffer des bytes: pas de copie de l'entrée dans la mesure
+    return index.parse_13f_stream(io.BytesIO(data), "bench")
+
+
+def bench_tolerant(content: str):
+    return parse_holdings_tolerant(content).finalize(index.extract_ticker)
+
+
+PARSER_PATHS = {
+    "parse_13f_file": bench_parse_13f_file,
+    "etree": bench_etree,
+    "beautifulsoup": bench_beautifulsoup,
+    "stream": bench_stream,
+    "tolerant": bench_tolerant,
+}
+
+# Entrée préparée hors mesure (temps et pic mémoire): le flux lit des bytes, pas le str
+PREPARE = {
+    "stream": lambda content: content.encode("utf-8"),
+}
+
+# Chemins sans objet pour une variante (le HTML n'est pas du XML bien formé)
+SKIPPED = {("etree", "html")}
+
+
+def legacy_beautifulsoup_fallback(content: str):
+    """Ancien Method 2 de parse_13f_file (DOM BeautifulSoup complet)"""
+    soup = BeautifulSoup(content, "html.parser")
+    all_elements = soup.find_all(True, recursive=True)
+    info_tables = [t for t in all_elements if t.name and t.name.lower() == "infotable"]
+    if not info_tables:
+        info_tables = soup.find_all(["infoTable", "InfoTable", "infotable"])
+    return index.parse_holdings_from_beautifulsoup(info_tables)
+
+
+def tolerant_fallback(content: str):
+    return parse_holdings_tolerant(content).finalize(index.extract_ticker)
+
+
+def measure(parser, content, rows: int, repeat: int, check: bool = True) -> dict:
+    """
+    Meilleur temps sur `repeat` exécutions, puis pic tracemalloc sur une exécution dédiée
+    content: entrée déjà préparée pour le parser (voir PREPARE)
+    check: le parser doit retrouver toutes les lignes (sinon la mesure ne vaut rien)
+    """
+    best = None
+    count = 0
+    for _ in range(repeat):
+        gc.collect()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            holdings = parser(content)
+            elapsed = time.perf_counter() - start
+        count = len(holdings)
+        del holdings
+        best = elapsed if best is None else min(best, elapsed)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            holdings = parser(content)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del holdings
+
+    if check and count != rows:
+        raise AssertionError(f"{count} holdings parsés pour {rows} lignes")
+    return {
+        "rows": rows,
+        "holdings": count,
+        "seconds": round(best, 6),
+        "rows_per_sec": round(rows / max(best, 1e-9), 1),
+        "peak_bytes": peak,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Régressions au-delà du seuil (%) par rapport à la baseline"""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        speed_loss = 100 * (1 - result["rows_per_sec"] / base["rows_per_sec"])
+        memory_gain = 100 * (result["peak_bytes"] / max(base["peak_bytes"], 1) - 1)
+        if speed_loss > threshold:
+            regressions.append(f"{key}: débit -{speed_loss:.0f}% "
+                               f"({base['rows_per_sec']:,.0f} → {result['rows_per_sec']:,.0f} rows/s)")
+        if memory_gain > threshold:
+            regressions.append(f"{key}: mémoire +{memory_gain:.0f}% "
+                               f"({base['peak_bytes'] / 1e6:.1f} → {result['peak_bytes'] / 1e6:.1f} MB)")
+    return regressions
+
+
+def run_malformed(sizes):
+    for rows in sizes:
+        for label, prefix in (("sans namespace", ""), ("namespace n1:", "n1:")):
+            content = build_malformed_info_table(rows, prefix)
+            print(f"📄 {rows} lignes, {label} ({len(content) / 1_000_000:.1f} MB, XML invalide)")
+            legacy = measure(legacy_beautifulsoup_fallback, content, rows, 1, check=False)
+            tolerant = measure(tolerant_fallback, content, rows, 1, check=False)
+            for name, result in (("BeautifulSoup (ancien)", legacy), ("Tokenizer tolérant", tolerant)):
+                print(f"  {name:<28} {result['holdings']:>7} holdings  {result['seconds']:8.3f}s  {result['rows_per_sec']:>10,.0f} rows/s"
+                      f"  {result['peak_bytes'] / 1e6:8.1f} MB")
+            print(f"  ⚡ Speedup: x{legacy['seconds'] / tolerant['seconds']:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default=DEFAULT_ROWS, help="Tailles à tester, séparées par des virgules")
+    parser.add_argument("--paths", default=",".join(PARSER_PATHS), help="Chemins de parsing à mesurer")
+    parser.add_argument("--variants", default=",".join(VARIANTS), help="Variantes de fixtures (plain, namespaced, html)")
+    parser.add_argument("--repeat", type=int, default=3, help="Exécutions chronométrées par mesure (meilleur temps)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Fichier JSON de baseline")
+    parser.add_argument("--save", action="store_true", help="Écrire les résultats comme baseline")
+    parser.add_argument("--compare", action="store_true", help="Comparer à la baseline, échouer en cas de régression")
+    parser.add_argument("--threshold", type=float, default=20.0, help="Régression tolérée en %% (débit et mémoire)")
+    parser.add_argument("--malformed", action="store_true", help="Comparer aussi tolérant vs BeautifulSoup sur XML invalide")
+    args = parser.parse_args()
+
+    import warnings
+    warnings.filterwarnings("ignore")
+
+    sizes = [int(r) for r in args.rows.split(",")]
+    paths = [p for p in args.paths.split(",") if p]
+    variants = [v for v in args.variants.split(",") if v]
+    unknown = [p for p in paths if p not in PARSER_PATHS] + [v for v in variants if v not in VARIANTS]
+    if unknown:
+        parser.error(f"Chemins ou variantes inconnus: {', '.join(unknown)}")
+
+    results = {}
+    for rows in sizes:
+        for variant in variants:
+            content = build_info_table(rows, variant)
+            print(f"📄 {rows} lignes, {variant} ({len(content) / 1_000_000:.1f} MB)")
+            for path in paths:
+                if (path, variant) in SKIPPED:
+                    continue
+                prepared = PREPARE[path](content) if path in PREPARE else content
+                result = measure(PARSER_PATHS[path], prepared, rows, args.repeat)
+                del prepared
+                results[f"{path}/{variant}/{rows}"] = result
+                print(f"  {path:<16} {result['seconds']:8.3f}s  {result['rows_per_sec']:>10,.0f} rows/s"
+                      f"  {result['peak_bytes'] / 1e6:8.1f} MB")
+            del content
+
+    if args.malformed:
+        run_malformed(sizes)
+
+    exit_code = 0
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"❌ Baseline absente: {args.baseline}")
+            print("   Aucune baseline n'est versionnée: la générer d'abord sur cette machine avec --save")
+            sys.exit(2)
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        print("")
+        print("═══════════════════════════════════════════════════════════")
+        if regressions:
+            print(f"❌ {len(regressions)} régression(s) au-delà de {args.threshold:.0f}%:")
+            for regression in regressions:
+                print(f"   {regression}")
+            exit_code = 1
+        else:
+            print(f"✅ Aucune régression au-delà de {args.threshold:.0f}% ({len(results)} mesures)")
+        print("═══════════════════════════════════════════════════════════")
+
+    if args.save:
+        baseline = {"python": sys.version.split()[0], "repeat": args.repeat, "results": results}
+        if os.path.exists(args.baseline):
+            # Conserver les mesures non relancées (autres tailles / chemins)
+            with open(args.baseline) as f:
+                previous = json.load(f).get("results", {})
+            baseline["results"] = {**previous, **results}
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"💾 Baseline écrite: {args.baseline}")
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,16 @@
 #!/bin/bash
 # Script pour builder le package Lambda Python
 # Utilise Docker pour garantir des binaires Linux compatibles avec Lambda
+# --slim: n'embarquer que les paquets importés par le handler (scripts/slim_bundle.py)
+# Mesure du cold start: python3 scripts/profile_imports.py ../parser-13f.zip
 
 set -e
 
+SLIM=false
+if [ "$1" = "--slim" ]; then
+    SLIM=true
+fi
+
 echo "📦 Building parser-13f Lambda package avec Docker (Linux)..."
 
 # Aller dans le répertoire du parser
@@ -11,10 +18,18 @@ cd "$(dirname "$0")/.."
 
 # Nettoyer les anciens fichiers
 rm -rf ../parser-13f.zip
-rm -rf index.py
+for module in src/*.py; do
+    rm -f "$(basename "$module")"
+done
 
-# Copier index.py à la racine pour Lambda handler
-cp src/index.py index.py
+# Copier les modules Python (index.py + modules partagés) à la racine pour Lambda handler
+cp src/*.py .
+
+# Données locales (fichier securities CUSIP → ticker) si présentes
+if [ -d src/data ]; then
+    rm -rf data
+    cp -R src/data data
+fi
 
 # Vérifier si Docker est disponible et fonctionne
 USE_DOCKER=false
@@ -63,7 +78,8 @@ if [ "$USE_DOCKER" != "true" ]; then
     pip install --platform linux_x86_64 --only-binary=:all: -r requirements.txt -t . --python-version 3.11 2>/dev/null || \
     pip install -r requirements.txt -t .
     
-    # Créer le zip
+    # Créer le zip (le bundle minimal est écrit plus bas)
+    if [ "$SLIM" != "true" ]; then
     zip -r ../parser-13f.zip . \
         -x "*.git*" \
         -x "*.zip" \
@@ -79,11 +95,18 @@ if [ "$USE_DOCKER" != "true" ]; then
         -x "scripts/*" \
         -x "src/*" \
         -x "package.json"
+    fi
     
     deactivate
     rm -rf venv
 fi
 
+if [ "$SLIM" = "true" ]; then
+    echo "✂️  Bundle minimal: paquets atteignables depuis les modules du handler"
+    rm -f ../parser-13f.zip
+    python3 scripts/slim_bundle.py --root . --output ../parser-13f.zip
+fi
+
 echo "✅ Package créé: parser-13f.zip"
 echo "📋 Taille: $(du -h ../parser-13f.zip | cut -f1)"
 
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Profil du coût d'import au cold start d'un bundle Lambda parser-13f
+Chaque bundle (zip ou répertoire) est extrait dans un répertoire temporaire,
+puis `import index` est exécuté --runs fois dans un interpréteur neuf
+(-X importtime, -I -S: sans site-packages de la machine, -B: sans bytecode
+écrit, comme /var/task en lecture seule sur Lambda). Rapport par bundle:
+taille du zip, temps d'extraction, temps d'import et de process (médianes),
+coût par paquet de premier niveau (self cumulé de ses modules) et modules
+les plus chers (cumulative). Un import de tous les modules du handler
+vérifie ensuite que le bundle est complet.
+
+--save écrit le profil en JSON (un module par ligne: self/cumulative en µs)
+pour comparer deux builds dans le temps.
+
+Usage:
+  python3 scripts/profile_imports.py ../parser-13f.zip
+  python3 scripts/profile_imports.py /tmp/parser-13f-full.zip ../parser-13f.zip --runs 10
+  python3 scripts/profile_imports.py . --top 30 --save /tmp/imports.json
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from collections import defaultdict
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+# Import du handler puis vérification des modules importés paresseusement
+PROFILE_CODE = "import sys; sys.path.insert(0, {root!r}); import index"
+CHECK_CODE = ("import os, sys; sys.path.insert(0, {root!r}); "
+              "[__import__(n[:-3]) for n in sorted(os.listdir({root!r})) if n.endswith('.py')]")
+
+
+def extract(bundle: str, workdir: str):
+    """(répertoire du bundle, taille du zip ou None, secondes d'extraction)"""
+    if os.path.isdir(bundle):
+        return os.path.abspath(bundle), None, 0.0
+    target = os.path.join(workdir, os.path.basename(bundle))
+    start = time.perf_counter()
+    with zipfile.ZipFile(bundle) as archive:
+        archive.extractall(target)
+    return target, os.path.getsize(bundle), time.perf_counter() - start
+
+
+def run_python(code: str, env: dict):
+    return subprocess.run([sys.executable, "-I", "-S", "-B", "-X", "importtime", "-c", code],
+                          capture_output=True, text=True, env=env)
+
+
+def parse_importtime(stderr: str) -> dict:
+    """module → (self µs, cumulative µs)"""
+    modules = {}
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return modules
+
+
+def profile_bundle(root: str, runs: int) -> dict:
+    env = {"PATH": os.environ.get("PATH", ""), "RAW_ARCHIVE_URI": "none"}
+    import_ms, process_ms, profiles = [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = run_python(PROFILE_CODE.format(root=root), env)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            raise RuntimeError(f"import index a échoué:\n{result.stderr.strip().splitlines()[-1]}")
+        modules = parse_importtime(result.stderr)
+        process_ms.append(elapsed * 1000)
+        import_ms.append(modules.get("index", (0, 0))[1] / 1000)
+        profiles.append(modules)
+
+    # Profil médian par module (les runs diffèrent par le bruit, pas par les modules)
+    names = set().union(*profiles)
+    modules = {}
+    for name in names:
+        samples = [p[name] for p in profiles if name in p]
+        modules[name] = (statistics.median(s[0] for s in samples), statistics.median(s[1] for s in samples))
+
+    check = run_python(CHECK_CODE.format(root=root), env)
+    return {
+        "import_ms": statistics.median(import_ms),
+        "process_ms": statistics.median(process_ms),
+        "modules": modules,
+        "complete": check.returncode == 0,
+        "check_error": check.stderr.strip().splitlines()[-1] if check.returncode else None,
+    }
+
+
+def packages(modules: dict) -> dict:
+    """Paquet de premier niveau → (modules importés, self cumulé en µs)"""
+    totals = defaultdict(lambda: [0, 0])
+    for name, (self_us, _) in modules.items():
+        total = totals[name.split(".")[0]]
+        total[0] += 1
+        total[1] += self_us
+    return totals
+
+
+def file_stats(root: str):
+    count, size = 0, 0
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            count += 1
+            size += os.path.getsize(os.path.join(directory, filename))
+    return count, size
+
+
+def print_profile(bundle: str, info: dict, top: int):
+    print(f"\n📦 {bundle}")
+    zip_size = f"{info['zip_bytes'] / 1024:,.0f} Ko zip, " if info["zip_bytes"] else ""
+    print(f"   {zip_size}{info['files']} fichiers, {info['extracted_bytes'] / 1024:,.0f} Ko extraits, "
+          f"extraction {info['extract_ms']:.0f} ms")
+    print(f"   import index: {info['import_ms']:.0f} ms (médiane), process complet {info['process_ms']:.0f} ms, "
+          f"{len(info['modules'])} modules")
+    if not info["complete"]:
+        print(f"   ❌ Bundle incomplet: {info['check_error']}")
+
+    print(f"   {'Paquet':<24}{'modules':>8}{'self ms':>10}")
+    ranked = sorted(packages(info["modules"]).items(), key=lambda item: -item[1][1])
+    for name, (count, self_us) in ranked[:top]:
+        print(f"   {name:<24}{count:>8}{self_us / 1000:>10.1f}")
+
+    print(f"   {'Module':<40}{'cumulative ms':>14}")
+    for name, (_, cumulative) in sorted(info["modules"].items(), key=lambda item: -item[1][1])[:top]:
+        print(f"   {name:<40}{cumulative / 1000:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("bundles", nargs="+", help="Zips ou répertoires à profiler (le premier sert de référence)")
+    parser.add_argument("--runs", type=int, default=5, help="Interpréteurs neufs par bundle")
+    parser.add_argument("--top", type=int, default=15, help="Paquets et modules affichés")
+    parser.add_argument("--save", help="Écrire les profils en JSON")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="profile-imports-")
+    results = {}
+    try:
+        for bundle in args.bundles:
+            root, zip_bytes, extract_seconds = extract(bundle, workdir)
+            files, extracted_bytes = file_stats(root)
+            info = profile_bundle(root, args.runs)
+            info.update(zip_bytes=zip_bytes, files=files, extracted_bytes=extracted_bytes,
+                        extract_ms=extract_seconds * 1000)
+            results[bundle] = info
+            print_profile(bundle, info, args.top)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if len(results) > 1:
+        reference_name, reference = next(iter(results.items()))
+        print("")
+        print("═══════════════════════════════════════════════════════════")
+        print(f"Comparaison avec {reference_name}")
+        for bundle, info in list(results.items())[1:]:
+            def delta(key):
+                if not reference[key]:
+                    return "n/a"
+                return f"{(info[key] - reference[key]) / reference[key] * 100:+.0f}%"
+            print(f"   {bundle}: zip {delta('zip_bytes')}, fichiers {delta('files')}, "
+                  f"extraction {delta('extract_ms')}, import {delta('import_ms')}, process {delta('process_ms')}")
+        print("═══════════════════════════════════════════════════════════")
+
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump({bundle: {**info, "modules": {name: list(times) for name, times in info["modules"].items()}}
+                       for bundle, info in results.items()}, output, indent=1)
+        print(f"💾 Profils sauvés dans {args.save}")
+
+    if not all(info["complete"] for info in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Bundle Lambda minimal de parser-13f (build.sh --slim)
+Les modules de src/ sont les points d'entrée (index.handler et les modules
+qu'il importe, y compris ceux importés paresseusement comme async_pipeline).
+ModuleFinder suit leurs imports statiques; chaque paquet de premier niveau
+atteint depuis le répertoire du worker (pip install -t .) est embarqué en
+entier (fichiers de données et imports dynamiques internes compris, ex:
+anyio._backends, certifi/cacert.pem). Les paquets vendorisés que le handler
+n'importe pas (pydantic, supabase, gotrue, realtime, websockets, storage3,
+postgrest, ...) restent hors du zip.
+
+--full produit le zip complet (tous les paquets, comme build.sh sans --slim)
+pour comparer les deux avec scripts/profile_imports.py.
+
+Usage:
+  python3 scripts/slim_bundle.py --output ../parser-13f.zip
+  python3 scripts/slim_bundle.py --list
+  python3 scripts/slim_bundle.py --full --output /tmp/parser-13f-full.zip
+"""
+
+import argparse
+import modulefinder
+import os
+import sys
+import sysconfig
+import zipfile
+
+WORKER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(WORKER_DIR, "src")
+
+# Jamais embarqués (outillage du build et du dépôt)
+EXCLUDED_TOP_LEVEL = {"src", "scripts", "bin", "package", "venv", "data", "__pycache__", "pip", "setuptools",
+                      "wheel", "package.json", "requirements.txt"}
+# Date fixe: deux builds des mêmes sources donnent le même zip
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def entry_modules() -> list:
+    return sorted(name for name in os.listdir(SRC_DIR) if name.endswith(".py"))
+
+
+def stdlib_paths() -> list:
+    paths = sysconfig.get_paths()
+    return [paths["stdlib"], paths["platstdlib"]] + [p for p in sys.path if p.endswith("lib-dynload")]
+
+
+def top_level_units(root: str) -> dict:
+    """Paquet / module de premier niveau installé dans root → taille en octets"""
+    entries = set(entry_modules())
+    units = {}
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if (name in EXCLUDED_TOP_LEVEL or name in entries or name.startswith(".") or name.endswith(".zip")
+                or name.endswith(".dist-info")):
+            continue
+        if os.path.isdir(path):
+            units[name] = sum(size for _, size in walk_files(path, name))
+        elif name.endswith((".py", ".so")):
+            units[name] = os.path.getsize(path)
+    return units
+
+
+def walk_files(path: str, arcname: str):
+    """(chemin d'archive, taille) des fichiers d'un paquet, sans bytecode"""
+    for directory, dirnames, filenames in os.walk(path):
+        dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+        for filename in sorted(filenames):
+            if filename.endswith((".pyc", ".pyo")):
+                continue
+            full_path = os.path.join(directory, filename)
+            yield os.path.join(arcname, os.path.relpath(full_path, path)), os.path.getsize(full_path)
+
+
+def reachable_units(root: str) -> set:
+    """Unités de premier niveau de root importées (transitivement) depuis les modules de src/"""
+    finder = modulefinder.ModuleFinder(path=[SRC_DIR, root] + stdlib_paths())
+    for name in entry_modules():
+        finder.run_script(os.path.join(SRC_DIR, name))
+
+    root_prefix = os.path.abspath(root) + os.sep
+    units = set()
+    for module in finder.modules.values():
+        module_file = module.__file__ and os.path.abspath(module.__file__)
+        if not module_file or not module_file.startswith(root_prefix) or module_file.startswith(SRC_DIR + os.sep):
+            continue
+        units.add(os.path.relpath(module_file, root).split(os.sep)[0])
+    return units
+
+
+def write_zip(output: str, root: str, units: list):
+    count = 0
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as bundle:
+        files = [(os.path.join(SRC_DIR, name), name) for name in entry_modules()]
+        data_dir = os.path.join(SRC_DIR, "data")
+        if os.path.isdir(data_dir):
+            files += [(os.path.join(SRC_DIR, arcname), arcname) for arcname, _ in walk_files(data_dir, "data")]
+        for unit in units:
+            path = os.path.join(root, unit)
+            if os.path.isdir(path):
+                files += [(os.path.join(root, arcname), arcname) for arcname, _ in walk_files(path, unit)]
+            else:
+                files.append((path, unit))
+
+        for path, arcname in files:
+            info = zipfile.ZipInfo(arcname, ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            with open(path, "rb") as source:
+                bundle.writestr(info, source.read())
+            count += 1
+    return count
+
+
+def format_size(size: float) -> str:
+    for unit in ("o", "Ko", "Mo"):
+        if size < 1024 or unit == "Mo":
+            return f"{size:.0f} {unit}" if unit == "o" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", default=WORKER_DIR, help="Répertoire des dépendances installées (pip install -t)")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(WORKER_DIR), "parser-13f.zip"),
+                        help="Zip à écrire")
+    parser.add_argument("--full", action="store_true", help="Embarquer tous les paquets (zip complet de référence)")
+    parser.add_argument("--include", default="", help="Paquets à ajouter (imports dynamiques non détectés), séparés par ,")
+    parser.add_argument("--list", action="store_true", help="Afficher les paquets retenus / exclus sans écrire de zip")
+    args = parser.parse_args()
+
+    available = top_level_units(args.root)
+    if args.full:
+        selected = set(available)
+    else:
+        selected = (reachable_units(args.root) | {n for n in args.include.split(",") if n}) & set(available)
+    excluded = sorted(set(available) - selected)
+
+    print(f"📦 Modules du handler: {', '.join(entry_modules())}")
+    print(f"   Retenus ({len(selected)}, {format_size(sum(available[u] for u in selected))}): "
+          + ", ".join(sorted(selected)))
+    if excluded:
+        print(f"   Exclus  ({len(excluded)}, {format_size(sum(available[u] for u in excluded))}): "
+              + ", ".join(excluded))
+    if args.list:
+        return
+
+    count = write_zip(args.output, args.root, sorted(selected))
+    print(f"✅ {args.output}: {count} fichiers, {format_size(os.path.getsize(args.output))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""
+Pipeline asyncio du handler 13F (PARSER_13F_PIPELINE=async)
+Mêmes étapes que index.handler, mais les I/O indépendantes se chevauchent sur
+un httpx.AsyncClient:
+- listing de l'accession et lookup du filing (fund_filings) en parallèle
+- information table et cover page téléchargées en parallèle; le filing
+  précédent du fund et ses positions sont préchargés pendant le téléchargement
+- l'information table est lue en flux (archive brute, sinon réponse recopiée
+  dans un spool borné, archivée au passage): jamais entière en mémoire
+- les requêtes simultanées vers une même URL (listing, cover page) partagent
+  un seul téléchargement
+Le parsing (CPU) et les écritures (RPC, diff, statut) réutilisent le code sync
+dans un thread. La réponse porte elapsed_seconds, comparable au pipeline sync.
+Un batch (SQS ou tableau, voir batch_events) partage une seule boucle, un seul
+AsyncClient et la déduplication des téléchargements, BATCH_CONCURRENCY filings
+à la fois.
+"""
+
+import asyncio
+import json
+import tempfile
+import time
+
+import httpx
+
+import batch_events
+import http_client
+import index
+import raw_archive
+from holdings_diff import PositionSet
+
+
+def _read_archived(archive, url: str):
+    reader = archive.open(url)
+    if reader is None:
+        return None
+    try:
+        return reader.read(), reader.storage_path
+    finally:
+        reader.close()
+
+
+class AsyncFetcher:
+    """Téléchargements EDGAR asynchrones (archive brute d'abord), dédupliqués par URL en vol"""
+
+    def __init__(self, client: httpx.AsyncClient, headers: dict):
+        self.client = client
+        self.headers = headers
+        self.inflight = {}
+        self.deduplicated = 0
+
+    async def fetch(self, url: str, timeout: int = 30):
+        """(content, storage_path); un appel concurrent sur la même URL attend le même téléchargement"""
+        task = self.inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url, timeout))
+            self.inflight[url] = task
+            task.add_done_callback(lambda _: self.inflight.pop(url, None))
+        else:
+            self.deduplicated += 1
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url: str, timeout: int):
+        archive = raw_archive.get_archive()
+        if archive is not None:
+            try:
+                archived = await asyncio.to_thread(_read_archived, archive, url)
+                if archived is not None:
+                    print(f"[ARCHIVE] Hit: {url}")
+                    return archived
+            except Exception as e:
+                print(f"[ARCHIVE] Lecture impossible pour {url}: {e}")
+
+        response = await http_client.arequest(self.client, "GET", url, headers=self.headers, timeout=timeout)
+        response.raise_for_status()
+        content = response.content
+
+        storage_path = None
+        if archive is not None:
+            try:
+                storage_path = await asyncio.to_thread(archive.put, url, content)
+            except Exception as e:
+                print(f"[ARCHIVE] Écriture impossible pour {url}: {e}")
+        return content, storage_path
+
+    async def download(self, url: str, timeout: int = 120):
+        """Corps de la réponse recopié par morceaux dans un spool (sur disque au-delà de SPOOL_MAX_SIZE)"""
+        response = await http_client.arequest(self.client, "GET", url, headers=self.headers, timeout=timeout,
+                                              stream=True)
+        spool = tempfile.SpooledTemporaryFile(max_size=raw_archive.SPOOL_MAX_SIZE)
+        try:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(raw_archive.READ_CHUNK_SIZE):
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            raise
+        finally:
+            await response.aclose()
+        spool.seek(0)
+        return spool
+
+
+async def supabase_select(client: httpx.AsyncClient, table: str, params, page_size: int = 1000) -> list:
+    """Equivalent asynchrone de index.supabase_select (pagination limit/offset)"""
+    url = f"{index.SUPABASE_URL}/rest/v1/{table}"
+    headers = {"apikey": index.SUPABASE_KEY, "Authorization": f"Bearer {index.SUPABASE_KEY}"}
+    rows = []
+    while True:
+        response = await client.get(url, headers=headers, timeout=60,
+                                    params=list(params) + [("limit", str(page_size)), ("offset", str(len(rows)))])
+        response.raise_for_status()
+        page = response.json()
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
+
+async def supabase_select_one(client: httpx.AsyncClient, table: str, params):
+    """Equivalent asynchrone de index.supabase_select_one (une seule requête, limit=1)"""
+    url = f"{index.SUPABASE_URL}/rest/v1/{table}"
+    headers = {"apikey": index.SUPABASE_KEY, "Authorization": f"Bearer {index.SUPABASE_KEY}"}
+    response = await client.get(url, headers=headers, timeout=60, params=list(params) + [("limit", "1")])
+    response.raise_for_status()
+    rows = response.json()
+    return rows[0] if rows else None
+
+
+async def resolve_filing_documents(fetcher: AsyncFetcher, cik: str, accession_number: str, filing_url: str) -> dict:
+    """Même résolution que index.resolve_filing_documents (index.json, sinon page -index.htm)"""
+    cached = index._filing_documents_cache.get(accession_number)
+    if cached is not None:
+        return cached
+
+    base_url = index.accession_base_url(cik, accession_number)
+    documents = None
+    try:
+        listing, _ = await fetcher.fetch(f"{base_url}/index.json")
+        items = json.loads(listing).get("directory", {}).get("item", [])
+        documents = index.select_documents_from_listing(items, base_url)
+    except Exception as e:
+        print(f"index.json not usable for {accession_number}: {str(e)}")
+
+    if documents is None:
+        index_page, _ = await fetcher.fetch(filing_url)
+        documents = index.select_documents_from_index_page(index_page.decode("utf-8", errors="replace"), base_url)
+
+    if documents is None:
+        raise ValueError(f"Could not find XML file for filing {accession_number}")
+
+    index._filing_documents_cache[accession_number] = documents
+    return documents
+
+
+async def lookup_filing(client: httpx.AsyncClient, detail: dict) -> dict:
+    """Ligne fund_filings du filing (id, form_type, période, date de dépôt)"""
+    if detail.get("filing_id"):
+        filters = [("id", f"eq.{detail['filing_id']}")]
+    else:
+        filters = [("accession_number", f"eq.{detail['accession_number']}")]
+    filing = await supabase_select_one(client, "fund_filings",
+                                       [("select", "id,form_type,period_of_report,filing_date")] + filters)
+    if filing is None:
+        raise ValueError(f"Filing not found for accession_number: {detail['accession_number']}")
+    return filing
+
+
+async def read_cover_page(fetcher: AsyncFetcher, primary_doc_url) -> dict:
+    """Comme index.read_cover_page: {} si le document est introuvable ou illisible"""
+    if not primary_doc_url:
+        return {}
+    try:
+        content, _ = await fetcher.fetch(primary_doc_url)
+        return index.parse_cover_page(content.decode("utf-8", errors="replace"))
+    except Exception as e:
+        print(f"Cover page not usable ({primary_doc_url}): {str(e)}")
+        return {}
+
+
+async def prefetch_previous(client: httpx.AsyncClient, filing: dict, fund_id, cover_task) -> tuple:
+    """(filing précédent, ses positions) pour write_holdings_diff, ou (None, None)"""
+    cover = await cover_task
+    current = {"period_of_report": cover.get("period_of_report") or filing.get("period_of_report"),
+               "filing_date": filing.get("filing_date")}
+    params = index.previous_filing_params(filing["id"], fund_id, current)
+    if params is None:
+        return None, None
+    previous = await supabase_select_one(client, "fund_filings", params)
+    if previous is None:
+        return None, None
+    rows = await supabase_select(client, "fund_holdings", [
+        ("select", "ticker,cusip,shares,market_value,type"), ("filing_id", f"eq.{previous['id']}"), ("order", "id")
+    ])
+    return previous, PositionSet.from_rows(rows)
+
+
+async def fetch_info_table(fetcher: AsyncFetcher, url: str, timeout: int = 120) -> tuple:
+    """
+    (holdings, raw_storage_path) de l'information table, comme index.parse_13f_document:
+    archive brute lue en flux, sinon réponse recopiée dans un spool puis parsée en flux
+    et archivée au passage (index.parse_13f_source)
+    """
+    archive = raw_archive.get_archive()
+    if archive is not None:
+        try:
+            archived = await asyncio.to_thread(archive.open, url)
+        except Exception as e:
+            print(f"[ARCHIVE] Lecture impossible pour {url}: {e}")
+            archived = None
+        if archived is not None:
+            print(f"[ARCHIVE] Hit: {url}")
+            holdings = await asyncio.to_thread(index.parse_13f_archived, archived, url)
+            return holdings, archived.storage_path
+
+    spool = await fetcher.download(url, timeout)
+
+    def reread() -> bytes:
+        spool.seek(0)
+        return spool.read()
+
+    try:
+        return await asyncio.to_thread(index.parse_13f_source, spool, url, reread)
+    finally:
+        spool.close()
+
+
+def new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        http2=http_client.HTTP2_AVAILABLE and http_client.HTTP2_ENABLED,
+        limits=httpx.Limits(max_connections=http_client.HTTP_POOL_MAXSIZE,
+                            max_keepalive_connections=http_client.HTTP_POOL_MAXSIZE),
+        timeout=60,
+    )
+
+
+async def process_filing(detail: dict, client: httpx.AsyncClient, fetcher: AsyncFetcher) -> dict:
+    """Parser et écrire un filing; retourne la réponse du handler"""
+    start = time.perf_counter()
+    fund_id = detail["fund_id"]
+    cik = detail["cik"]
+    accession_number = detail["accession_number"]
+
+    tasks = []
+
+    def spawn(coroutine):
+        task = asyncio.ensure_future(coroutine)
+        tasks.append(task)
+        return task
+
+    try:
+        # 1. Listing de l'accession || ligne fund_filings
+        filing_task = spawn(lookup_filing(client, detail))
+        documents = await resolve_filing_documents(fetcher, cik, accession_number, detail["filing_url"])
+        xml_url = documents["info_table_url"]
+
+        # 2. Information table || cover page || filing précédent et ses positions
+        info_task = spawn(fetch_info_table(fetcher, xml_url))
+        cover_task = spawn(read_cover_page(fetcher, documents.get("primary_doc_url")))
+        filing = await filing_task
+        previous_task = spawn(prefetch_previous(client, filing, fund_id, cover_task))
+
+        holdings, raw_storage_path = await info_task
+        cover = await cover_task
+        prefetched = await previous_task
+
+        # 3. Écritures: mêmes fonctions que le pipeline sync
+        form_type = detail.get("form_type") or filing.get("form_type")
+        store_stats = await asyncio.to_thread(index.store_filing_holdings, filing["id"], fund_id, cik, form_type,
+                                              holdings, cover, prefetched, raw_storage_path)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    print(f"Successfully parsed {len(holdings)} holdings for filing {accession_number} "
+          f"(async, {fetcher.deduplicated} requêtes dédupliquées)")
+    return index.parsed_response(filing["id"], holdings, store_stats, "async", start)
+
+
+async def run_filing(detail: dict) -> dict:
+    async with new_client() as client:
+        fetcher = AsyncFetcher(client, {"User-Agent": index.SEC_USER_AGENT})
+        return await process_filing(detail, client, fetcher)
+
+
+def missing_fields_response(detail: dict):
+    if all([detail.get("fund_id"), detail.get("cik"), detail.get("accession_number"), detail.get("filing_url")]):
+        return None
+    return {
+        "statusCode": 400,
+        "body": json.dumps({"error": "Missing required fields"})
+    }
+
+
+async def run_batch(batch: list) -> list:
+    """Réponses des filings du batch, dans l'ordre; un échec n'interrompt pas les autres"""
+    semaphore = asyncio.Semaphore(batch_events.BATCH_CONCURRENCY)
+
+    async with new_client() as client:
+        fetcher = AsyncFetcher(client, {"User-Agent": index.SEC_USER_AGENT})
+
+        async def run_item(item_event):
+            detail = item_event.get("detail", {})
+            invalid = missing_fields_response(detail)
+            if invalid is not None:
+                return invalid
+            async with semaphore:
+                try:
+                    return await process_filing(detail, client, fetcher)
+                except Exception as e:
+                    return index.failed_response(detail.get("accession_number"), e)
+
+        return await asyncio.gather(*(run_item(item_event) for _, item_event in batch))
+
+
+def handle_batch(event) -> dict:
+    """Batch SQS ou tableau d'events traité dans une seule boucle asyncio"""
+    batch = batch_events.items(event)
+    if not index.SUPABASE_URL or not index.SUPABASE_KEY:
+        error = {"statusCode": 500,
+                 "body": json.dumps({"error": "Missing SUPABASE_URL or SUPABASE_SERVICE_KEY environment variables"})}
+        return batch_events.report(event, batch, [error] * len(batch))
+    return batch_events.report(event, batch, asyncio.run(run_batch(batch)))
+
+
+def handler(event, context):
+    """Handler Lambda du pipeline asyncio (même format d'event que index.handler)"""
+    detail = event.get("detail", {})
+    invalid = missing_fields_response(detail)
+    if invalid is not None:
+        return invalid
+
+    try:
+        if not index.SUPABASE_URL or not index.SUPABASE_KEY:
+            raise ValueError("Missing SUPABASE_URL or SUPABASE_SERVICE_KEY environment variables")
+        return asyncio.run(run_filing(detail))
+    except Exception as e:
+        return index.failed_response(detail.get("accession_number"), e)
@@ -0,0 +1,122 @@
+"""
+Index CUSIP → ticker pour les holdings 13F
+Construit paresseusement depuis un fichier local de securities (CSV avec au
+moins une colonne cusip et une colonne ticker/symbol), puis persisté dans /tmp
+(marshal) pour que les conteneurs à chaud ne le reconstruisent pas.
+
+Lookup O(1):
+1. CUSIP complet (8 premiers caractères: émetteur + émission, sans check digit)
+2. Préfixe émetteur (6 caractères), en privilégiant l'action ordinaire
+"""
+
+import csv
+import marshal
+import os
+import threading
+
+CUSIP_TICKER_FILE = os.environ.get(
+    "CUSIP_TICKER_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "cusip_tickers.csv")
+)
+CUSIP_INDEX_CACHE = os.environ.get("CUSIP_INDEX_CACHE", "/tmp/cusip_ticker_index.marshal")
+
+INDEX_FORMAT_VERSION = 1
+CUSIP_COLUMNS = ("cusip", "cusip9", "cusip_number")
+TICKER_COLUMNS = ("ticker", "symbol", "ticker_symbol")
+
+_by_issue = None
+_by_issuer = None
+# Chargement unique même si plusieurs filings d'un batch résolvent des tickers en parallèle
+_load_lock = threading.Lock()
+
+
+def _source_signature(path: str):
+    stat = os.stat(path)
+    return [INDEX_FORMAT_VERSION, path, stat.st_size, int(stat.st_mtime)]
+
+
+def _find_column(fieldnames, candidates):
+    for name in fieldnames:
+        if name and name.strip().lower() in candidates:
+            return name
+    return None
+
+
+def build_index(path: str):
+    """
+    Construire les deux tables (émission 8 car., émetteur 6 car.) depuis le CSV
+    Pour le préfixe émetteur, une émission "10" (action ordinaire) l'emporte
+    sur les autres classes (obligations, warrants, préférentielles).
+    """
+    by_issue = {}
+    by_issuer = {}
+    issuer_is_common = {}
+
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        reader = csv.DictReader(f)
+        cusip_col = _find_column(reader.fieldnames or [], CUSIP_COLUMNS)
+        ticker_col = _find_column(reader.fieldnames or [], TICKER_COLUMNS)
+        if not cusip_col or not ticker_col:
+            raise ValueError(f"{path}: colonnes cusip/ticker introuvables ({reader.fieldnames})")
+
+        for row in reader:
+            cusip = (row.get(cusip_col) or "").strip().upper()
+            ticker = (row.get(ticker_col) or "").strip().upper()
+            if len(cusip) < 8 or not ticker:
+                continue
+
+            issue_key = cusip[:8]
+            by_issue.setdefault(issue_key, ticker)
+
+            issuer_key = cusip[:6]
+            is_common = cusip[6:8] == "10"
+            if issuer_key not in by_issuer or (is_common and not issuer_is_common[issuer_key]):
+                by_issuer[issuer_key] = ticker
+                issuer_is_common[issuer_key] = is_common
+
+    return by_issue, by_issuer
+
+
+def _load():
+    """Charger l'index (cache /tmp si à jour, sinon reconstruction depuis le CSV)"""
+    global _by_issue, _by_issuer
+
+    if not os.path.exists(CUSIP_TICKER_FILE):
+        print(f"[CUSIP] Fichier {CUSIP_TICKER_FILE} absent, pas de mapping CUSIP → ticker")
+        _by_issuer, _by_issue = {}, {}
+        return
+
+    signature = _source_signature(CUSIP_TICKER_FILE)
+    try:
+        with open(CUSIP_INDEX_CACHE, "rb") as f:
+            cached_signature, by_issue, by_issuer = marshal.load(f)
+        if cached_signature == signature:
+            _by_issuer, _by_issue = by_issuer, by_issue
+            print(f"[CUSIP] Index chargé depuis {CUSIP_INDEX_CACHE} ({len(by_issue)} CUSIP)")
+            return
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    by_issue, by_issuer = build_index(CUSIP_TICKER_FILE)
+    _by_issuer, _by_issue = by_issuer, by_issue
+    print(f"[CUSIP] Index construit depuis {CUSIP_TICKER_FILE} ({len(by_issue)} CUSIP, {len(by_issuer)} émetteurs)")
+
+    try:
+        tmp_path = f"{CUSIP_INDEX_CACHE}.{os.getpid()}"
+        with open(tmp_path, "wb") as f:
+            marshal.dump([signature, by_issue, by_issuer], f)
+        os.replace(tmp_path, CUSIP_INDEX_CACHE)
+    except OSError as e:
+        print(f"[CUSIP] Impossible de persister l'index: {e}")
+
+
+def lookup_ticker(cusip: str):
+    """Retourner le ticker d'un CUSIP (émission exacte puis préfixe émetteur), ou None"""
+    if _by_issue is None:
+        with _load_lock:
+            if _by_issue is None:
+                _load()
+    if not cusip:
+        return None
+    cusip = cusip.strip().upper()
+    return _by_issue.get(cusip[:8]) or _by_issuer.get(cusip[:6])
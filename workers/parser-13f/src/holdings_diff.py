@@ -0,0 +1,116 @@
+"""
+Diff des holdings 13F entre deux filings d'un même fund (fund_holdings_diff)
+Les deux filings sont agrégés par clé (cusip, type) en colonnes, triés une
+fois puis parcourus en merge join: O(n log n) par filing, aucune requête par
+ticker. Les positions inchangées ne produisent pas de ligne.
+"""
+
+from array import array
+
+from holdings_table import HOLDING_TYPES, TYPE_CODES
+
+
+class PositionSet:
+    """Positions d'un filing agrégées par (cusip, type), triées par clé"""
+
+    __slots__ = ("keys", "ticker", "shares", "value", "total_value")
+
+    def __init__(self, positions: dict):
+        # positions: {(cusip, type_code): [ticker, shares, value]}
+        self.keys = sorted(positions)
+        self.ticker = [positions[key][0] for key in self.keys]
+        self.shares = array("q", [positions[key][1] for key in self.keys])
+        self.value = array("q", [positions[key][2] for key in self.keys])
+        self.total_value = sum(self.value)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_table(cls, holdings):
+        """Depuis une HoldingsTable finalisée (filing en cours de parsing)"""
+        return cls._aggregate(zip(holdings.cusip, holdings.type_code, holdings.ticker,
+                                  holdings.shares, holdings.value))
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Depuis des lignes fund_holdings (ticker, cusip, shares, market_value, type)"""
+        return cls._aggregate(
+            (row.get("cusip") or "", TYPE_CODES.get(row.get("type"), 0), row.get("ticker") or "",
+             row.get("shares") or 0, row.get("market_value") or 0)
+            for row in rows
+        )
+
+    @classmethod
+    def _aggregate(cls, items):
+        positions = {}
+        for cusip, type_code, ticker, shares, value in items:
+            position = positions.get((cusip, type_code))
+            if position is None:
+                positions[(cusip, type_code)] = [ticker, shares, value]
+            else:
+                position[1] += shares
+                position[2] += value
+        return cls(positions)
+
+
+def position_action(new_shares: int, old_shares: int):
+    """new / exit / increase / decrease, ou None si la position est inchangée"""
+    if old_shares == 0 and new_shares > 0:
+        return "new"
+    if new_shares == 0 and old_shares > 0:
+        return "exit"
+    if new_shares > old_shares:
+        return "increase"
+    if new_shares < old_shares:
+        return "decrease"
+    return None
+
+
+def _diff_row(ticker, cusip, type_code, new_shares, new_value, old_shares, old_value):
+    action = position_action(new_shares, old_shares)
+    if action is None:
+        return None
+    diff_shares = new_shares - old_shares
+    return {
+        "ticker": ticker,
+        "cusip": cusip,
+        "type": HOLDING_TYPES[type_code],
+        "diff_shares": diff_shares,
+        "diff_value": new_value - old_value,
+        "diff_pct_shares": round(diff_shares * 100 / old_shares, 2) if old_shares else None,
+        "action": action
+    }
+
+
+def merge_positions(new: PositionSet, old: PositionSet):
+    """
+    Merge join des deux ensembles triés
+    Génère (cusip, type_code, ticker, new_shares, new_value, old_shares, old_value)
+    pour chaque clé présente d'un côté ou de l'autre (0 pour le côté absent).
+    """
+    i = j = 0
+    new_count, old_count = len(new), len(old)
+    while i < new_count or j < old_count:
+        if j >= old_count or (i < new_count and new.keys[i] < old.keys[j]):
+            cusip, type_code = new.keys[i]
+            yield cusip, type_code, new.ticker[i], new.shares[i], new.value[i], 0, 0
+            i += 1
+        elif i >= new_count or old.keys[j] < new.keys[i]:
+            cusip, type_code = old.keys[j]
+            yield cusip, type_code, old.ticker[j], 0, 0, old.shares[j], old.value[j]
+            j += 1
+        else:
+            cusip, type_code = new.keys[i]
+            yield (cusip, type_code, new.ticker[i] or old.ticker[j],
+                   new.shares[i], new.value[i], old.shares[j], old.value[j])
+            i += 1
+            j += 1
+
+
+def diff_positions(new: PositionSet, old: PositionSet):
+    """Une ligne fund_holdings_diff par position nouvelle, sortie, renforcée ou allégée"""
+    for cusip, type_code, ticker, new_shares, new_value, old_shares, old_value in merge_positions(new, old):
+        row = _diff_row(ticker, cusip, type_code, new_shares, new_value, old_shares, old_value)
+        if row is not None:
+            yield row
@@ -0,0 +1,177 @@
+"""
+Table de holdings 13F en colonnes
+Une colonne par champ (array pour les numériques, listes de chaînes internées
+pour les identifiants) au lieu d'un dict par ligne. La normalisation des unités
+et la résolution des tickers se font en une passe sur toute la table.
+"""
+
+import itertools
+import sys
+from array import array
+
+HOLDING_TYPES = ("stock", "call", "put")
+TYPE_CODES = {"stock": 0, "call": 1, "put": 2}
+
+
+def _parse_amount(text: str) -> int:
+    return int(float(text.replace(",", ""))) if text else 0
+
+
+class HoldingsTable:
+    """
+    Holdings d'un filing en colonnes: issuer, cusip, ticker, shares, value, type
+    `value` contient la valeur déclarée jusqu'à finalize(), puis la valeur
+    normalisée (milliers de dollars) exposée comme market_value.
+    """
+
+    __slots__ = ("issuer", "cusip", "ticker", "shares", "value", "type_code", "discretion", "other_manager",
+                 "breakdown", "finalized")
+
+    def __init__(self):
+        self.issuer = []
+        self.cusip = []
+        self.ticker = []
+        self.shares = array("q")
+        self.value = array("q")
+        self.type_code = array("b")
+        self.discretion = []
+        self.other_manager = []
+        self.breakdown = None
+        self.finalized = False
+
+    def __len__(self) -> int:
+        return len(self.cusip)
+
+    def append(self, issuer: str, cusip: str, value_text: str, shares_text: str, put_call: str,
+               discretion: str = "", other_manager: str = ""):
+        """Ajouter une ligne depuis les textes bruts d'un infoTable"""
+        try:
+            value = _parse_amount(value_text)
+            shares = _parse_amount(shares_text)
+        except (ValueError, OverflowError):
+            value = 0
+            shares = 0
+
+        put_call = put_call.upper()
+        type_code = 2 if put_call == "PUT" else (1 if put_call == "CALL" else 0)
+
+        self.issuer.append(sys.intern(issuer))
+        self.cusip.append(sys.intern(cusip))
+        self.shares.append(shares)
+        self.value.append(value)
+        self.type_code.append(type_code)
+        self.discretion.append(sys.intern(discretion))
+        self.other_manager.append(sys.intern(other_manager))
+
+    def finalize(self, ticker_resolver):
+        """
+        Passe unique sur la table complète:
+        - unités: si value > 1M et prix implicite (value * 1000 / shares) > 1000$,
+          la valeur est en dollars et est convertie en milliers
+        - tickers: un appel au resolver par couple (issuer, cusip) distinct
+        """
+        if self.finalized:
+            return self
+
+        self.value = array("q", [
+            value // 1000 if value > 1_000_000 and shares > 0 and value > shares else value
+            for value, shares in zip(self.value, self.shares)
+        ])
+
+        resolved = {}
+        tickers = []
+        for issuer, cusip in zip(self.issuer, self.cusip):
+            key = (issuer, cusip)
+            ticker = resolved.get(key)
+            if ticker is None:
+                ticker = resolved[key] = sys.intern(ticker_resolver(issuer, cusip))
+            tickers.append(ticker)
+        self.ticker = tickers
+
+        self.finalized = True
+        return self
+
+    def collapse(self):
+        """
+        Agréger les lignes d'une même clé (cusip, type) en une passe de hash
+        Les 13F répètent un CUSIP par discrétion d'investissement / autre gestionnaire:
+        parts et valeurs sont sommées, le détail ligne à ligne est gardé dans
+        `breakdown` ([[discretion, other_manager, shares, value], ...]) pour les
+        clés agrégées seulement. À appeler après finalize(). Retourne (avant, après).
+        """
+        before = len(self)
+        groups = {}
+        for row, key in enumerate(zip(self.cusip, self.type_code)):
+            rows = groups.get(key)
+            if rows is None:
+                groups[key] = [row]
+            else:
+                rows.append(row)
+
+        if len(groups) == before:
+            return before, before
+
+        issuer, cusip, ticker, discretion, other_manager, breakdown = [], [], [], [], [], []
+        shares, value, type_code = array("q"), array("q"), array("b")
+        for rows in groups.values():
+            first = rows[0]
+            issuer.append(self.issuer[first])
+            cusip.append(self.cusip[first])
+            ticker.append(self.ticker[first] if self.ticker else "")
+            type_code.append(self.type_code[first])
+            if len(rows) == 1:
+                shares.append(self.shares[first])
+                value.append(self.value[first])
+                discretion.append(self.discretion[first])
+                other_manager.append(self.other_manager[first])
+                breakdown.append(self.breakdown[first] if self.breakdown else None)
+                continue
+            shares.append(sum(self.shares[row] for row in rows))
+            value.append(sum(self.value[row] for row in rows))
+            discretion.append("")
+            other_manager.append("")
+            breakdown.append([[self.discretion[row], self.other_manager[row], self.shares[row], self.value[row]]
+                              for row in rows])
+
+        self.issuer, self.cusip, self.ticker, self.type_code = issuer, cusip, ticker, type_code
+        self.shares, self.value = shares, value
+        self.discretion, self.other_manager, self.breakdown = discretion, other_manager, breakdown
+        return before, len(self)
+
+    @property
+    def types(self) -> list:
+        return [HOLDING_TYPES[code] for code in self.type_code]
+
+    def rows(self):
+        """Itérer les lignes sous forme de dicts (format historique des parsers)"""
+        for ticker, cusip, shares, value, type_code in zip(self.ticker, self.cusip, self.shares,
+                                                           self.value, self.type_code):
+            yield {
+                "ticker": ticker,
+                "cusip": cusip,
+                "shares": shares,
+                "market_value": value,
+                "type": HOLDING_TYPES[type_code]
+            }
+
+    __iter__ = rows
+
+    def to_records(self, **constants):
+        """
+        Lignes prêtes pour fund_holdings, avec les colonnes constantes (fund_id, filing_id, cik)
+        Après collapse(), les clés agrégées portent leur détail dans `breakdown`.
+        """
+        breakdown = self.breakdown or itertools.repeat(None)
+        for ticker, cusip, shares, value, type_code, detail in zip(self.ticker, self.cusip, self.shares,
+                                                                   self.value, self.type_code, breakdown):
+            record = {
+                **constants,
+                "ticker": ticker,
+                "cusip": cusip,
+                "shares": shares,
+                "market_value": value,
+                "type": HOLDING_TYPES[type_code]
+            }
+            if detail is not None:
+                record["breakdown"] = detail
+            yield record
@@ -3,9 +3,18 @@ Lambda Python pour parser les fichiers 13F EDGAR
 Déclenché par EventBridge quand un nouveau 13F est découvert
 """
 
+import itertools
 import json
 import os
-import requests
+import re
+import time
+import batch_events
+import cusip_index
+import http_client
+import raw_archive
+from holdings_diff import PositionSet, diff_positions
+from holdings_table import HoldingsTable
+from tolerant_parser import parse_holdings_tolerant
 from bs4 import BeautifulSoup
 import xml.etree.ElementTree as ET
 
@@ -32,12 +41,14 @@ def supabase_request(method, table, data=None, filters=None):
             url += "?" + "&".join(params)
     
     if method == "GET":
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url, headers=headers)
     elif method == "POST":
-        response = requests.post(url, headers=headers, json=data)
+        response = http_client.post(url, headers=headers, json=data)
     elif method == "PATCH":
         # Pour PATCH, les filtres doivent être dans l'URL
-        response = requests.patch(url, headers=headers, json=data)
+        response = http_client.patch(url, headers=headers, json=data)
+    elif method == "DELETE":
+        response = http_client.delete(url, headers={**headers, "Prefer": "return=minimal"})
     else:
         raise ValueError(f"Unsupported method: {method}")
     
@@ -48,9 +59,138 @@ def supabase_request(method, table, data=None, filters=None):
         return [result]
     return result
 
+
+def supabase_select(table, params, page_size=1000):
+    """
+    Lire toutes les lignes d'une requête PostgREST (params: liste de couples,
+    opérateurs libres: select, order, lt, in...), paginée par limit/offset
+    """
+    url = f"{SUPABASE_URL}/rest/v1/{table}"
+    headers = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}"
+    }
+    rows = []
+    while True:
+        response = http_client.get(url, headers=headers, timeout=60,
+                                   params=list(params) + [("limit", str(page_size)), ("offset", str(len(rows)))])
+        response.raise_for_status()
+        page = response.json()
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+
+
+def supabase_select_one(table, params):
+    """Première ligne d'une requête PostgREST (une seule requête, limit=1), ou None"""
+    url = f"{SUPABASE_URL}/rest/v1/{table}"
+    headers = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}"
+    }
+    response = http_client.get(url, headers=headers, timeout=60, params=list(params) + [("limit", "1")])
+    response.raise_for_status()
+    rows = response.json()
+    return rows[0] if rows else None
+
+
+# Écriture en masse vers PostgREST: tableaux JSON par chunks, corps gzip,
+# Prefer: return=minimal, et seuls les chunks en échec sont renvoyés
+SUPABASE_BULK_CHUNK_SIZE = int(os.environ.get("SUPABASE_BULK_CHUNK_SIZE", "500"))
+SUPABASE_BULK_MAX_RETRIES = int(os.environ.get("SUPABASE_BULK_MAX_RETRIES", "3"))
+SUPABASE_BULK_GZIP = os.environ.get("SUPABASE_BULK_GZIP", "true").lower() not in ("0", "false", "no")
+# Agréger les lignes d'un même (cusip, type) avant écriture, détail gardé dans fund_holdings.breakdown
+HOLDINGS_COLLAPSE = os.environ.get("HOLDINGS_COLLAPSE", "true").lower() not in ("0", "false", "no")
+# Pipeline du handler: "sync" (séquentiel) ou "async" (asyncio + httpx, async_pipeline.py)
+PARSER_13F_PIPELINE = os.environ.get("PARSER_13F_PIPELINE", "sync").lower()
+
+def supabase_bulk_insert(table, rows, chunk_size=None, max_retries=None):
+    """
+    Insérer des lignes en masse dans une table Supabase (POST d'un tableau JSON par chunk)
+    `rows` peut être une liste ou un itérable (consommé chunk par chunk).
+    Seuls les chunks en erreur transitoire (réseau, 5xx, 408, 429) sont renvoyés:
+    une erreur 4xx de données échouerait pareil.
+    Retourne les statistiques d'écriture (rows, chunks, retries, rows_per_sec).
+    """
+    chunk_size = chunk_size or SUPABASE_BULK_CHUNK_SIZE
+    max_retries = SUPABASE_BULK_MAX_RETRIES if max_retries is None else max_retries
+    url = f"{SUPABASE_URL}/rest/v1/{table}"
+    headers = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}",
+        "Content-Type": "application/json",
+        "Prefer": "return=minimal"
+    }
+    
+    def post_chunk(chunk):
+        """None si le chunk est écrit, sinon (erreur, retentable)"""
+        body = json.dumps(chunk, separators=(",", ":"), default=str).encode("utf-8")
+        try:
+            response = http_client.post_json(url, headers, body, table, compress=SUPABASE_BULK_GZIP)
+        except Exception as e:
+            return e, True
+        if response.status_code < 400:
+            return None
+        return (f"HTTP {response.status_code}: {response.text[:300]}",
+                http_client.is_retryable_status(response.status_code))
+    
+    start = time.perf_counter()
+    total_rows = 0
+    chunk_count = 0
+    retries = 0
+    pending = []
+    rejected = []
+    last_error = None
+    
+    # Envoyer au fil de l'eau, garder uniquement les chunks en échec
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            break
+        chunk_count += 1
+        total_rows += len(chunk)
+        failure = post_chunk(chunk)
+        if failure:
+            last_error, retryable = failure
+            print(f"[BULK] Chunk de {len(chunk)} lignes en échec sur {table}: {last_error}")
+            (pending if retryable else rejected).append(chunk)
+    
+    attempt = 0
+    while pending and attempt < max_retries:
+        attempt += 1
+        time.sleep(min(2 ** attempt * 0.25, 5))
+        failed = []
+        for item in pending:
+            retries += 1
+            failure = post_chunk(item)
+            if failure:
+                last_error, retryable = failure
+                (failed if retryable else rejected).append(item)
+        pending = failed
+    
+    elapsed = time.perf_counter() - start
+    stats = {
+        "table": table,
+        "rows": total_rows,
+        "chunks": chunk_count,
+        "retries": retries,
+        "failed_rows": sum(len(item) for item in pending + rejected),
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(total_rows / elapsed, 1) if elapsed > 0 else None
+    }
+    print(f"[BULK] {table}: {total_rows} lignes en {chunk_count} chunks, "
+          f"{elapsed:.2f}s ({stats['rows_per_sec']} rows/s), retries={retries}")
+    
+    if pending or rejected:
+        raise RuntimeError(f"Bulk insert into {table} failed for {stats['failed_rows']} rows "
+                           f"({len(rejected)} chunks rejected, {len(pending)} after {max_retries} retries): "
+                           f"{last_error}")
+    return stats
+
 def handler(event, context):
     """
-    Event structure:
+    Event structure (ou batch SQS / tableau d'events, voir batch_events):
     {
         "detail": {
             "fund_id": 1,
@@ -61,7 +201,16 @@ def handler(event, context):
     }
     """
     print(f"Parser 13F triggered: {json.dumps(event)}")
+    if batch_events.is_batch(event):
+        if PARSER_13F_PIPELINE == "async":
+            import async_pipeline
+            return async_pipeline.handle_batch(event)
+        return batch_events.run_batch(event, lambda item: handler(item, context))
+    if PARSER_13F_PIPELINE == "async":
+        import async_pipeline
+        return async_pipeline.handler(event, context)
     
+    start = time.perf_counter()
     detail = event.get("detail", {})
     fund_id = detail.get("fund_id")
     cik = detail.get("cik")
@@ -79,169 +228,766 @@ def handler(event, context):
         if not SUPABASE_URL or not SUPABASE_KEY:
             raise ValueError("Missing SUPABASE_URL or SUPABASE_SERVICE_KEY environment variables")
         
-        # 1. Trouver dynamiquement le fichier XML depuis la page index
+        # 1. Résoudre le fichier information table depuis le listing de l'accession
         # Le nom du fichier peut varier : Form13FInfoTable.xml, infotable.xml, etc.
         print(f"Finding XML file for filing: {accession_number}")
         print(f"Filing URL: {filing_url}")
         
         headers = {
-            "User-Agent": "ADEL AI (contact@adel.ai)"
+            "User-Agent": SEC_USER_AGENT
         }
         
-        # Parser la page index pour trouver le lien vers le fichier XML
-        index_response = requests.get(filing_url, headers=headers, timeout=30)
-        index_response.raise_for_status()
-        
-        # Chercher le lien vers le fichier XML dans la page HTML
-        soup = BeautifulSoup(index_response.text, "html.parser")
-        
-        # Chercher les liens vers les fichiers XML (peuvent avoir différents noms)
-        xml_url = None
-        possible_names = ["Form13FInfoTable.xml", "infotable.xml", "InfoTable.xml", "form13finfotable.xml", "form13fInfoTable.xml", "Form13fInfoTable.xml"]
-        
-        # PRIORITÉ 1: Essayer d'abord dans le répertoire racine (XML brut)
-        accession_no_dashes = accession_number.replace("-", "")
-        cik_clean = cik.lstrip("0")
-        for name in possible_names:
-            # Essayer d'abord dans le répertoire racine
-            test_url = f"https://www.sec.gov/Archives/edgar/data/{cik_clean}/{accession_no_dashes}/{name}"
-            try:
-                test_resp = requests.head(test_url, headers=headers, timeout=10)
-                if test_resp.status_code == 200:
-                    # Vérifier si c'est du vrai XML (pas du HTML transformé)
-                    content_check = requests.get(test_url, headers=headers, timeout=10)
-                    if content_check.text.strip().startswith("<?xml"):
-                        # Vérifier qu'il n'est pas transformé en HTML
-                        if "<!DOCTYPE html" not in content_check.text[:500]:
-                            xml_url = test_url
-                            print(f"Found XML in root directory: {xml_url}")
-                            break
-            except:
-                continue
-        
-        # PRIORITÉ 2: Si pas trouvé dans le répertoire racine, chercher dans les liens de la page
-        if not xml_url:
-            # Extraire le répertoire de base depuis filing_url
-            base_dir = "/".join(filing_url.split("/")[:-1])  # Enlever le nom du fichier index
-            
-            # Chercher dans les liens de la page
-            for link in soup.find_all("a", href=True):
-                href = link.get("href", "")
-                # Chercher un fichier XML qui correspond aux noms possibles
-                for name in possible_names:
-                    if name.lower() in href.lower() and href.endswith(".xml"):
-                        # Construire l'URL complète
-                        if href.startswith("http"):
-                            candidate_url = href
-                        elif href.startswith("/"):
-                            candidate_url = f"https://www.sec.gov{href}"
-                        else:
-                            candidate_url = f"{base_dir}/{href}"
-                        
-                        # Vérifier que ce n'est pas du HTML transformé
-                        try:
-                            content_check = requests.get(candidate_url, headers=headers, timeout=10)
-                            if content_check.text.strip().startswith("<?xml") and "<!DOCTYPE html" not in content_check.text[:500]:
-                                xml_url = candidate_url
-                                print(f"Found XML in subdirectory: {xml_url}")
-                                break
-                        except:
-                            continue
-                if xml_url:
-                    break
-        
-        if not xml_url:
-            raise ValueError(f"Could not find XML file for filing {accession_number}")
+        documents = resolve_filing_documents(cik, accession_number, filing_url, headers)
+        xml_url = documents["info_table_url"]
         
-        print(f"Found XML file: {xml_url}")
+        print(f"Found XML file: {xml_url} (via {documents['source']})")
         
-        # 2. Télécharger le fichier XML (avec timeout plus long pour gros fichiers)
-        response = requests.get(xml_url, headers=headers, timeout=120, stream=True)
-        response.raise_for_status()
-        
-        # 3. Récupérer le filing_id (depuis l'event ou depuis la DB)
+        # 2. Récupérer le filing (id et form_type, depuis l'event ou depuis la DB)
         filing_id = detail.get("filing_id")
-        if not filing_id:
+        form_type = detail.get("form_type")
+        if not filing_id or not form_type:
             # Fallback: récupérer depuis la DB via API REST
             filing_result = supabase_request("GET", "fund_filings", filters={"accession_number": accession_number})
             if filing_result and len(filing_result) > 0:
-                filing_id = filing_result[0]["id"]
+                filing_id = filing_id or filing_result[0]["id"]
+                form_type = form_type or filing_result[0].get("form_type")
             else:
                 raise ValueError(f"Filing not found for accession_number: {accession_number}")
         
-        # 4. Parser le XML (utiliser response.content avec gestion d'encodage)
-        # Détecter l'encodage depuis les headers ou le XML
-        content = response.content
-        # Essayer de décoder en UTF-8, sinon utiliser l'encodage détecté
-        try:
-            content_str = content.decode('utf-8', errors='replace')
-        except:
-            # Si UTF-8 échoue, essayer latin-1 (qui peut décoder n'importe quel byte)
-            content_str = content.decode('latin-1', errors='replace')
+        # 3. Parser le XML en streaming (archive brute d'abord, sinon sec.gov avec archivage au fil de l'eau)
+        holdings, raw_storage_path = parse_13f_document(xml_url, headers)
         
-        holdings = parse_13f_file(content_str, xml_url)
+        # 4. Cover page: période de report et type d'amendement (13F-HR/A)
+        cover = read_cover_page(documents.get("primary_doc_url"), headers)
         
-        # 5. Insérer les holdings
-        for holding in holdings:
-            supabase_request("POST", "fund_holdings", data={
-                "fund_id": fund_id,
-                "filing_id": filing_id,
-                "cik": cik,
-                "ticker": holding.get("ticker"),
-                "cusip": holding.get("cusip"),
-                "shares": holding.get("shares"),
-                "market_value": holding.get("market_value"),
-                "type": holding.get("type", "stock")
-            })
-        
-        # 6. Mettre à jour le statut
-        supabase_request("PATCH", "fund_filings", 
-            data={"status": "PARSED", "updated_at": "now()"},
-            filters={"id": filing_id}
-        )
+        # 5. Écrire les holdings (RPC transactionnelle, idempotente sous retry; amendements
+        #    appliqués à l'original), marquer le filing PARSED (avec l'emplacement du document
+        #    brut archivé), puis les diffs avec les filings précédent et suivants du fund
+        store_stats = store_filing_holdings(filing_id, fund_id, cik, form_type, holdings, cover,
+                                            raw_storage_path=raw_storage_path)
         
         print(f"Successfully parsed {len(holdings)} holdings for filing {accession_number}")
+        return parsed_response(filing_id, holdings, store_stats, "sync", start)
         
-        return {
-            "statusCode": 200,
-            "body": json.dumps({
-                "success": True,
-                "filing_id": filing_id,
-                "holdings_count": len(holdings)
-            })
-        }
+    except Exception as e:
+        return failed_response(accession_number, e)
+
+
+def mark_filing_parsed(filing_id, raw_storage_path):
+    filing_update = {"status": "PARSED", "updated_at": "now()"}
+    if raw_storage_path:
+        filing_update["raw_storage_path"] = raw_storage_path
+    supabase_request("PATCH", "fund_filings", data=filing_update, filters={"id": filing_id})
+
+
+def parsed_response(filing_id, holdings: HoldingsTable, store_stats: dict, pipeline: str, start: float) -> dict:
+    """Réponse du handler pour un filing parsé (commune aux pipelines sync et asyncio)"""
+    print(f"[HTTP] Connexions: {json.dumps(http_client.stats())}")
+    print(f"[HTTP] Rate limit SEC: {json.dumps(http_client.rate_limit_stats())}")
+    return {
+        "statusCode": 200,
+        "body": json.dumps({
+            "success": True,
+            "filing_id": filing_id,
+            "holdings_count": len(holdings),
+            "parsed_rows_count": store_stats["rows_parsed"],
+            "diff_count": store_stats["diff"]["rows"],
+            "amendment_type": store_stats["amendment_type"],
+            "effective_filing_id": store_stats["effective_filing_id"],
+            "insert_rows_per_sec": store_stats["insert"]["rows_per_sec"],
+            "pipeline": pipeline,
+            "elapsed_seconds": round(time.perf_counter() - start, 3)
+        })
+    }
+
+
+def failed_response(accession_number: str, error: Exception) -> dict:
+    """Marquer le filing FAILED et construire la réponse d'erreur du handler"""
+    print(f"Error parsing 13F: {str(error)}")
+    try:
+        supabase_request("PATCH", "fund_filings",
+            data={"status": "FAILED", "updated_at": "now()"},
+            filters={"accession_number": accession_number}
+        )
+    except:
+        pass
+    
+    return {
+        "statusCode": 500,
+        "body": json.dumps({"error": str(error)})
+    }
+
+
+def supabase_replace_holdings(filing_id, fund_id, cik, holdings: HoldingsTable, max_retries=None):
+    """
+    Remplacer tous les holdings d'un filing en un seul appel RPC (replace_original_fund_holdings)
+    Suppression + insertion dans une transaction côté serveur, clé (filing_id, cusip, type):
+    un retry du handler ne duplique jamais les lignes. Les amendements déjà appliqués au
+    filing (ou en attente de lui) sont rejoués dans la même transaction.
+    Retourne les statistiques d'écriture (amendments_replayed: amendements rejoués).
+    """
+    stats = supabase_holdings_rpc("replace_original_fund_holdings", {
+        "p_filing_id": filing_id,
+        "p_fund_id": fund_id,
+        "p_cik": cik
+    }, holdings, max_retries)
+    if stats.get("amendments_replayed"):
+        print(f"[BULK] Filing {filing_id}: {stats['amendments_replayed']} amendement(s) rejoué(s)")
+    return stats
+
+
+def supabase_apply_amendment(original_filing_id, amendment_filing_id, amendment_type, fund_id, cik,
+                             holdings: HoldingsTable, max_retries=None):
+    """
+    Appliquer un 13F-HR/A aux holdings du filing original (RPC apply_fund_holdings_amendment)
+    RESTATEMENT remplace les lignes de l'original, NEW HOLDINGS ajoute le delta (une seule fois).
+    Le payload est conservé pour être rejoué si l'original est réécrit. Sans original
+    (original_filing_id None), l'amendement est mis en attente et rattaché à son écriture.
+    """
+    return supabase_holdings_rpc("apply_fund_holdings_amendment", {
+        "p_original_filing_id": original_filing_id,
+        "p_amendment_filing_id": amendment_filing_id,
+        "p_amendment_type": amendment_type,
+        "p_fund_id": fund_id,
+        "p_cik": cik
+    }, holdings, max_retries)
+
+
+def supabase_rpc(function_name, params: dict, rows_key: str, records, max_retries=None) -> tuple:
+    """
+    Appeler une RPC avec un seul payload JSON (params + tableau `rows_key` assemblé depuis `records`)
+    Retentée en cas d'échec transitoire: les RPC sont transactionnelles et idempotentes.
+    Retourne (résultat, taille du corps en octets, retries).
+    """
+    max_retries = SUPABASE_BULK_MAX_RETRIES if max_retries is None else max_retries
+    url = f"{SUPABASE_URL}/rest/v1/rpc/{function_name}"
+    headers = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}",
+        "Content-Type": "application/json"
+    }
+    
+    # Corps assemblé ligne à ligne (pas de liste de dicts intermédiaire)
+    rows = ",".join(json.dumps(record, separators=(",", ":")) for record in records)
+    body = json.dumps(params, separators=(",", ":"))[:-1].encode("utf-8") + f',"{rows_key}":[{rows}]}}'.encode("utf-8")
+    del rows
+    
+    retries = 0
+    while True:
+        try:
+            response = http_client.post_json(url, headers, body, function_name, timeout=120,
+                                             compress=SUPABASE_BULK_GZIP)
+            error = None if response.status_code < 400 else f"HTTP {response.status_code}: {response.text[:300]}"
+            retryable = response.status_code < 400 or http_client.is_retryable_status(response.status_code)
+        except Exception as e:
+            error, retryable = e, True
+        if error is None:
+            break
+        # 4xx déterministe (payload, type d'amendement inconnu...): un nouvel essai échouerait pareil
+        if not retryable or retries >= max_retries:
+            raise RuntimeError(f"{function_name} failed after {retries} retries "
+                               f"({json.dumps(params)}): {error}")
+        retries += 1
+        print(f"[BULK] {function_name} en échec ({json.dumps(params)}): {error}, retry {retries}")
+        time.sleep(min(2 ** retries * 0.25, 5))
+    
+    return (response.json() if response.text else None), len(body), retries
+
+
+def supabase_holdings_rpc(function_name, params: dict, holdings: HoldingsTable, max_retries=None):
+    """Appeler une RPC de chargement de holdings (payload p_holdings); retourne les statistiques d'écriture"""
+    start = time.perf_counter()
+    result, payload_bytes, retries = supabase_rpc(function_name, params, "p_holdings",
+                                                  holdings.to_records(), max_retries)
+    elapsed = time.perf_counter() - start
+    # replace_original_fund_holdings: {"stored": n, "amendments": k}, les autres RPC: n
+    stored_rows = result.get("stored") if isinstance(result, dict) else result
+    stats = {
+        "table": "fund_holdings",
+        "rows": len(holdings),
+        "stored_rows": stored_rows,
+        "payload_bytes": payload_bytes,
+        "retries": retries,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(len(holdings) / elapsed, 1) if elapsed > 0 else None
+    }
+    if isinstance(result, dict):
+        stats["amendments_replayed"] = result.get("amendments", 0)
+    print(f"[BULK] {function_name}: {len(holdings)} lignes → {stored_rows} stockées "
+          f"({payload_bytes} octets), {elapsed:.2f}s ({stats['rows_per_sec']} rows/s), retries={retries}")
+    return stats
+
+
+def supabase_replace_holdings_diff(filing_id, fund_id, previous_filing_id, diffs, max_retries=None):
+    """
+    Remplacer le diff d'un filing en un seul appel RPC (replace_fund_holdings_diff, transactionnel)
+    Retourne le nombre de lignes écrites, ou None si `previous_filing_id` n'est plus le filing
+    précédent côté base (rien n'est écrit).
+    """
+    result, _, _ = supabase_rpc("replace_fund_holdings_diff", {
+        "p_filing_id_new": filing_id,
+        "p_fund_id": fund_id,
+        "p_filing_id_old": previous_filing_id
+    }, "p_diffs", diffs, max_retries)
+    return result
+
+
+def effective_filing_filters(filing_id, fund_id) -> list:
+    """
+    Filtres fund_filings des autres filings PARSED du fund
+    Amendements appliqués et NEW HOLDINGS en attente (simple delta) exclus, comme dans fund_filings_effective.
+    """
+    return [("fund_id", f"eq.{fund_id}"), ("status", "eq.PARSED"), ("id", f"neq.{filing_id}"),
+            ("amendment_applied_at", "is.null"), ("amendment_type", "isdistinct.NEW HOLDINGS")]
+
+
+def previous_filing_params(filing_id, fund_id, current: dict):
+    """
+    Requête fund_filings du filing précédent, depuis la période (sinon la date de dépôt) du filing courant
+    Même règle que la RPC replace_fund_holdings_diff (migration 030).
+    """
+    params = [("select", "id,period_of_report,filing_date")] + effective_filing_filters(filing_id, fund_id)
+    if current.get("period_of_report"):
+        return params + [("period_of_report", f"lt.{current['period_of_report']}"),
+                         ("order", "period_of_report.desc,filing_date.desc,id.desc")]
+    if current.get("filing_date"):
+        return params + [("filing_date", f"lt.{current['filing_date']}"), ("order", "filing_date.desc,id.desc")]
+    return None
+
+
+def find_previous_filing(filing_id, fund_id):
+    """Filing PARSED précédent du fund (période de report, sinon date de dépôt), ou None"""
+    current = supabase_select_one("fund_filings", [("select", "id,period_of_report,filing_date"),
+                                                   ("id", f"eq.{filing_id}")])
+    if current is None:
+        return None
+    params = previous_filing_params(filing_id, fund_id, current)
+    if params is None:
+        return None
+    return supabase_select_one("fund_filings", params)
+
+
+def find_next_filings(filing_id, fund_id) -> list:
+    """
+    Filings PARSED dont le filing précédent dépend de celui-ci: tous ceux de la première
+    période de report suivante (sinon de la première date de dépôt suivante)
+    """
+    current = supabase_select_one("fund_filings", [("select", "id,period_of_report,filing_date"),
+                                                   ("id", f"eq.{filing_id}")])
+    if current is None:
+        return []
+    key = "period_of_report" if current.get("period_of_report") else "filing_date"
+    if not current.get(key):
+        return []
+    params = [("select", "id,period_of_report,filing_date")] + effective_filing_filters(filing_id, fund_id)
+    following = supabase_select_one("fund_filings", params + [(key, f"gt.{current[key]}"), ("order", f"{key}.asc")])
+    if following is None:
+        return []
+    return supabase_select("fund_filings", params + [(key, f"eq.{following[key]}"), ("order", "id")])
+
+
+def load_filing_positions(filing_id) -> PositionSet:
+    return PositionSet.from_rows(supabase_select("fund_holdings", [
+        ("select", "ticker,cusip,shares,market_value,type"), ("filing_id", f"eq.{filing_id}"), ("order", "id")
+    ]))
+
+
+def write_holdings_diff(filing_id, fund_id, holdings: HoldingsTable = None, prefetched=None):
+    """
+    Calculer et écrire fund_holdings_diff pour un filing qui vient d'être parsé
+    Le filing précédent est chargé une seule fois, puis merge join sur (cusip, type).
+    Sans `holdings` (amendement appliqué), le filing est relu depuis la base.
+    `prefetched`: (filing précédent ou None, ses positions) déjà chargés par l'appelant.
+    Le diff est remplacé en une transaction (RPC replace_fund_holdings_diff); si le filing
+    précédent a changé entre-temps (filing du fund parsé en parallèle), il est recalculé.
+    """
+    new_positions = None
+    for attempt in range(2):
+        # Un préchargement sans filing précédent a pu précéder le marquage PARSED de celui-ci: relu
+        if attempt == 0 and prefetched is not None and prefetched[0] is not None:
+            previous, old_positions = prefetched
+        else:
+            previous, old_positions = find_previous_filing(filing_id, fund_id), None
+        if previous is None:
+            print(f"[DIFF] Pas de filing précédent pour le filing {filing_id}, pas de diff")
+            return {"filing_id_old": None, "rows": 0}
         
+        start = time.perf_counter()
+        if new_positions is None:
+            new_positions = PositionSet.from_table(holdings) if holdings is not None else load_filing_positions(filing_id)
+        if old_positions is None:
+            old_positions = load_filing_positions(previous["id"])
+        
+        rows = supabase_replace_holdings_diff(filing_id, fund_id, previous["id"],
+                                              diff_positions(new_positions, old_positions))
+        if rows is not None:
+            print(f"[DIFF] Filing {filing_id} vs {previous['id']}: {len(new_positions)} vs {len(old_positions)} "
+                  f"positions, {rows} diffs en {time.perf_counter() - start:.2f}s")
+            return {"filing_id_old": previous["id"], "rows": rows}
+        print(f"[DIFF] Filing {filing_id}: le filing précédent n'est plus {previous['id']}, diff recalculé")
+    
+    # Toujours en mouvement: le filing parsé en parallèle recalcule ce diff (refresh_next_holdings_diffs)
+    return {"filing_id_old": None, "rows": 0}
+
+
+def refresh_next_holdings_diffs(filing_id, fund_id) -> int:
+    """
+    Recalculer le diff des filings suivants du fund après l'écriture de ce filing
+    Un filing parsé après son successeur (retry, batch parallèle, reparse) devient son
+    filing précédent: le diff ne dépend ainsi pas de l'ordre de parsing.
+    Retourne le nombre de filings recalculés.
+    """
+    following = find_next_filings(filing_id, fund_id)
+    for filing in following:
+        print(f"[DIFF] Filing {filing['id']} suit le filing {filing_id}: diff recalculé")
+        write_holdings_diff(filing["id"], fund_id)
+    return len(following)
+
+
+# Amendements 13F-HR/A: le type (RESTATEMENT / NEW HOLDINGS) est lu sur la cover page
+AMENDMENT_TYPES = ("RESTATEMENT", "NEW HOLDINGS")
+COVER_PAGE_FIELD = r"<(?:[\w.-]+:)?{name}\b[^>]*>\s*([^<]*?)\s*</(?:[\w.-]+:)?{name}>"
+COVER_PAGE_FIELDS = {
+    name: re.compile(COVER_PAGE_FIELD.format(name=name), re.IGNORECASE)
+    for name in ("periodOfReport", "reportCalendarOrQuarter", "isAmendment", "amendmentType")
+}
+
+
+def parse_cover_page(content: str) -> dict:
+    """
+    Champs utiles du primary_doc.xml d'un 13F
+    period_of_report (ISO), is_amendment, amendment_type (RESTATEMENT / NEW HOLDINGS ou None)
+    """
+    values = {}
+    for name, pattern in COVER_PAGE_FIELDS.items():
+        match = pattern.search(content)
+        if match:
+            values[name] = match.group(1).strip()
+    
+    period = values.get("periodOfReport") or values.get("reportCalendarOrQuarter")
+    period_of_report = None
+    if period:
+        match = re.match(r"(\d{2})-(\d{2})-(\d{4})$", period)
+        period_of_report = f"{match.group(3)}-{match.group(1)}-{match.group(2)}" if match else period
+    
+    amendment_type = " ".join(values.get("amendmentType", "").upper().split()) or None
+    return {
+        "period_of_report": period_of_report,
+        "is_amendment": values.get("isAmendment", "").lower() in ("true", "1", "y", "yes"),
+        "amendment_type": amendment_type if amendment_type in AMENDMENT_TYPES else None
+    }
+
+
+def read_cover_page(primary_doc_url, headers: dict, offline: bool = False) -> dict:
+    """Cover page (archive d'abord); {} si le document est introuvable ou illisible"""
+    if not primary_doc_url:
+        return {}
+    try:
+        if offline:
+            archive = raw_archive.get_archive()
+            content = archive.read(primary_doc_url) if archive is not None else None
+            if content is None:
+                return {}
+        else:
+            content, _ = raw_archive.fetch(primary_doc_url, headers=headers, timeout=30)
+        return parse_cover_page(content.decode("utf-8", errors="replace"))
+    except Exception as e:
+        print(f"Cover page not usable ({primary_doc_url}): {str(e)}")
+        return {}
+
+
+def find_original_filing(filing_id, fund_id, period_of_report):
+    """13F-HR original (PARSED) de la même période, auquel appliquer un amendement"""
+    if not period_of_report:
+        return None
+    return supabase_select_one("fund_filings", [
+        ("select", "id"), ("fund_id", f"eq.{fund_id}"), ("period_of_report", f"eq.{period_of_report}"),
+        ("form_type", "eq.13F-HR"), ("status", "eq.PARSED"), ("id", f"neq.{filing_id}"),
+        ("order", "filing_date.asc,id.asc")
+    ])
+
+
+def store_filing_holdings(filing_id, fund_id, cik, form_type, holdings: HoldingsTable, cover: dict,
+                          prefetched_previous=None, raw_storage_path=None) -> dict:
+    """
+    Écrire les holdings parsés d'un filing, en tenant compte des amendements
+    - filing original (ou amendement sans type): remplacement par filing, puis amendements rejoués
+    - 13F-HR/A RESTATEMENT: remplace atomiquement les lignes de l'original
+    - 13F-HR/A NEW HOLDINGS: ajoute uniquement le delta à l'original
+    - 13F-HR/A sans original PARSED: en attente, rattaché à l'écriture de l'original
+    Un seul jeu de holdings effectif par (fund, période): celui de l'original.
+    Puis le filing est marqué PARSED (avant les diffs: un filing du fund parsé en parallèle
+    le voit), diff avec le filing précédent du fund et diffs des filings suivants recalculés.
+    Retourne les statistiques.
+    Si HOLDINGS_COLLAPSE, les lignes d'un même (cusip, type) sont d'abord agrégées.
+    `prefetched_previous`: filing précédent et ses positions, préchargés (pipeline asyncio).
+    """
+    rows_parsed = rows_stored = len(holdings)
+    if HOLDINGS_COLLAPSE:
+        rows_parsed, rows_stored = holdings.collapse()
+        print(f"Holdings collapsed by (cusip, type): {rows_parsed} -> {rows_stored} rows")
+    
+    period_of_report = cover.get("period_of_report")
+    if period_of_report:
+        supabase_request("PATCH", "fund_filings", data={"period_of_report": period_of_report},
+                         filters={"id": filing_id})
+    
+    is_amendment = cover.get("is_amendment") or (form_type or "").upper().endswith("/A")
+    amendment_type = cover.get("amendment_type") if is_amendment else None
+    original = find_original_filing(filing_id, fund_id, period_of_report) if amendment_type else None
+    
+    if original is not None:
+        print(f"Amendment {amendment_type}: applying filing {filing_id} to original filing {original['id']}")
+        insert_stats = supabase_apply_amendment(original["id"], filing_id, amendment_type, fund_id, cik, holdings)
+        mark_filing_parsed(filing_id, raw_storage_path)
+        # Le jeu effectif de l'original a changé: son diff et ceux des filings suivants sont recalculés
+        diff_stats = write_holdings_diff(original["id"], fund_id)
+        diff_stats["next_filings"] = refresh_next_holdings_diffs(original["id"], fund_id)
+        effective_filing_id = original["id"]
+    elif amendment_type:
+        print(f"Amendment {amendment_type} without original filing yet: stored as pending")
+        insert_stats = supabase_apply_amendment(None, filing_id, amendment_type, fund_id, cik, holdings)
+        mark_filing_parsed(filing_id, raw_storage_path)
+        # Un RESTATEMENT en attente est le jeu effectif de la période jusqu'à l'arrivée de l'original.
+        # Un NEW HOLDINGS en attente n'est qu'un delta: pas de diff tant qu'il n'est pas appliqué
+        if amendment_type == "RESTATEMENT":
+            diff_stats = write_holdings_diff(filing_id, fund_id, holdings, prefetched_previous)
+            diff_stats["next_filings"] = refresh_next_holdings_diffs(filing_id, fund_id)
+        else:
+            diff_stats = {"filing_id_old": None, "rows": 0}
+        effective_filing_id = filing_id
+    else:
+        if is_amendment:
+            print("Amendment without usable type, stored as standalone")
+        insert_stats = supabase_replace_holdings(filing_id, fund_id, cik, holdings)
+        mark_filing_parsed(filing_id, raw_storage_path)
+        # Amendements rejoués: le jeu effectif n'est plus celui parsé, diff relu depuis la base
+        replayed = insert_stats.get("amendments_replayed")
+        diff_stats = write_holdings_diff(filing_id, fund_id, None if replayed else holdings, prefetched_previous)
+        diff_stats["next_filings"] = refresh_next_holdings_diffs(filing_id, fund_id)
+        effective_filing_id = filing_id
+    
+    return {
+        "insert": insert_stats,
+        "diff": diff_stats,
+        "amendment_type": amendment_type,
+        "effective_filing_id": effective_filing_id,
+        "rows_parsed": rows_parsed,
+        "rows_stored": rows_stored
+    }
+
+
+# Résolution des documents d'une accession (index.json), mise en cache par accession
+SEC_USER_AGENT = "ADEL AI (contact@adel.ai)"
+# Hôte EDGAR (surchargé par le harness de charge local, scripts/edgar-load-test.py)
+SEC_BASE_URL = os.environ.get("SEC_BASE_URL", "https://www.sec.gov").rstrip("/")
+INFO_TABLE_NAME_HINTS = ("infotable", "info_table", "informationtable", "form13f")
+
+_filing_documents_cache = {}
+
+
+def accession_base_url(cik: str, accession_number: str) -> str:
+    """Répertoire EDGAR d'une accession (Archives/edgar/data/<cik>/<accession sans tirets>)"""
+    return f"{SEC_BASE_URL}/Archives/edgar/data/{cik.lstrip('0') or '0'}/{accession_number.replace('-', '')}"
+
+
+def resolve_filing_documents(cik: str, accession_number: str, filing_url: str, headers: dict) -> dict:
+    """
+    Trouver l'information table (et le cover page primary_doc.xml) d'un 13F
+    Une seule requête: le listing index.json de l'accession. Si le listing est
+    inutilisable, la page -index.htm (filing_url) est lue une fois et le
+    document de type INFORMATION TABLE est choisi. Aucun fichier candidat n'est
+    téléchargé ici: le handler télécharge le document choisi une seule fois.
+    """
+    if accession_number in _filing_documents_cache:
+        return _filing_documents_cache[accession_number]
+    
+    base_url = accession_base_url(cik, accession_number)
+    documents = None
+    try:
+        listing, _ = raw_archive.fetch(f"{base_url}/index.json", headers=headers, timeout=30)
+        items = json.loads(listing).get("directory", {}).get("item", [])
+        documents = select_documents_from_listing(items, base_url)
     except Exception as e:
-        print(f"Error parsing 13F: {str(e)}")
-        # Marquer comme FAILED
+        print(f"index.json not usable for {accession_number}: {str(e)}")
+    
+    if documents is None:
+        index_page, _ = raw_archive.fetch(filing_url, headers=headers, timeout=30)
+        documents = select_documents_from_index_page(index_page.decode("utf-8", errors="replace"), base_url)
+    
+    if documents is None:
+        raise ValueError(f"Could not find XML file for filing {accession_number}")
+    
+    _filing_documents_cache[accession_number] = documents
+    return documents
+
+
+def select_documents_from_listing(items: list, base_url: str):
+    """
+    Choisir l'information table dans le listing index.json d'une accession
+    Les XML bruts sont à la racine (les rendus XSL sont dans des sous-répertoires):
+    on exclut primary_doc.xml, puis on préfère un nom connu, sinon le plus gros XML.
+    """
+    xml_files = []
+    primary_doc_url = None
+    for item in items:
+        name = item.get("name", "")
+        if not name.lower().endswith(".xml"):
+            continue
+        if name.lower() == "primary_doc.xml":
+            primary_doc_url = f"{base_url}/{name}"
+            continue
         try:
-            supabase_request("PATCH", "fund_filings",
-                data={"status": "FAILED", "updated_at": "now()"},
-                filters={"accession_number": accession_number}
-            )
-        except:
-            pass
+            size = int(item.get("size") or 0)
+        except ValueError:
+            size = 0
+        xml_files.append((name, size))
+    
+    if not xml_files:
+        return None
+    
+    named = [f for f in xml_files if any(hint in f[0].lower().replace("-", "") for hint in INFO_TABLE_NAME_HINTS)]
+    name, _ = max(named or xml_files, key=lambda f: f[1])
+    return {
+        "info_table_url": f"{base_url}/{name}",
+        "primary_doc_url": primary_doc_url,
+        "source": "index.json"
+    }
+
+
+INDEX_PAGE_ROW = re.compile(r"<tr[^>]*>(.*?)</tr>", re.IGNORECASE | re.DOTALL)
+INDEX_PAGE_HREF = re.compile(r'href="([^"]+\.xml)"', re.IGNORECASE)
+
+
+def select_documents_from_index_page(html: str, base_url: str):
+    """
+    Choisir l'information table dans la page -index.htm (colonne Type)
+    Seuls les liens vers le XML brut (pas les rendus xslForm13F) sont retenus.
+    """
+    info_table_url = None
+    primary_doc_url = None
+    for row in INDEX_PAGE_ROW.findall(html):
+        row_upper = row.upper()
+        for href in INDEX_PAGE_HREF.findall(row):
+            if "/xsl" in href.lower():
+                continue
+            if href.startswith("http"):
+                url = href
+            elif href.startswith("/"):
+                url = f"{SEC_BASE_URL}{href}"
+            else:
+                url = f"{base_url}/{href}"
+            if "INFORMATION TABLE" in row_upper and not info_table_url:
+                info_table_url = url
+            elif "13F-HR" in row_upper and not primary_doc_url:
+                primary_doc_url = url
+    
+    if not info_table_url:
+        return None
+    return {
+        "info_table_url": info_table_url,
+        "primary_doc_url": primary_doc_url,
+        "source": "index page"
+    }
+
+
+class PeekableStream:
+    """
+    Flux binaire en lecture seule qui permet de regarder les premiers octets
+    (détection XML/HTML) sans les consommer pour le parser
+    """
+    
+    def __init__(self, raw):
+        self.raw = raw
+        self.buffer = b""
+    
+    def peek(self, size: int) -> bytes:
+        while len(self.buffer) < size:
+            chunk = self.raw.read(size - len(self.buffer))
+            if not chunk:
+                break
+            self.buffer += chunk
+        return self.buffer[:size]
+    
+    def read(self, size: int = -1) -> bytes:
+        if self.buffer:
+            if size is None or size < 0:
+                data = self.buffer + self.raw.read()
+                self.buffer = b""
+                return data
+            data = self.buffer[:size]
+            self.buffer = self.buffer[size:]
+            return data
+        return self.raw.read(size)
+
+
+def is_html_document(head: str) -> bool:
+    """Détecter du HTML transformé (XSL SEC) à partir du début du document"""
+    return "<!DOCTYPE html" in head[:500] or head.strip().startswith("<html")
+
+
+def parse_13f_document(url: str, headers: dict):
+    """
+    Parser l'information table d'un 13F, depuis l'archive brute si elle l'a
+    déjà, sinon depuis sec.gov en streaming (le flux est archivé au passage).
+    Retourne (holdings, raw_storage_path); raw_storage_path est None sans archive.
+    """
+    archive = raw_archive.get_archive()
+    if archive is not None:
+        try:
+            archived = archive.open(url)
+        except Exception as e:
+            print(f"[ARCHIVE] Lecture impossible pour {url}: {e}")
+            archived = None
+        if archived is not None:
+            print(f"[ARCHIVE] Hit: {url}")
+            return parse_13f_archived(archived, url), archived.storage_path
+    
+    response = http_client.get(url, headers=headers, timeout=120, stream=True)
+    response.raise_for_status()
+    response.raw.decode_content = True
+    
+    def redownload() -> bytes:
+        retry = http_client.get(url, headers=headers, timeout=120)
+        retry.raise_for_status()
+        return retry.content
+    
+    try:
+        return parse_13f_source(response.raw, url, redownload)
+    finally:
+        response.close()
+
+
+def parse_13f_source(raw, url: str, reread):
+    """
+    Parser un flux binaire téléchargé (réponse HTTP, spool) en l'archivant au passage
+    En cas de XML malformé, le document complet est relu depuis l'archive, sinon via
+    reread() (re-téléchargement, relecture du spool). Retourne (holdings, raw_storage_path).
+    """
+    archive = raw_archive.get_archive()
+    writer = archive.writer(url, raw) if archive is not None else None
+    
+    try:
+        holdings = parse_13f_stream(writer or raw, url)
+        return holdings, commit_archive(writer, url)
+    except ET.ParseError as e:
+        print(f"Method 0 (iterparse) failed: {str(e)}, falling back to tolerant parsing...")
+        # Le flux est consommé: relire le document complet depuis l'archive, sinon via reread()
+        raw_storage_path = commit_archive(writer, url)
+        content = archive.read(url) if raw_storage_path else None
+    except BaseException:
+        # Flux coupé, table invalide...: le spool du writer non finalisé est libéré
+        if writer is not None:
+            writer.discard()
+        raise
+    
+    if content is None:
+        content = reread()
+    return parse_13f_file(content.decode("utf-8", errors="replace"), url), raw_storage_path
+
+
+def parse_13f_archived(archived, url: str) -> HoldingsTable:
+    """
+    Parser un document de l'archive brute (flux décompressé)
+    En cas de XML malformé, l'objet est relu en entier pour les parsers tolérants.
+    """
+    archive = raw_archive.get_archive()
+    try:
+        return parse_13f_stream(archived, url)
+    except ET.ParseError as e:
+        print(f"Method 0 (iterparse) failed: {str(e)}, tolerant parsing from archive...")
+        reader = archive.open_object(archived.storage_path)
+        try:
+            content = reader.read()
+        finally:
+            reader.close()
+        return parse_13f_file(content.decode("utf-8", errors="replace"), url)
+    finally:
+        archived.close()
+
+
+def commit_archive(writer, url: str):
+    """Finaliser l'archivage d'un flux, sans jamais faire échouer le parsing"""
+    if writer is None:
+        return None
+    try:
+        return writer.commit()
+    except Exception as e:
+        print(f"[ARCHIVE] Écriture impossible pour {url}: {e}")
+        writer.discard()
+        return None
+
+
+def parse_13f_stream(raw, url: str) -> HoldingsTable:
+    """
+    Parse un fichier 13F depuis un flux binaire (réponse HTTP ou archive)
+    Le XML brut passe par iterparse sans jamais être chargé en entier en mémoire.
+    Le HTML transformé retombe sur parse_13f_file; un XML malformé lève ET.ParseError.
+    """
+    stream = PeekableStream(raw)
+    head = stream.peek(1024).decode("utf-8", errors="replace")
+    
+    if is_html_document(head):
+        # Le HTML doit être parsé en entier de toute façon
+        content = stream.read()
+        return parse_13f_file(content.decode("utf-8", errors="replace"), url)
+    
+    holdings = parse_holdings_from_stream(stream)
+    print(f"Method 0 (iterparse streaming): Parsed {len(holdings)} infoTable elements")
+    return holdings
+
+
+def parse_holdings_from_stream(stream) -> HoldingsTable:
+    """
+    Parser incrémental (bytes) des infoTable d'un fichier 13F
+    Chaque infoTable est ajouté à la table puis vidé et détaché de son parent,
+    donc la mémoire du parser reste constante quelle que soit la taille du fichier
+    """
+    holdings = HoldingsTable()
+    stack = []
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
         
-        return {
-            "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
-        }
+        stack.pop()
+        localname = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
+        if localname.lower() != 'infotable':
+            continue
+        
+        append_holding_from_etree(holdings, elem)
+        
+        # Libérer l'élément et le détacher de son parent. Le parser lit par blocs
+        # de 16 Ko, donc les frères suivants peuvent déjà être attachés: les
+        # infoTable déjà traités sont retirés dans l'ordre, elem est en tête.
+        elem.clear()
+        if stack:
+            try:
+                stack[-1].remove(elem)
+            except ValueError:
+                pass
+    
+    return holdings.finalize(extract_ticker)
 
 
-def parse_13f_file(content: str, url: str) -> list:
+def parse_13f_file(content: str, url: str) -> HoldingsTable:
     """
     Parse un fichier 13F XML et extrait les holdings
     Solution universelle qui détecte automatiquement le format et utilise le parser adapté
     """
-    holdings = []
-    
     try:
         # Vérifier si c'est du HTML transformé ou du XML brut
-        is_html = "<!DOCTYPE html" in content[:500] or content.strip().startswith("<html")
+        is_html = is_html_document(content[:1024])
         
         if is_html:
-            # C'est du HTML transformé, utiliser BeautifulSoup
+            # C'est du HTML: d'abord le tokenizer tolérant (XML enveloppé dans du HTML)
             print("Warning: Received HTML instead of XML, trying to parse as HTML...")
+            holdings = parse_holdings_tolerant(content)
+            if len(holdings):
+                print(f"Method 2 (tolerant tokenizer): Found {len(holdings)} infoTable elements in HTML")
+                return holdings.finalize(extract_ticker)
+            
+            # Rendu XSL en tableaux HTML: utiliser BeautifulSoup
             soup = BeautifulSoup(content, "html.parser")
             info_tables = soup.find_all("table", class_=lambda x: x and "infotable" in str(x).lower())
             if not info_tables:
@@ -252,7 +998,7 @@ def parse_13f_file(content: str, url: str) -> list:
             return parse_holdings_from_beautifulsoup(info_tables)
         else:
             # C'est du XML brut - utiliser xml.etree.ElementTree (plus rapide) en priorité
-            # Fallback sur BeautifulSoup si nécessaire
+            # Fallback sur le tokenizer tolérant si nécessaire
             print("Parsing XML file...")
             
             # MÉTHODE 1: xml.etree.ElementTree (rapide, gère bien les namespaces)
@@ -273,34 +1019,22 @@ def parse_13f_file(content: str, url: str) -> list:
                     print(f"Method 1 (xml.etree.ElementTree): Found {len(info_tables)} infoTable elements")
                     return parse_holdings_from_etree(info_tables)
             except Exception as e:
-                print(f"Method 1 (ET) failed: {str(e)}, trying BeautifulSoup...")
+                print(f"Method 1 (ET) failed: {str(e)}, trying tolerant tokenizer...")
             
-            # MÉTHODE 2: BeautifulSoup (fallback, plus lent mais plus tolérant)
+            # MÉTHODE 2: tokenizer tolérant (namespaces, entités invalides, balises
+            # non fermées), événementiel et sans construire d'arbre
             try:
-                soup = BeautifulSoup(content, "html.parser")
-                
-                # Chercher toutes les balises et filtrer par nom (ignore les namespaces)
-                all_elements = soup.find_all(True, recursive=True)
-                info_tables = [t for t in all_elements if t.name and t.name.lower() == "infotable"]
-                
-                if not info_tables:
-                    info_tables = soup.find_all(["infoTable", "InfoTable", "infotable"])
-                
-                if not info_tables:
-                    info_table_parent = soup.find("informationTable")
-                    if info_table_parent:
-                        info_tables = info_table_parent.find_all("infoTable", recursive=True)
-                
-                if info_tables:
-                    print(f"Method 2 (BeautifulSoup): Found {len(info_tables)} infoTable elements")
-                    return parse_holdings_from_beautifulsoup(info_tables)
+                holdings = parse_holdings_tolerant(content)
+                if len(holdings):
+                    print(f"Method 2 (tolerant tokenizer): Found {len(holdings)} infoTable elements")
+                    return holdings.finalize(extract_ticker)
             except Exception as e:
-                print(f"Method 2 (BeautifulSoup) failed: {str(e)}")
+                print(f"Method 2 (tolerant tokenizer) failed: {str(e)}")
                 raise
         
         # Si aucune méthode n'a fonctionné
         print("No holdings found with any parsing method")
-        return []
+        return HoldingsTable()
         
     except Exception as e:
         print(f"Error parsing XML: {str(e)}")
@@ -309,82 +1043,59 @@ def parse_13f_file(content: str, url: str) -> list:
         raise
 
 
-def parse_holdings_from_etree(info_tables) -> list:
+def parse_holdings_from_etree(info_tables) -> HoldingsTable:
     """
     Parse les holdings depuis des éléments xml.etree.ElementTree
     """
-    holdings = []
-    
+    holdings = HoldingsTable()
     for table in info_tables:
-        # Fonction helper pour extraire le texte d'un élément (ignore namespace)
-        def get_text(elem, tag_name):
-            for child in elem:
-                localname = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                if localname.lower() == tag_name.lower():
-                    return child.text.strip() if child.text else ""
-            return ""
-        
-        def get_element(elem, tag_name):
-            for child in elem:
-                localname = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                if localname.lower() == tag_name.lower():
-                    return child
-            return None
-        
-        # Extraire les champs
-        name = get_text(table, "nameOfIssuer")
-        cusip = get_text(table, "cusip")
-        value_text = get_text(table, "value")
-        
-        # Shares: <shrsOrPrnAmt><sshPrnamt>...</sshPrnamt></shrsOrPrnAmt>
-        shrs_elem = get_element(table, "shrsOrPrnAmt")
-        shares_text = ""
-        if shrs_elem:
-            shares_text = get_text(shrs_elem, "sshPrnamt")
-        
-        put_call = get_text(table, "putCall")
-        
-        # Valeurs numériques
-        try:
-            value = int(float(value_text.replace(",", ""))) if value_text else 0
-            shares = int(float(shares_text.replace(",", ""))) if shares_text else 0
-            
-            # Détecter le format (dollars vs milliers)
-            if value > 1_000_000 and shares > 0:
-                price_if_thousands = (value * 1000) / shares
-                if price_if_thousands > 1000:
-                    value_usd = value // 1000
-                else:
-                    value_usd = value
-            else:
-                value_usd = value
-        except:
-            value_usd = 0
-            shares = 0
-        
-        # Type
-        put_call_upper = put_call.upper()
-        holding_type = "put" if put_call_upper == "PUT" else ("call" if put_call_upper == "CALL" else "stock")
-        
-        # Ticker
-        ticker = extract_ticker(name)
-        
-        holdings.append({
-            "ticker": ticker,
-            "cusip": cusip,
-            "shares": shares,
-            "market_value": value_usd,
-            "type": holding_type
-        })
+        append_holding_from_etree(holdings, table)
+    return holdings.finalize(extract_ticker)
+
+
+def _etree_child(elem, tag_name):
+    """Trouver un enfant direct par nom local (ignore namespace et casse)"""
+    tag_name = tag_name.lower()
+    for child in elem:
+        localname = child.tag.split('}')[-1] if '}' in child.tag else child.tag
+        if localname.lower() == tag_name:
+            return child
+    return None
+
+
+def _etree_text(elem, tag_name):
+    child = _etree_child(elem, tag_name)
+    if child is None:
+        return ""
+    return child.text.strip() if child.text else ""
+
+
+def append_holding_from_etree(holdings: HoldingsTable, table):
+    """
+    Ajouter un élément infoTable (xml.etree.ElementTree) à la table de holdings
+    """
+    # Shares: <shrsOrPrnAmt><sshPrnamt>...</sshPrnamt></shrsOrPrnAmt>
+    shrs_elem = _etree_child(table, "shrsOrPrnAmt")
+    shares_text = ""
+    if shrs_elem is not None:
+        shares_text = _etree_text(shrs_elem, "sshPrnamt")
     
-    return holdings
+    holdings.append(
+        _etree_text(table, "nameOfIssuer"),
+        _etree_text(table, "cusip"),
+        _etree_text(table, "value"),
+        shares_text,
+        _etree_text(table, "putCall"),
+        _etree_text(table, "investmentDiscretion"),
+        _etree_text(table, "otherManager")
+    )
 
 
-def parse_holdings_from_beautifulsoup(info_tables) -> list:
+def parse_holdings_from_beautifulsoup(info_tables) -> HoldingsTable:
     """
     Parse les holdings depuis des éléments BeautifulSoup
     """
-    holdings = []
+    holdings = HoldingsTable()
     
     for table in info_tables:
             # Extraire les champs (camelCase dans le XML) - chercher avec différentes casses
@@ -406,69 +1117,34 @@ def parse_holdings_from_beautifulsoup(info_tables) -> list:
             
             put_call_elem = (table.find("putcall") or table.find("putCall") or 
                            table.find("n1:putcall") or table.find("n1:putCall"))
+            discretion_elem = (table.find("investmentdiscretion") or table.find("investmentDiscretion") or
+                               table.find("n1:investmentdiscretion") or table.find("n1:investmentDiscretion"))
+            manager_elem = (table.find("othermanager") or table.find("otherManager") or
+                            table.find("n1:othermanager") or table.find("n1:otherManager"))
             
-            # Extraire les valeurs textuelles
-            name = name_elem.get_text(strip=True) if name_elem else ""
-            cusip = cusip_elem.get_text(strip=True) if cusip_elem else ""
-            
-            # Valeurs numériques
+            # Extraire les valeurs textuelles (conversion et unités dans HoldingsTable)
             # NOTE: Format SEC 13F - valeurs en milliers de dollars
-            # Exception: ARK (CIK 0001697748) utilise parfois des valeurs en dollars
-            # On détecte automatiquement: si value > 1M et prix/action > 1000, c'est en dollars
-            try:
-                value_text = value_elem.get_text(strip=True) if value_elem else "0"
-                value = int(float(value_text.replace(",", ""))) if value_text else 0
-                
-                # Détecter le format (dollars vs milliers)
-                # Si la valeur est très grande (> 1M) et qu'on a des shares, vérifier le prix
-                shares_text = ssh_prnamt_elem.get_text(strip=True) if ssh_prnamt_elem else "0"
-                shares = int(float(shares_text.replace(",", ""))) if shares_text else 0
-                
-                if value > 1_000_000 and shares > 0:
-                    # Calculer prix par action si en milliers
-                    price_if_thousands = (value * 1000) / shares
-                    # Si prix > 1000, probablement en dollars (convertir en milliers)
-                    if price_if_thousands > 1000:
-                        value_usd = value // 1000  # Convertir dollars → milliers
-                    else:
-                        value_usd = value  # Déjà en milliers
-                else:
-                    value_usd = value  # Valeur en milliers de dollars
-            except:
-                value_usd = 0
-            
-            # Shares (déjà extrait ci-dessus pour la détection de format)
-            try:
-                if shares == 0:  # Si pas encore extrait
-                    shares_text = ssh_prnamt_elem.get_text(strip=True) if ssh_prnamt_elem else "0"
-                    shares = int(float(shares_text.replace(",", ""))) if shares_text else 0
-            except:
-                shares = 0
-            
-            # Type (stock, call, put)
-            put_call = put_call_elem.get_text(strip=True).upper() if put_call_elem else ""
-            holding_type = "put" if put_call == "PUT" else ("call" if put_call == "CALL" or put_call == "CALL" else "stock")
-            
-            # Ticker (approximation depuis le nom)
-            ticker = extract_ticker(name)
-            
-            holdings.append({
-                "ticker": ticker,
-                "cusip": cusip,
-                "shares": shares,
-                "market_value": value_usd,
-                "type": holding_type
-            })
+            # Exception: ARK (CIK 0001697748) utilise parfois des valeurs en dollars,
+            # détecté en une passe sur toute la table par HoldingsTable.finalize
+            holdings.append(
+                name_elem.get_text(strip=True) if name_elem else "",
+                cusip_elem.get_text(strip=True) if cusip_elem else "",
+                value_elem.get_text(strip=True) if value_elem else "0",
+                ssh_prnamt_elem.get_text(strip=True) if ssh_prnamt_elem else "0",
+                put_call_elem.get_text(strip=True) if put_call_elem else "",
+                discretion_elem.get_text(strip=True) if discretion_elem else "",
+                manager_elem.get_text(strip=True) if manager_elem else ""
+            )
     
-    return holdings
+    return holdings.finalize(extract_ticker)
 
 
-def extract_ticker(name: str) -> str:
+def extract_ticker(name: str, cusip: str = "") -> str:
     """
-    Extraire le ticker depuis le nom (approximation)
-    En production, utiliser un mapping CUSIP → Ticker
+    Extraire le ticker depuis le CUSIP (index local CUSIP → ticker)
+    Fallback: approximation depuis le nom si le CUSIP est inconnu
     """
-    # TODO: Implémenter mapping CUSIP → Ticker
-    # Pour l'instant, retourner le nom tel quel
+    ticker = cusip_index.lookup_ticker(cusip)
+    if ticker:
+        return ticker
     return name.upper()[:10] if name else ""
-
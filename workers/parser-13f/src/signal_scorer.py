@@ -0,0 +1,66 @@
+"""
+Score d'impact des signaux 13F (fund_signals)
+Chaque changement de position entre deux filings d'un fund est pondéré par:
+- l'influence du fund (funds.tier_influence, 1 à 5)
+- le poids de la position dans le portefeuille (valeur / valeur totale du
+  filing qui la contient: nouveau filing pour new/increase, précédent pour
+  exit/decrease), calculé une fois par filing
+- la taille relative du mouvement (variation de parts / parts détenues)
+
+impact_score = 100 x tier x poids x taille, chaque facteur dans [0, 1]
+"""
+
+from holdings_diff import PositionSet, merge_positions, position_action
+
+DEFAULT_TIER_INFLUENCE = 1
+MAX_TIER_INFLUENCE = 5
+
+# Une position qui pèse 5% du portefeuille ou plus compte pleinement
+FULL_WEIGHT_PORTFOLIO_SHARE = 0.05
+
+
+def tier_factor(tier_influence) -> float:
+    tier = tier_influence or DEFAULT_TIER_INFLUENCE
+    return min(max(tier, 1), MAX_TIER_INFLUENCE) / MAX_TIER_INFLUENCE
+
+
+def score_position_change(tier: float, action: str, new_shares: int, new_value: int, old_shares: int,
+                          old_value: int, new_total: int, old_total: int) -> float:
+    """Score d'un changement de position (0 à 100)"""
+    if action in ("new", "increase"):
+        value, total = new_value, new_total
+    else:
+        value, total = old_value, old_total
+    weight = min(value / total / FULL_WEIGHT_PORTFOLIO_SHARE, 1.0) if total > 0 and value > 0 else 0.0
+
+    if action in ("new", "exit"):
+        size = 1.0
+    else:
+        size = min(abs(new_shares - old_shares) / max(old_shares, 1), 1.0)
+
+    return round(100 * tier * weight * size, 2)
+
+
+def score_filing(new: PositionSet, old: PositionSet, tier_influence, min_score: float = 0.0):
+    """
+    Signaux d'un filing contre le précédent du même fund
+    Un seul merge join; les totaux de portefeuille sont ceux des PositionSet.
+    Génère des dicts {ticker, cusip, type_code, action, impact_score}.
+    """
+    tier = tier_factor(tier_influence)
+    new_total, old_total = new.total_value, old.total_value
+    for cusip, type_code, ticker, new_shares, new_value, old_shares, old_value in merge_positions(new, old):
+        action = position_action(new_shares, old_shares)
+        if action is None:
+            continue
+        score = score_position_change(tier, action, new_shares, new_value, old_shares, old_value,
+                                      new_total, old_total)
+        if score < min_score:
+            continue
+        yield {
+            "ticker": ticker,
+            "cusip": cusip,
+            "type_code": type_code,
+            "action": action,
+            "impact_score": score
+        }
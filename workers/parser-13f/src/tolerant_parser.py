@@ -0,0 +1,101 @@
+"""
+Parser 13F tolérant sans arbre (fallback quand ET.fromstring échoue)
+Basé sur le tokenizer html.parser: accepte les namespaces (n1:infoTable), les
+entités invalides, les balises non fermées et le XML enveloppé dans du HTML.
+Les holdings sont émis au fil des événements, sans construire de DOM.
+"""
+
+from html.parser import HTMLParser
+
+from holdings_table import HoldingsTable
+
+FEED_CHUNK_SIZE = 64 * 1024
+
+# Champs d'un infoTable retenus (noms locaux en minuscules)
+INFO_TABLE_FIELDS = {"nameofissuer", "cusip", "value", "sshprnamt", "putcall", "investmentdiscretion",
+                     "othermanager"}
+
+
+def _localname(tag: str) -> str:
+    return tag.rsplit(":", 1)[-1]
+
+
+class InfoTableTokenizer(HTMLParser):
+    """Machine à états sur les événements start/end/data du tokenizer"""
+
+    def __init__(self, holdings: HoldingsTable):
+        super().__init__(convert_charrefs=True)
+        self.holdings = holdings
+        self.in_info_table = False
+        self.fields = {}
+        self.current_field = None
+        self.buffer = []
+
+    def handle_starttag(self, tag, attrs):
+        name = _localname(tag)
+        if name == "infotable":
+            # infoTable non fermé: émettre le précédent avant d'ouvrir le suivant
+            if self.in_info_table:
+                self._emit()
+            self.in_info_table = True
+            self.fields = {}
+        elif self.in_info_table and name in INFO_TABLE_FIELDS:
+            self._close_field()
+            self.current_field = name
+            self.buffer = []
+
+    def handle_endtag(self, tag):
+        name = _localname(tag)
+        if name == "infotable":
+            if self.in_info_table:
+                self._emit()
+        elif name == self.current_field:
+            self._close_field()
+
+    def handle_data(self, data):
+        if self.current_field is not None:
+            self.buffer.append(data)
+
+    def unknown_decl(self, data):
+        # <![CDATA[...]]> dans un champ
+        if self.current_field is not None and data.startswith("CDATA["):
+            self.buffer.append(data[6:])
+
+    def _close_field(self):
+        if self.current_field is not None:
+            self.fields.setdefault(self.current_field, "".join(self.buffer).strip())
+            self.current_field = None
+            self.buffer = []
+
+    def _emit(self):
+        self._close_field()
+        fields = self.fields
+        self.holdings.append(
+            fields.get("nameofissuer", ""),
+            fields.get("cusip", ""),
+            fields.get("value", ""),
+            fields.get("sshprnamt", ""),
+            fields.get("putcall", ""),
+            fields.get("investmentdiscretion", ""),
+            fields.get("othermanager", "")
+        )
+        self.in_info_table = False
+        self.fields = {}
+
+    def close(self):
+        super().close()
+        if self.in_info_table:
+            self._emit()
+
+
+def parse_holdings_tolerant(content: str) -> HoldingsTable:
+    """
+    Extraire les infoTable d'un document 13F (XML malformé ou HTML) sans DOM
+    La table retournée n'est pas finalisée (unités/tickers à la charge de l'appelant).
+    """
+    holdings = HoldingsTable()
+    tokenizer = InfoTableTokenizer(holdings)
+    for start in range(0, len(content), FEED_CHUNK_SIZE):
+        tokenizer.feed(content[start:start + FEED_CHUNK_SIZE])
+    tokenizer.close()
+    return holdings
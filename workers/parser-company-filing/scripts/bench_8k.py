@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'extraction des items 8-K
+8-K synthétiques (paragraphes imbriqués dans --depth divs, trois Items, faits
+iXBRL) de taille croissante. Pour chaque document:
+- texte de recherche: ancienne concaténation des get_text() de chaque balise
+  (div, p, td, span, ... imbriqués: texte répété à chaque niveau) contre la
+  passe en flux de block_text (chaque bloc une fois)
+- scan des Items: trois patterns successifs sur l'ancien texte contre
+  item_scanner.scan_items (une passe, un item par numéro) sur le texte en flux
+- extract_8k_items complet (ParsedDocument, temps par étape)
+Chaque Item est suivi d'un renvoi "the information in this Item X.XX ..."
+(cas réel des 8-K), compté comme item par l'ancien scan.
+
+Usage:
+  python3 scripts/bench_8k.py
+  python3 scripts/bench_8k.py --paragraphs 200,1000,5000 --depth 12
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import sys
+import time
+
+WORKER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Dépendances vendorisées dans parser-13f (bs4)
+sys.path[:0] = [os.path.join(WORKER_DIR, "src"), os.path.join(os.path.dirname(WORKER_DIR), "parser-13f")]
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from block_text import extract_blocks  # noqa: E402
+from item_scanner import scan_items  # noqa: E402
+
+with contextlib.redirect_stdout(io.StringIO()):
+    import index  # noqa: E402
+from parsed_document import ParsedDocument  # noqa: E402
+
+ITEMS = (("2.02", "Results of Operations and Financial Condition"), ("7.01", "Regulation FD Disclosure"),
+         ("9.01", "Financial Statements and Exhibits"))
+# Anciens patterns de extract_8k_items, appliqués l'un après l'autre (référence)
+LEGACY_ITEM_PATTERNS = [
+    re.compile(r"Item\s+(\d+)\.(\d+)\s*[-–]\s*(.+)", re.IGNORECASE),
+    re.compile(r"Item\s+(\d+)\.(\d+)\s*:\s*(.+)", re.IGNORECASE),
+    re.compile(r"Item\s+(\d+)\.(\d+)\s+(.+)", re.IGNORECASE),
+]
+
+
+def build_8k(paragraphs: int, depth: int) -> bytes:
+    """8-K iXBRL: en-tête caché (unités, contextes), Items suivis de paragraphes imbriqués, faits"""
+    rng = random.Random(paragraphs)
+    opening, closing = "<div>" * depth, "</div>" * depth
+    parts = ['<html><head><title>8-K</title></head><body>',
+             '<div style="display:none"><ix:header><ix:resources>'
+             '<xbrli:unit id="usd"><xbrli:measure>iso4217:USD</xbrli:measure></xbrli:unit>'
+             '<xbrli:context id="c-1"><xbrli:period><xbrli:startDate>2025-07-28</xbrli:startDate>'
+             '<xbrli:endDate>2025-10-26</xbrli:endDate></xbrli:period></xbrli:context>'
+             '</ix:resources></ix:header></div>']
+    for number, title in ITEMS:
+        parts.append(f"{opening}<p><span>Item {number} - {title}</span></p>{closing}")
+        for i in range(paragraphs // len(ITEMS)):
+            parts.append(f"{opening}<p>On November 19, 2025, the Company reported revenue of $57.0 billion, "
+                         f"up {rng.randint(1, 90)}%. <span>Paragraph {i}</span></p>{closing}")
+        parts.append(f"{opening}<p>The information in this Item {number} shall not be deemed filed.</p>{closing}")
+    parts.append('<table><tr><td>Revenue</td><td><ix:nonFraction name="us-gaap:Revenues" contextRef="c-1" '
+                 'unitRef="usd" scale="6" decimals="-6">57,006</ix:nonFraction></td></tr></table></body></html>')
+    return "".join(parts).encode()
+
+
+def nested_concatenation(content: bytes) -> str:
+    """Ancien texte de recherche de extract_8k_items (référence)"""
+    soup = BeautifulSoup(content, "html.parser")
+    html_text = ""
+    for tag in soup.find_all(["div", "p", "td", "th", "span", "h1", "h2", "h3", "h4"]):
+        tag_text = tag.get_text(separator=" ", strip=True)
+        if tag_text:
+            html_text += tag_text + "\n"
+    return html_text
+
+
+def legacy_scan(text: str) -> list:
+    return [match for pattern in LEGACY_ITEM_PATTERNS for match in pattern.finditer(text)]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", default="300,1500,6000", help="Paragraphes par document (séparés par ,)")
+    parser.add_argument("--depth", type=int, default=8, help="Divs imbriqués autour de chaque paragraphe")
+    args = parser.parse_args()
+
+    print(f"{'taille':>10} {'texte ancien':>13} {'texte flux':>11} {'concat s':>9} {'flux s':>7} "
+          f"{'items ancien':>13} {'items scan':>11} {'scan ms':>15} {'extract_8k_items s':>19}")
+    for paragraphs in [int(p) for p in args.paragraphs.split(",")]:
+        content = build_8k(paragraphs, args.depth)
+        old_text, old_seconds = timed(nested_concatenation, content)
+        (new_text, _), new_seconds = timed(extract_blocks, content)
+        old_items, old_scan_seconds = timed(legacy_scan, old_text)
+        new_items, new_scan_seconds = timed(scan_items, new_text)
+
+        doc = ParsedDocument(content)
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, extract_seconds = timed(index.extract_8k_items, doc, "bench")
+
+        print(f"{len(content) / 1024:>8,.0f}Ko {len(old_text) / 1024:>11,.0f}Ko {len(new_text) / 1024:>9,.0f}Ko "
+              f"{old_seconds:>9.2f} {new_seconds:>7.2f} {len(old_items):>13} {len(new_items):>11} "
+              f"{old_scan_seconds * 1000:>7.1f} → {new_scan_seconds * 1000:<5.1f} {extract_seconds:>19.2f}")
+        print(f"{'':>10} étapes (ms): {doc.timings_ms()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,8 +15,11 @@ cd "$WORKER_DIR"
 rm -rf package
 mkdir -p package
 
-# Copier le code source
-cp src/index.py package/
+# Copier le code source (index.py + modules partagés)
+cp src/*.py package/
+
+# Store companyfacts (scripts/ingest-companyfacts.py), s'il a été construit
+if [ -d src/data ]; then cp -R src/data package/data; fi
 
 # Installer les dépendances (avec toutes les dépendances transitives)
 pip install -r requirements.txt -t package/ --platform linux_x86_64 --only-binary=:all: 2>/dev/null || \
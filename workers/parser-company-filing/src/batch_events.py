@@ -0,0 +1,99 @@
+"""
+Mode batch des handlers: plusieurs filings par invocation Lambda
+Formats acceptés en plus de l'event EventBridge unitaire ({"detail": {...}}):
+- batch SQS ({"Records": [...]}): le body de chaque message est un event
+  EventBridge ou directement le detail du filing
+- tableau JSON: liste d'events EventBridge ou de details
+
+Les filings d'un batch sont traités en parallèle (BATCH_CONCURRENCY threads)
+dans la même invocation: pool de connexions HTTP, limiteur SEC, archive brute
+et caches de module sont partagés.
+
+Résultat:
+- SQS: {"batchItemFailures": [{"itemIdentifier": messageId}, ...]}, à utiliser
+  avec ReportBatchItemFailures sur l'event source mapping (seuls les messages
+  en échec reviennent dans la queue)
+- tableau: statusCode 200 (tout réussi) ou 207, body avec le résultat par item
+
+Fichier identique dans workers/parser-13f et workers/parser-company-filing.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "4"))
+
+
+def is_batch(event) -> bool:
+    return isinstance(event, list) or (isinstance(event, dict) and "Records" in event)
+
+
+def _as_event(payload) -> dict:
+    """Event EventBridge à partir d'un event complet ou d'un detail seul"""
+    if isinstance(payload, dict) and isinstance(payload.get("detail"), dict):
+        return payload
+    return {"detail": payload if isinstance(payload, dict) else {}}
+
+
+def items(event) -> list:
+    """[(identifiant, event unitaire), ...] dans l'ordre du batch"""
+    if isinstance(event, list):
+        return [(str(position), _as_event(payload)) for position, payload in enumerate(event)]
+
+    batch = []
+    for position, record in enumerate(event.get("Records") or []):
+        item_id = record.get("messageId") or str(position)
+        try:
+            payload = json.loads(record.get("body") or "{}")
+        except ValueError:
+            payload = {}
+        batch.append((item_id, _as_event(payload)))
+    return batch
+
+
+def _failed(response) -> bool:
+    # 4xx compris: un message invalide repart dans la queue puis en DLQ plutôt que d'être perdu
+    return not isinstance(response, dict) or response.get("statusCode", 500) >= 400
+
+
+def _error_response(error: Exception) -> dict:
+    return {"statusCode": 500, "body": json.dumps({"error": str(error)})}
+
+
+def report(event, batch: list, responses: list) -> dict:
+    """Réponse du handler pour un batch (format SQS ou tableau)"""
+    failed = [item_id for (item_id, _), response in zip(batch, responses) if _failed(response)]
+    print(f"[BATCH] {len(batch) - len(failed)}/{len(batch)} filings traités, {len(failed)} en échec")
+
+    if not isinstance(event, list):
+        return {"batchItemFailures": [{"itemIdentifier": item_id} for item_id in failed]}
+
+    results = []
+    for (item_id, _), response in zip(batch, responses):
+        try:
+            body = json.loads(response.get("body") or "{}")
+        except (AttributeError, ValueError):
+            body = {}
+        results.append({"item": item_id, "statusCode": response.get("statusCode", 500), **body})
+    return {
+        "statusCode": 207 if failed else 200,
+        "body": json.dumps({"succeeded": len(batch) - len(failed), "failed": len(failed), "results": results})
+    }
+
+
+def run_batch(event, handle_one, concurrency: int = None) -> dict:
+    """Traiter chaque event unitaire du batch avec handle_one(event) -> réponse du handler"""
+    batch = items(event)
+
+    def run(item):
+        try:
+            return handle_one(item[1])
+        except Exception as e:
+            print(f"[BATCH] Item {item[0]} en échec: {e}")
+            return _error_response(e)
+
+    workers = max(1, min(concurrency or BATCH_CONCURRENCY, len(batch) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        responses = list(pool.map(run, batch))
+    return report(event, batch, responses)
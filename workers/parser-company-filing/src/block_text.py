@@ -0,0 +1,109 @@
+"""
+Texte par blocs d'un document HTML en une passe, sans arbre
+Un parseur événementiel (html.parser.HTMLParser, alimenté par morceaux) coupe
+le texte à chaque ouverture / fermeture de balise de bloc (div, p, td, tr,
+h1-h6, li, br, ...). Chaque bloc est émis une seule fois, espaces normalisés,
+avec ses offsets dans le texte produit et dans le HTML source: le texte d'un
+div imbriqué n'est plus répété par chacun de ses ancêtres, et la
+construction reste linéaire en la taille du document.
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import List, NamedTuple, Tuple
+
+# Balises qui délimitent un bloc de texte (les balises en ligne comme span, b, a ne coupent pas)
+BLOCK_TAGS = frozenset([
+    "address", "article", "aside", "blockquote", "body", "br", "caption", "center", "dd", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr",
+    "html", "li", "main", "nav", "ol", "p", "pre", "section", "table", "tbody", "td", "tfoot", "th", "thead",
+    "title", "tr", "ul",
+])
+# Contenu jamais affiché
+SKIPPED_TAGS = frozenset(["script", "style"])
+
+FEED_CHUNK_SIZE = 1 << 16
+WHITESPACE = re.compile(r"\s+")
+
+
+class TextBlock(NamedTuple):
+    start: int          # offset du bloc dans le texte produit
+    end: int
+    source_offset: int  # offset (caractères) du début du bloc dans le HTML décodé
+
+
+class _BlockParser(HTMLParser):
+    def __init__(self, line_offsets: List[int]):
+        super().__init__(convert_charrefs=True)
+        self.line_offsets = line_offsets
+        self.parts = []
+        self.blocks = []
+        self.length = 0
+        self.pending = []
+        self.pending_offset = None
+        self.skip_depth = 0
+
+    def _source_offset(self) -> int:
+        line, column = self.getpos()
+        return self.line_offsets[line - 1] + column
+
+    def _flush(self):
+        if not self.pending:
+            return
+        text = WHITESPACE.sub(" ", "".join(self.pending)).strip()
+        self.pending = []
+        if text:
+            self.blocks.append(TextBlock(self.length, self.length + len(text), self.pending_offset))
+            self.parts.append(text)
+            self.parts.append("\n")
+            self.length += len(text) + 1
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        if not self.pending:
+            self.pending_offset = self._source_offset()
+        self.pending.append(data)
+
+
+def decode_html(content) -> str:
+    if isinstance(content, str):
+        return content
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        # Documents EDGAR anciens: Windows-1252 / Latin-1
+        return content.decode("cp1252", errors="replace")
+
+
+def extract_blocks(content) -> Tuple[str, List[TextBlock]]:
+    """(texte, blocs): un bloc par ligne du texte, dans l'ordre du document"""
+    html = decode_html(content)
+    line_offsets = [0]
+    position = html.find("\n")
+    while position != -1:
+        line_offsets.append(position + 1)
+        position = html.find("\n", position + 1)
+
+    parser = _BlockParser(line_offsets)
+    for start in range(0, len(html), FEED_CHUNK_SIZE):
+        parser.feed(html[start:start + FEED_CHUNK_SIZE])
+    parser.close()
+    parser._flush()
+    return "".join(parser.parts), parser.blocks
@@ -0,0 +1,161 @@
+"""
+Store local des companyfacts SEC pour les métriques earnings
+Alimenté hors ligne par scripts/ingest-companyfacts.py depuis companyfacts.zip
+(ou un répertoire de CIK##########.json): un fichier compact par CIK, qui ne
+garde que les concepts des métriques earnings (revenue, net income, EPS) sur
+des trimestres (durées de 80 à 100 jours), la valeur du dernier dépôt
+l'emportant en cas de retraitement.
+
+Format d'un fichier CIK##########.json:
+{
+  "cik": "0001045810", "entity": "NVIDIA CORP",
+  "facts": {"us-gaap:Revenues": {"2025-10-26": 57006000000, ...}, ...},
+  "months": {"2025-11": ["2025-10-26"], ...}
+}
+"months" associe chaque mois aux fins de trimestre des MAX_REPORT_LAG_DAYS jours précédents:
+le trimestre publié par un 8-K se retrouve depuis sa date de dépôt en O(1),
+puis chaque métrique est une lecture de dictionnaire (concept, fin de période).
+"""
+
+import json
+import os
+import threading
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+COMPANYFACTS_STORE = os.environ.get(
+    "COMPANYFACTS_STORE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "companyfacts")
+)
+
+# Concepts par métrique, par priorité (mêmes métriques que extract_xbrl_metrics)
+METRIC_CONCEPTS = {
+    "revenue": ("us-gaap:Revenues", "us-gaap:RevenueFromContractWithCustomerExcludingAssessedTax",
+                "us-gaap:SalesRevenueNet"),
+    "net_income": ("us-gaap:NetIncomeLoss",),
+    "eps_basic": ("us-gaap:EarningsPerShareBasic",),
+    "eps_diluted": ("us-gaap:EarningsPerShareDiluted",),
+}
+CONCEPT_UNITS = ("USD", "USD/shares")
+QUARTER_DAYS = (80, 100)
+# Délai maximal entre la fin du trimestre et le 8-K de résultats. Inférieur à la durée minimale
+# d'un trimestre (QUARTER_DAYS): un trimestre encore absent du store (10-Q pas encore déposé)
+# ne fait jamais retomber sur le trimestre précédent
+MAX_REPORT_LAG_DAYS = 75
+
+_stores = {}
+_lock = threading.Lock()
+
+
+def normalize_cik(cik) -> str:
+    return str(cik).strip().zfill(10)
+
+
+def store_path(cik, root: str = None) -> str:
+    return os.path.join(root or COMPANYFACTS_STORE, f"CIK{normalize_cik(cik)}.json")
+
+
+def build_cik_store(companyfacts: dict) -> Optional[dict]:
+    """Fichier compact d'un CIK depuis le JSON companyfacts de la SEC (None si aucun fait utile)"""
+    taxonomies = companyfacts.get("facts") or {}
+    facts = {}
+    for concepts in METRIC_CONCEPTS.values():
+        for concept in concepts:
+            taxonomy, name = concept.split(":", 1)
+            units = ((taxonomies.get(taxonomy) or {}).get(name) or {}).get("units") or {}
+            latest = {}
+            for unit in CONCEPT_UNITS:
+                for entry in units.get(unit, []):
+                    start, end, value = entry.get("start"), entry.get("end"), entry.get("val")
+                    if not start or not end or value is None:
+                        continue
+                    days = (date.fromisoformat(end) - date.fromisoformat(start)).days
+                    if not QUARTER_DAYS[0] <= days <= QUARTER_DAYS[1]:
+                        continue
+                    filed = entry.get("filed") or ""
+                    if end not in latest or filed >= latest[end][0]:
+                        latest[end] = (filed, value)
+            if latest:
+                facts[concept] = {end: value for end, (_, value) in sorted(latest.items())}
+    if not facts:
+        return None
+
+    months = {}
+    for end in sorted({end for periods in facts.values() for end in periods}):
+        day = date.fromisoformat(end)
+        last = day + timedelta(days=MAX_REPORT_LAG_DAYS)
+        month = date(day.year, day.month, 1)
+        while month <= last:
+            months.setdefault(month.isoformat()[:7], []).append(end)
+            month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+    return {
+        "cik": normalize_cik(companyfacts.get("cik", "")),
+        "entity": companyfacts.get("entityName"),
+        "facts": facts,
+        "months": months,
+    }
+
+
+def write_cik_store(store: dict, root: str = None) -> str:
+    path = store_path(store["cik"], root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(store, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_cik_store(cik) -> Optional[dict]:
+    """Fichier du CIK, lu une fois par conteneur (None si absent du store)"""
+    key = normalize_cik(cik)
+    if key not in _stores:
+        with _lock:
+            if key not in _stores:
+                try:
+                    with open(store_path(key)) as f:
+                        _stores[key] = json.load(f)
+                except FileNotFoundError:
+                    _stores[key] = None
+    return _stores[key]
+
+
+def is_enabled() -> bool:
+    return bool(COMPANYFACTS_STORE) and os.path.isdir(COMPANYFACTS_STORE)
+
+
+def quarter_end(store: dict, report_date: str) -> Optional[str]:
+    """Fin du dernier trimestre connu terminé au plus MAX_REPORT_LAG_DAYS jours avant report_date"""
+    reported = date.fromisoformat(report_date[:10])
+    best = None
+    for end in store["months"].get(report_date[:7], []):
+        lag = (reported - date.fromisoformat(end)).days
+        if 0 <= lag <= MAX_REPORT_LAG_DAYS and (best is None or end > best):
+            best = end
+    return best
+
+
+def lookup_earnings(cik, report_date: Optional[str], period_end: Optional[str] = None) -> Dict[str, float]:
+    """
+    Métriques earnings du trimestre publié par un 8-K ({} si le store n'a rien)
+    period_end: fin du trimestre déclarée par le document (contextes iXBRL), seul trimestre accepté.
+    Sinon le trimestre est déduit de report_date (date de l'événement, sinon de dépôt).
+    """
+    if not cik or not (report_date or period_end) or not is_enabled():
+        return {}
+    store = load_cik_store(cik)
+    if store is None:
+        return {}
+    end = period_end or quarter_end(store, report_date)
+    if end is None:
+        return {}
+
+    metrics = {}
+    for metric, concepts in METRIC_CONCEPTS.items():
+        for concept in concepts:
+            value = store["facts"].get(concept, {}).get(end)
+            if value is not None:
+                metrics[metric] = value
+                break
+    return metrics
@@ -0,0 +1,392 @@
+"""
+Client HTTP partagé pour les workers Python
+Un seul jeu de pools de connexions keep-alive, réutilisé entre les invocations
+à chaud de la Lambda (état au niveau du module):
+- EDGAR (sec.gov) et autres hôtes: requests.Session, un pool urllib3 par hôte
+- PostgREST (Supabase): httpx.Client en HTTP/2 (multiplexage) si httpx + h2
+  sont disponibles, sinon la même requests.Session
+Les requêtes vers EDGAR passent par un token bucket partagé par tous les threads
+du processus (SEC_RATE_LIMIT req/s), avec retry et ralentissement adaptatif sur
+429/403/503.
+Les corps JSON des écritures PostgREST sont envoyés en gzip tant que le serveur
+l'accepte (post_json).
+"""
+
+import asyncio
+import gzip
+import os
+import random
+import threading
+import time
+import weakref
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    import h2  # noqa: F401 - requis par httpx pour HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTP2_AVAILABLE = False
+
+HTTP_POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "10"))
+HTTP2_ENABLED = os.environ.get("HTTP2_ENABLED", "true").lower() not in ("0", "false", "no")
+
+_lock = threading.Lock()
+_session = None
+_http2_client = None
+_http2_hosts = None
+
+# Compteurs HTTP/2: connexions vues (par identité du network stream httpcore)
+_http2_streams = weakref.WeakSet()
+_http2_stats = {}
+
+
+def _get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS,
+                                      pool_maxsize=HTTP_POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def _get_http2_client():
+    global _http2_client
+    if _http2_client is None:
+        with _lock:
+            if _http2_client is None:
+                _http2_client = httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=HTTP_POOL_MAXSIZE,
+                                        max_keepalive_connections=HTTP_POOL_MAXSIZE),
+                    timeout=60,
+                )
+    return _http2_client
+
+
+def _get_http2_hosts() -> set:
+    """Hôtes servis en HTTP/2: l'API Supabase + HTTP2_HOSTS (séparés par des virgules)"""
+    global _http2_hosts
+    if _http2_hosts is None:
+        hosts = set()
+        supabase_url = os.environ.get("SUPABASE_URL")
+        if supabase_url:
+            hosts.add(urlsplit(supabase_url).netloc)
+        for host in os.environ.get("HTTP2_HOSTS", "").split(","):
+            if host.strip():
+                hosts.add(host.strip())
+        _http2_hosts = hosts
+    return _http2_hosts
+
+
+# Limite EDGAR (~10 req/s par client): un seul bucket pour tous les hôtes SEC du processus.
+# Les outils batch multi-processus répartissent SEC_RATE_LIMIT entre leurs processus.
+SEC_RATE_LIMIT = float(os.environ.get("SEC_RATE_LIMIT", "10"))
+SEC_RATE_BURST = float(os.environ.get("SEC_RATE_BURST", "0")) or max(SEC_RATE_LIMIT, 1.0)
+SEC_RATE_LIMIT_HOSTS = os.environ.get("SEC_RATE_LIMIT_HOSTS", "www.sec.gov,sec.gov,data.sec.gov,efts.sec.gov")
+SEC_MAX_RETRIES = int(os.environ.get("SEC_MAX_RETRIES", "4"))
+SEC_BACKOFF_BASE = float(os.environ.get("SEC_BACKOFF_BASE", "1"))
+SEC_BACKOFF_MAX = float(os.environ.get("SEC_BACKOFF_MAX", "20"))
+SEC_THROTTLE_STATUSES = (403, 429, 503)
+
+_sec_limiter = None
+_sec_hosts = None
+_rate_limit_stats = {"requests": 0, "waited_requests": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+                     "throttled": {}, "retries": 0, "gave_up": 0}
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe à débit adaptatif
+    Un throttling divise le débit par deux et suspend tous les threads pendant le
+    backoff; chaque succès le remonte progressivement vers le débit nominal.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Prendre un jeton, en attendant si nécessaire; retourne le temps attendu (s)"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                else:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def throttle(self, delay: float):
+        with self.lock:
+            self.rate = max(self.rate / 2, min(self.max_rate, 0.5))
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self.tokens = 0.0
+            self.updated = self.paused_until
+
+    def success(self):
+        if self.rate < self.max_rate:
+            with self.lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+def _get_sec_limiter(url: str):
+    """Bucket EDGAR si l'URL vise un hôte SEC (ou SEC_BASE_URL), sinon None"""
+    global _sec_limiter, _sec_hosts
+    if SEC_RATE_LIMIT <= 0:
+        return None
+    if _sec_hosts is None:
+        hosts = {host.strip() for host in SEC_RATE_LIMIT_HOSTS.split(",") if host.strip()}
+        if os.environ.get("SEC_BASE_URL"):
+            hosts.add(urlsplit(os.environ["SEC_BASE_URL"]).netloc)
+        _sec_hosts = hosts
+    if urlsplit(url).netloc not in _sec_hosts:
+        return None
+    if _sec_limiter is None:
+        with _lock:
+            if _sec_limiter is None:
+                _sec_limiter = TokenBucket(SEC_RATE_LIMIT, SEC_RATE_BURST)
+    return _sec_limiter
+
+
+def _backoff_delay(response, attempt: int) -> float:
+    """Retry-After si le serveur en donne un, sinon backoff exponentiel avec gigue"""
+    retry_after = response.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), SEC_BACKOFF_MAX)
+        except ValueError:
+            pass
+    return min(SEC_BACKOFF_BASE * 2 ** attempt, SEC_BACKOFF_MAX) * random.uniform(0.75, 1.25)
+
+
+def _record_wait(waited: float):
+    with _lock:
+        _rate_limit_stats["requests"] += 1
+        if waited > 0:
+            _rate_limit_stats["waited_requests"] += 1
+            _rate_limit_stats["wait_seconds"] += waited
+            _rate_limit_stats["max_wait_seconds"] = max(_rate_limit_stats["max_wait_seconds"], waited)
+
+
+def _record_throttle(status: int, gave_up: bool):
+    with _lock:
+        throttled = _rate_limit_stats["throttled"]
+        throttled[str(status)] = throttled.get(str(status), 0) + 1
+        _rate_limit_stats["gave_up" if gave_up else "retries"] += 1
+
+
+def _use_http2(url: str, kwargs: dict) -> bool:
+    # Le streaming (response.raw) reste sur requests
+    if not (HTTP2_AVAILABLE and HTTP2_ENABLED) or kwargs.get("stream"):
+        return False
+    parts = urlsplit(url)
+    return parts.scheme == "https" and parts.netloc in _get_http2_hosts()
+
+
+def request(method: str, url: str, **kwargs):
+    """
+    Envoyer une requête via le pool partagé
+    Accepte les arguments de requests (headers, params, json, data, timeout, stream)
+    Vers EDGAR: jeton du rate limiter, puis retry avec backoff sur 429/403/503
+    (la dernière réponse est retournée si les retries sont épuisés).
+    """
+    limiter = _get_sec_limiter(url)
+    if limiter is None:
+        return _send(method, url, **kwargs)
+
+    attempt = 0
+    while True:
+        _record_wait(limiter.acquire())
+        response = _send(method, url, **kwargs)
+        if response.status_code not in SEC_THROTTLE_STATUSES:
+            limiter.success()
+            return response
+        if attempt >= SEC_MAX_RETRIES:
+            _record_throttle(response.status_code, gave_up=True)
+            return response
+        delay = _backoff_delay(response, attempt)
+        _record_throttle(response.status_code, gave_up=False)
+        print(f"[HTTP] {response.status_code} sur {url}, backoff {delay:.1f}s (retry {attempt + 1}/{SEC_MAX_RETRIES})")
+        response.close()
+        limiter.throttle(delay)
+        attempt += 1
+
+
+async def arequest(client, method: str, url: str, **kwargs):
+    """
+    Équivalent asynchrone de request() pour un httpx.AsyncClient
+    Même rate limiter EDGAR (le jeton est attendu dans un thread) et mêmes retries.
+    stream=True: corps non lu (aiter_bytes), la réponse doit être fermée par l'appelant (aclose).
+    """
+    stream = kwargs.pop("stream", False)
+    limiter = _get_sec_limiter(url)
+    attempt = 0
+    while True:
+        if limiter is not None:
+            _record_wait(await asyncio.to_thread(limiter.acquire))
+        if stream:
+            response = await client.send(client.build_request(method, url, **kwargs), stream=True)
+        else:
+            response = await client.request(method, url, **kwargs)
+        if limiter is None:
+            return response
+        if response.status_code not in SEC_THROTTLE_STATUSES:
+            limiter.success()
+            return response
+        if attempt >= SEC_MAX_RETRIES:
+            _record_throttle(response.status_code, gave_up=True)
+            return response
+        delay = _backoff_delay(response, attempt)
+        _record_throttle(response.status_code, gave_up=False)
+        print(f"[HTTP] {response.status_code} sur {url}, backoff {delay:.1f}s (retry {attempt + 1}/{SEC_MAX_RETRIES})")
+        await response.aclose()
+        limiter.throttle(delay)
+        attempt += 1
+
+
+def _send(method: str, url: str, **kwargs):
+    if not _use_http2(url, kwargs):
+        return _get_session().request(method, url, **kwargs)
+
+    kwargs.pop("stream", None)
+    data = kwargs.pop("data", None)
+    if isinstance(data, (bytes, str)):
+        kwargs["content"] = data
+    elif data is not None:
+        kwargs["data"] = data
+
+    response = _get_http2_client().request(method, url, **kwargs)
+
+    host = urlsplit(url).netloc
+    network_stream = response.extensions.get("network_stream")
+    # Handler appelé depuis plusieurs threads (mode batch): compteurs sous verrou
+    with _lock:
+        host_stats = _http2_stats.setdefault(host, {"requests": 0, "new_connections": 0})
+        host_stats["requests"] += 1
+        if network_stream is not None and network_stream not in _http2_streams:
+            _http2_streams.add(network_stream)
+            host_stats["new_connections"] += 1
+        host_stats["http_version"] = response.http_version
+    return response
+
+
+def get(url: str, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def head(url: str, **kwargs):
+    return request("HEAD", url, **kwargs)
+
+
+def post(url: str, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def patch(url: str, **kwargs):
+    return request("PATCH", url, **kwargs)
+
+
+def delete(url: str, **kwargs):
+    return request("DELETE", url, **kwargs)
+
+
+# Corps gzip: None tant que le support n'est pas établi, puis True (accepté) ou False (refusé)
+_gzip_bodies = None
+
+
+def post_json(url: str, headers: dict, body: bytes, label: str, timeout=60, compress: bool = True):
+    """
+    POST d'un corps JSON déjà encodé, compressé en gzip tant que le serveur l'accepte
+    Le support est sondé une seule fois: un 415, ou un 400 sur le corps gzip alors que le
+    même corps non compressé passe, désactive gzip pour le process; un premier succès le
+    confirme. Ensuite un 400 (erreur de données, RAISE EXCEPTION d'une RPC) est rendu tel
+    quel à l'appelant, sans renvoi non compressé.
+    """
+    global _gzip_bodies
+    if not compress or _gzip_bodies is False:
+        return post(url, headers=headers, data=body, timeout=timeout)
+
+    response = post(url, headers={**headers, "Content-Encoding": "gzip"},
+                    data=gzip.compress(body, compresslevel=5), timeout=timeout)
+    if response.status_code < 400:
+        _gzip_bodies = True
+        return response
+    if response.status_code == 415 or (response.status_code == 400 and _gzip_bodies is None):
+        plain = post(url, headers=headers, data=body, timeout=timeout)
+        if response.status_code == 415 or plain.status_code < 400:
+            print(f"[BULK] gzip refusé par {label} (status {response.status_code}), envoi non compressé")
+            _gzip_bodies = False
+        return plain
+    return response
+
+
+def is_retryable_status(status: int) -> bool:
+    """Erreur transitoire (5xx, 408, 429): une erreur 4xx de données échouerait pareil au retry"""
+    return status >= 500 or status in (408, 429)
+
+
+def rate_limit_stats() -> dict:
+    """Attentes du rate limiter EDGAR, throttlings par statut et retries depuis le démarrage"""
+    with _lock:
+        result = {**_rate_limit_stats, "throttled": dict(_rate_limit_stats["throttled"])}
+    result["wait_seconds"] = round(result["wait_seconds"], 3)
+    result["max_wait_seconds"] = round(result["max_wait_seconds"], 3)
+    if _sec_limiter is not None:
+        result["current_rate"] = round(_sec_limiter.rate, 2)
+    return result
+
+
+def stats() -> dict:
+    """
+    Compteurs de réutilisation des connexions par hôte
+    requests/new_connections/reused depuis le démarrage du conteneur
+    """
+    result = {}
+
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host_stats = result.setdefault(pool.host, {"requests": 0, "new_connections": 0,
+                                                           "http_version": "HTTP/1.1"})
+                host_stats["requests"] += pool.num_requests
+                host_stats["new_connections"] += pool.num_connections
+
+    with _lock:
+        http2_stats = {host: dict(host_stats) for host, host_stats in _http2_stats.items()}
+    for host, host_stats in http2_stats.items():
+        host = host.split(":")[0]
+        merged = result.setdefault(host, {"requests": 0, "new_connections": 0})
+        merged["requests"] += host_stats["requests"]
+        merged["new_connections"] += host_stats["new_connections"]
+        merged["http_version"] = host_stats.get("http_version")
+
+    for host_stats in result.values():
+        host_stats["reused"] = max(host_stats["requests"] - host_stats["new_connections"], 0)
+    return result
@@ -6,16 +6,25 @@ Supporte:
 - Form 4: Insider trading
 """
 
+import itertools
 import json
 import os
-import requests
+import time
+import batch_events
+import companyfacts_store
+import http_client
+import raw_archive
 from bs4 import BeautifulSoup
+from item_scanner import scan_items
+from parsed_document import ParsedDocument
 import re
 from datetime import datetime
 from typing import Dict, List, Optional, Any
 
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
+# Hôte EDGAR (surchargé par le harness de charge local, scripts/edgar-load-test.py)
+SEC_BASE_URL = os.environ.get("SEC_BASE_URL", "https://www.sec.gov").rstrip("/")
 
 # Helper pour faire des requêtes Supabase directement
 def supabase_request(method, table, data=None, filters=None):
@@ -37,11 +46,11 @@ def supabase_request(method, table, data=None, filters=None):
             url += "?" + "&".join(params)
     
     if method == "GET":
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url, headers=headers)
     elif method == "POST":
-        response = requests.post(url, headers=headers, json=data)
+        response = http_client.post(url, headers=headers, json=data)
     elif method == "PATCH":
-        response = requests.patch(url, headers=headers, json=data)
+        response = http_client.patch(url, headers=headers, json=data)
     else:
         raise ValueError(f"Unsupported method: {method}")
     
@@ -52,10 +61,101 @@ def supabase_request(method, table, data=None, filters=None):
     return result
 
 
+# Écriture en masse vers PostgREST: tableaux JSON par chunks, corps gzip,
+# Prefer: return=minimal, et seuls les chunks en échec sont renvoyés
+SUPABASE_BULK_CHUNK_SIZE = int(os.environ.get("SUPABASE_BULK_CHUNK_SIZE", "500"))
+SUPABASE_BULK_MAX_RETRIES = int(os.environ.get("SUPABASE_BULK_MAX_RETRIES", "3"))
+SUPABASE_BULK_GZIP = os.environ.get("SUPABASE_BULK_GZIP", "true").lower() not in ("0", "false", "no")
+
+def supabase_bulk_insert(table, rows, chunk_size=None, max_retries=None):
+    """
+    Insérer des lignes en masse dans une table Supabase (POST d'un tableau JSON par chunk)
+    `rows` peut être une liste ou un itérable (consommé chunk par chunk).
+    Seuls les chunks en erreur transitoire (réseau, 5xx, 408, 429) sont renvoyés:
+    une erreur 4xx de données échouerait pareil.
+    Retourne les statistiques d'écriture (rows, chunks, retries, rows_per_sec).
+    """
+    chunk_size = chunk_size or SUPABASE_BULK_CHUNK_SIZE
+    max_retries = SUPABASE_BULK_MAX_RETRIES if max_retries is None else max_retries
+    url = f"{SUPABASE_URL}/rest/v1/{table}"
+    headers = {
+        "apikey": SUPABASE_KEY,
+        "Authorization": f"Bearer {SUPABASE_KEY}",
+        "Content-Type": "application/json",
+        "Prefer": "return=minimal"
+    }
+    
+    def post_chunk(chunk):
+        """None si le chunk est écrit, sinon (erreur, retentable)"""
+        body = json.dumps(chunk, separators=(",", ":"), default=str).encode("utf-8")
+        try:
+            response = http_client.post_json(url, headers, body, table, compress=SUPABASE_BULK_GZIP)
+        except Exception as e:
+            return e, True
+        if response.status_code < 400:
+            return None
+        return (f"HTTP {response.status_code}: {response.text[:300]}",
+                http_client.is_retryable_status(response.status_code))
+    
+    start = time.perf_counter()
+    total_rows = 0
+    chunk_count = 0
+    retries = 0
+    pending = []
+    rejected = []
+    last_error = None
+    
+    # Envoyer au fil de l'eau, garder uniquement les chunks en échec
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            break
+        chunk_count += 1
+        total_rows += len(chunk)
+        failure = post_chunk(chunk)
+        if failure:
+            last_error, retryable = failure
+            print(f"[BULK] Chunk de {len(chunk)} lignes en échec sur {table}: {last_error}")
+            (pending if retryable else rejected).append(chunk)
+    
+    attempt = 0
+    while pending and attempt < max_retries:
+        attempt += 1
+        time.sleep(min(2 ** attempt * 0.25, 5))
+        failed = []
+        for item in pending:
+            retries += 1
+            failure = post_chunk(item)
+            if failure:
+                last_error, retryable = failure
+                (failed if retryable else rejected).append(item)
+        pending = failed
+    
+    elapsed = time.perf_counter() - start
+    stats = {
+        "table": table,
+        "rows": total_rows,
+        "chunks": chunk_count,
+        "retries": retries,
+        "failed_rows": sum(len(item) for item in pending + rejected),
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(total_rows / elapsed, 1) if elapsed > 0 else None
+    }
+    print(f"[BULK] {table}: {total_rows} lignes en {chunk_count} chunks, "
+          f"{elapsed:.2f}s ({stats['rows_per_sec']} rows/s), retries={retries}")
+    
+    if pending or rejected:
+        raise RuntimeError(f"Bulk insert into {table} failed for {stats['failed_rows']} rows "
+                           f"({len(rejected)} chunks rejected, {len(pending)} after {max_retries} retries): "
+                           f"{last_error}")
+    return stats
+
+
 def handler(event, context):
     """
     Handler principal
-    Event format:
+    Event format (ou batch SQS / tableau d'events, voir batch_events):
     {
         "detail": {
             "filing_id": 123,
@@ -63,11 +163,14 @@ def handler(event, context):
             "cik": "0001045810",
             "form_type": "8-K",
             "accession_number": "0001045810-25-000001",
-            "document_url": "https://..."
+            "document_url": "https://...",
+            "filing_date": "2025-11-19"  # optionnel, lu dans company_filings si absent
         }
     }
     """
     print(f"Parser Company Filing triggered: {json.dumps(event)}")
+    if batch_events.is_batch(event):
+        return batch_events.run_batch(event, lambda item: handler(item, context))
     
     try:
         detail = event.get("detail", {})
@@ -93,6 +196,9 @@ def handler(event, context):
                            {"status": "PARSED"},
                            {"id": filing_id})
         
+        print(f"[HTTP] Connexions: {json.dumps(http_client.stats())}")
+        print(f"[HTTP] Rate limit SEC: {json.dumps(http_client.rate_limit_stats())}")
+        
         return {
             "statusCode": 200,
             "body": json.dumps({
@@ -154,11 +260,11 @@ def parse_8k(filing_id: int, company_id: int, document_url: str, detail: dict):
             cik_clean = detail.get('cik', '').lstrip('0') if detail.get('cik') else ''
             accession_clean = detail.get('accession_number', '').replace('-', '') if detail.get('accession_number') else ''
             if cik_clean and accession_clean:
-                index_url = f"https://www.sec.gov/Archives/edgar/data/{cik_clean}/{accession_clean}/"
+                index_url = f"{SEC_BASE_URL}/Archives/edgar/data/{cik_clean}/{accession_clean}/"
                 print(f"Looking for main 8-K document in index: {index_url}")
                 
                 # Télécharger la page index pour trouver le document HTML principal
-                index_response = requests.get(index_url, headers=headers, timeout=30)
+                index_response = http_client.get(index_url, headers=headers, timeout=30)
                 print(f"Index page response status: {index_response.status_code}")
                 if index_response.status_code == 200:
                     index_soup = BeautifulSoup(index_response.content, "html.parser")
@@ -184,20 +290,20 @@ def parse_8k(filing_id: int, company_id: int, document_url: str, detail: dict):
                             elif href.startswith("/"):
                                 # Vérifier si c'est dans le même répertoire
                                 if base_dir in href or f"/{cik_clean}/{accession_clean}/" in href:
-                                    document_url = f"https://www.sec.gov{href}"
+                                    document_url = f"{SEC_BASE_URL}{href}"
                                 else:
                                     continue  # Lien vers un autre répertoire
                             else:
-                                document_url = f"https://www.sec.gov{base_dir}/{href}"
+                                document_url = f"{SEC_BASE_URL}{base_dir}/{href}"
                             print(f"Found main 8-K document (d8k): {document_url}")
                             found_doc = True
                             break
                     
                     # Priorité 2: Essayer d8k.htm directement (standard pour les 8-K)
                     if not found_doc:
-                        potential_url = f"https://www.sec.gov{base_dir}/d8k.htm"
+                        potential_url = f"{SEC_BASE_URL}{base_dir}/d8k.htm"
                         try:
-                            test_response = requests.head(potential_url, headers=headers, timeout=10)
+                            test_response = http_client.head(potential_url, headers=headers, timeout=10)
                             if test_response.status_code == 200:
                                 document_url = potential_url
                                 print(f"Found main 8-K document (d8k.htm): {document_url}")
@@ -207,9 +313,9 @@ def parse_8k(filing_id: int, company_id: int, document_url: str, detail: dict):
                     
                     # Priorité 3: Essayer d8ka.htm (alternative)
                     if not found_doc:
-                        potential_url = f"https://www.sec.gov{base_dir}/d8ka.htm"
+                        potential_url = f"{SEC_BASE_URL}{base_dir}/d8ka.htm"
                         try:
-                            test_response = requests.head(potential_url, headers=headers, timeout=10)
+                            test_response = http_client.head(potential_url, headers=headers, timeout=10)
                             if test_response.status_code == 200:
                                 document_url = potential_url
                                 print(f"Found main 8-K document (d8ka.htm): {document_url}")
@@ -226,9 +332,9 @@ def parse_8k(filing_id: int, company_id: int, document_url: str, detail: dict):
                         file_patterns = re.findall(r'([a-z0-9\-]+\.htm)', page_text.lower())
                         for pattern in file_patterns:
                             if "xbrl" not in pattern and "ixbrl" not in pattern and "cover" not in pattern and "exhibit" not in pattern and "index" not in pattern:
-                                potential_url = f"https://www.sec.gov{base_dir}/{pattern}"
+                                potential_url = f"{SEC_BASE_URL}{base_dir}/{pattern}"
                                 try:
-                                    test_response = requests.head(potential_url, headers=headers, timeout=10)
+                                    test_response = http_client.head(potential_url, headers=headers, timeout=10)
                                     if test_response.status_code == 200:
                                         document_url = potential_url
                                         print(f"Found main 8-K document (from page content): {document_url}")
@@ -251,13 +357,14 @@ def parse_8k(filing_id: int, company_id: int, document_url: str, detail: dict):
                         for filename in unique_files:
                             if any(x in filename for x in ['xbrl', 'ixbrl', 'cover', 'exhibit', 'index']):
                                 continue
-                            test_url = f"https://www.sec.gov{base_dir}/{filename}"
+                            test_url = f"{SEC_BASE_URL}{base_dir}/{filename}"
                             try:
-                                test_response = requests.head(test_url, headers=headers, timeout=5)
+                                test_response = http_client.head(test_url, headers=headers, timeout=5)
                                 if test_response.status_code == 200:
                                     # Télécharger un petit extrait pour vérifier si c'est lisible
-                                    test_content = requests.get(test_url, headers=headers, timeout=5, stream=True)
+                                    test_content = http_client.get(test_url, headers=headers, timeout=5, stream=True)
                                     chunk = next(test_content.iter_content(1000), b'')
+                                    test_content.close()
                                     if b'Item' in chunk or b'item' in chunk:
                                         document_url = test_url
                                         print(f"Found readable HTML document: {document_url}")
@@ -270,94 +377,105 @@ def parse_8k(filing_id: int, company_id: int, document_url: str, detail: dict):
                         # Dernier fallback: utiliser l'URL extraite directement
                         htm_links = [l for l in all_links if l.endswith(".htm")]
                         print(f"Warning: No main HTML document found in index. Found {len(htm_links)} .htm links: {htm_links[:5]}")
-                        document_url = f"https://www.sec.gov{doc_path}"
+                        document_url = f"{SEC_BASE_URL}{doc_path}"
                         print(f"Using extracted URL (may be XBRL): {document_url}")
                 else:
                     # Fallback: utiliser l'URL extraite directement
-                    document_url = f"https://www.sec.gov{doc_path}"
+                    document_url = f"{SEC_BASE_URL}{doc_path}"
                     print(f"Index page not accessible (status {index_response.status_code}), using extracted document URL: {document_url}")
             else:
                 print(f"Warning: Missing CIK or accession_number. CIK: {cik_clean}, Accession: {accession_clean}")
                 # Fallback: utiliser l'URL extraite directement
-                document_url = f"https://www.sec.gov{doc_path}"
+                document_url = f"{SEC_BASE_URL}{doc_path}"
                 print(f"Using extracted document URL: {document_url}")
     
     # Télécharger le document
     print(f"Downloading document from: {document_url}")
-    response = requests.get(document_url, headers=headers, timeout=30)
-    response.raise_for_status()
-    print(f"Document downloaded, status: {response.status_code}, size: {len(response.content)} bytes")
+    content, raw_storage_path = raw_archive.fetch(document_url, headers=headers, timeout=30)
+    print(f"Document downloaded, size: {len(content)} bytes")
     
-    # Parser le HTML
-    soup = BeautifulSoup(response.content, "html.parser")
+    # Parser le HTML (une seule fois; texte et index des balises partagés par les extracteurs)
+    doc = ParsedDocument(content, document_url)
     
     # Vérifier si c'est vraiment un document 8-K (pas une page d'erreur ou d'accueil)
-    page_text = soup.get_text()[:500].lower()
-    if "sec.gov" in page_text and "skip to" in page_text:
-        print("Warning: Document appears to be SEC.gov homepage, not a 8-K filing")
-        # Essayer de trouver le vrai document dans les liens
-        for link in soup.find_all("a", href=True):
-            href = link.get("href", "")
-            if "edgar" in href.lower() and "data" in href.lower():
-                if href.startswith("http"):
-                    document_url = href
-                elif href.startswith("/"):
-                    document_url = f"https://www.sec.gov{href}"
-                print(f"Found EDGAR link, trying: {document_url}")
-                response = requests.get(document_url, headers=headers, timeout=30)
-                response.raise_for_status()
-                soup = BeautifulSoup(response.content, "html.parser")
-                break
-    
-    # Si le document contient principalement du XBRL, essayer de trouver le texte lisible
-    text = soup.get_text()
-    if "xbrl" in text.lower()[:500] and len([c for c in text[:1000] if c.isalpha()]) < 100:
-        # C'est principalement du XBRL, chercher dans les balises HTML structurées
-        print("Document appears to be XBRL, searching for structured content...")
-        # Chercher dans les divs, sections, etc.
-        for elem in soup.find_all(["div", "section", "p"], string=re.compile(r"Item\s+\d+\.\d+", re.IGNORECASE)):
-            parent = elem.find_parent()
-            if parent:
-                text = parent.get_text()
-                break
+    with doc.stage("homepage_check"):
+        page_text = doc.text[:500].lower()
+        if "sec.gov" in page_text and "skip to" in page_text:
+            print("Warning: Document appears to be SEC.gov homepage, not a 8-K filing")
+            # Essayer de trouver le vrai document dans les liens
+            for link in doc.soup.find_all("a", href=True):
+                href = link.get("href", "")
+                if "edgar" in href.lower() and "data" in href.lower():
+                    if href.startswith("http"):
+                        document_url = href
+                    elif href.startswith("/"):
+                        document_url = f"{SEC_BASE_URL}{href}"
+                    print(f"Found EDGAR link, trying: {document_url}")
+                    content, raw_storage_path = raw_archive.fetch(document_url, headers=headers, timeout=30)
+                    doc = ParsedDocument(content, document_url)
+                    break
+    
+    # Date de dépôt: le store companyfacts retrouve le trimestre publié par le 8-K
+    detail = {**detail, "filing_date": resolve_filing_date(filing_id, detail)}
     
     # Extraire les items du 8-K
-    events = extract_8k_items(soup, document_url)
+    with doc.stage("items"):
+        events = extract_8k_items(doc, document_url, detail)
     
     print(f"Extracted {len(events)} events from 8-K")
+    print(f"[8-K] Temps par étape (ms): {json.dumps(doc.timings_ms())}")
+    
+    # Insérer les événements dans company_events (un seul POST en masse)
+    try:
+        supabase_bulk_insert("company_events", [{
+            "company_id": company_id,
+            "filing_id": filing_id,
+            "event_type": event["event_type"],
+            "event_date": event.get("event_date"),
+            "title": event.get("title"),
+            "summary": event.get("summary"),
+            "importance_score": event.get("importance_score", 5),
+            "raw_data": event.get("raw_data", {})
+        } for event in events])
+        print(f"Inserted events: {[event['event_type'] for event in events]}")
+    except Exception as e:
+        print(f"Error inserting events: {e}")
     
-    # Insérer les événements dans company_events
+    # ✅ NOUVEAU: Analyser les earnings si c'est un Item 2.02
     for event in events:
-        try:
-            supabase_request("POST", "company_events", {
-                "company_id": company_id,
-                "filing_id": filing_id,
-                "event_type": event["event_type"],
-                "event_date": event.get("event_date"),
-                "title": event.get("title"),
-                "summary": event.get("summary"),
-                "importance_score": event.get("importance_score", 5),
-                "raw_data": event.get("raw_data", {})
-            })
-            print(f"Inserted event: {event['event_type']}")
-            
-            # ✅ NOUVEAU: Analyser les earnings si c'est un Item 2.02
-            if event["event_type"] == "earnings":
+        if event["event_type"] == "earnings":
+            try:
                 earnings_metrics = event.get("raw_data", {}).get("earnings_metrics", {})
                 ticker = detail.get('ticker', 'UNKNOWN')
                 analyze_earnings_and_create_alerts(company_id, filing_id, earnings_metrics, ticker)
-                
-        except Exception as e:
-            print(f"Error inserting event: {e}")
-            continue
+            except Exception as e:
+                print(f"Error analyzing earnings: {e}")
+                continue
     
-    # Marquer le filing comme parsé
-    supabase_request("PATCH", "company_filings",
-                    {"status": "PARSED"},
-                    {"id": filing_id})
+    # Marquer le filing comme parsé (et l'emplacement du document brut archivé)
+    mark_filing_parsed(filing_id, raw_storage_path)
+
 
+def resolve_filing_date(filing_id: int, detail: dict) -> Optional[str]:
+    """filing_date de l'event, sinon de company_filings (seulement si le store companyfacts est présent)"""
+    if detail.get("filing_date") or not companyfacts_store.is_enabled():
+        return detail.get("filing_date")
+    try:
+        rows = supabase_request("GET", "company_filings", filters={"id": filing_id}) or []
+        return rows[0].get("filing_date") if rows else None
+    except Exception as e:
+        print(f"[COMPANYFACTS] filing_date introuvable pour filing {filing_id}: {e}")
+        return None
 
-def extract_8k_items(soup: BeautifulSoup, document_url: str) -> List[Dict[str, Any]]:
+
+def mark_filing_parsed(filing_id: int, raw_storage_path: Optional[str]):
+    filing_update = {"status": "PARSED"}
+    if raw_storage_path:
+        filing_update["raw_storage_path"] = raw_storage_path
+    supabase_request("PATCH", "company_filings", filing_update, {"id": filing_id})
+
+
+def extract_8k_items(doc: ParsedDocument, document_url: str, detail: Optional[dict] = None) -> List[Dict[str, Any]]:
     """
     Extraire les items d'un 8-K avec focus sur les earnings
     Format typique:
@@ -366,28 +484,14 @@ def extract_8k_items(soup: BeautifulSoup, document_url: str) -> List[Dict[str, A
     """
     events = []
     
-    # Chercher les items 8-K (format: "Item X.XX")
-    # Patterns plus flexibles pour capturer différentes variations
-    item_patterns = [
-        re.compile(r"Item\s+(\d+)\.(\d+)\s*[-–]\s*(.+)", re.IGNORECASE),  # Item 2.02 - Title
-        re.compile(r"Item\s+(\d+)\.(\d+)\s*:\s*(.+)", re.IGNORECASE),  # Item 2.02: Title
-        re.compile(r"Item\s+(\d+)\.(\d+)\s+(.+)", re.IGNORECASE),  # Item 2.02 Title
-    ]
-    
     # Chercher dans tout le texte
-    text = soup.get_text()
+    text = doc.text
     print(f"Document text length: {len(text)} characters")
     print(f"First 500 chars: {text[:500]}")
     
     # Chercher aussi dans les balises HTML structurées (divs, p, td, etc.)
-    html_text = ""
-    for tag in soup.find_all(["div", "p", "td", "th", "span", "h1", "h2", "h3", "h4"]):
-        tag_text = tag.get_text(separator=" ", strip=True)
-        if tag_text:
-            html_text += tag_text + "\n"
-    
     # Utiliser le texte HTML structuré si disponible, sinon le texte brut
-    search_text = html_text if html_text else text
+    search_text = doc.block_text or text
     print(f"Search text length: {len(search_text)} characters")
     
     # Mapping des items 8-K vers les types d'événements
@@ -402,45 +506,38 @@ def extract_8k_items(soup: BeautifulSoup, document_url: str) -> List[Dict[str, A
         "7.01": {"type": "regulation_fd", "importance": 4},
     }
     
-    # Trouver tous les items avec tous les patterns
-    found_items = []
-    for pattern in item_patterns:
-        for match in pattern.finditer(search_text):
-            item_num = f"{match.group(1)}.{match.group(2)}"
-            item_title = match.group(3).strip() if len(match.groups()) > 2 else ""
-            found_items.append((match.start(), item_num, item_title, match))
-    
-    # Trier par position dans le document
-    found_items.sort(key=lambda x: x[0])
-    print(f"Found {len(found_items)} potential items: {[(num, title[:50]) for _, num, title, _ in found_items[:5]]}")
+    # Trouver les en-têtes d'items en une passe (un par numéro, dans l'ordre du document)
+    found_items = scan_items(search_text)
+    print(f"Found {len(found_items)} items: {[(span.item, span.title[:50]) for span in found_items[:5]]}")
     
     # Traiter chaque item trouvé
-    for i, (start_pos, item_num, item_title, match) in enumerate(found_items):
+    for span in found_items:
+        item_num = span.item
+        item_title = span.title
         # Déterminer le type d'événement
         event_info = item_mapping.get(item_num, {"type": "other_event", "importance": 5})
         
-        # Extraire le contenu de l'item (texte suivant jusqu'au prochain item ou fin)
-        content_start = match.end()
-        next_start = found_items[i + 1][0] if i + 1 < len(found_items) else len(search_text)
-        item_content = search_text[content_start:next_start].strip()
+        # Contenu de l'item (jusqu'au prochain item ou fin), vue sans copie
+        item_content = span.body
         
         # NOUVEAU: Extraire les métriques earnings pour Item 2.02
         earnings_metrics = {}
         if item_num == "2.02":
             print(f"[EARNINGS] Analyse des earnings pour Item 2.02")
-            earnings_metrics = extract_earnings_metrics(soup, item_content)
+            with doc.stage("earnings"):
+                earnings_metrics = extract_earnings_metrics(doc, item_content, detail)
         
         # Extraire la date si présente
-        event_date = extract_date_from_text(item_content)
+        event_date = extract_date_from_text(item_content.text, item_content.start, item_content.end)
         
         # Créer un résumé (premiers 500 caractères)
-        summary = item_content[:500] if len(item_content) > 500 else item_content
+        summary = item_content.head(500)
         
         # Préparer les données brutes
         raw_data = {
             "item_number": item_num,
             "item_title": item_title,
-            "content_preview": item_content[:1000],
+            "content_preview": item_content.head(1000),
             "earnings_metrics": earnings_metrics  # ✅ Ajouter les métriques
         }
         
@@ -458,11 +555,13 @@ def extract_8k_items(soup: BeautifulSoup, document_url: str) -> List[Dict[str, A
     if not events:
         print("[DEBUG] No events found, checking for XBRL...")
         # Vérifier si c'est un document XBRL (pour les 8-K Item 2.02)
-        is_xbrl = "xbrl" in text.lower()[:500] or any(tag in text.lower() for tag in ["us-gaap:", "xbrli:"])
+        lower_text = doc.lower_text
+        is_xbrl = "xbrl" in lower_text[:500] or any(tag in lower_text for tag in ["us-gaap:", "xbrli:"])
         print(f"[DEBUG] is_xbrl check result: {is_xbrl}")
         if is_xbrl:
             print("[XBRL] Document XBRL detecte, extraction directe des metriques earnings...")
-            earnings_metrics = extract_earnings_metrics(soup, text)
+            with doc.stage("earnings"):
+                earnings_metrics = extract_earnings_metrics(doc, text, detail)
             if earnings_metrics:
                 # Créer un événement earnings avec les métriques extraites
                 events.append({
@@ -500,21 +599,20 @@ def parse_form4(filing_id: int, company_id: int, document_url: str):
     """
     print(f"Parsing Form 4 filing_id={filing_id}, url={document_url}")
     
-    # Télécharger le document
-    response = requests.get(document_url, timeout=30)
-    response.raise_for_status()
+    # Télécharger le document (archive brute d'abord)
+    content, raw_storage_path = raw_archive.fetch(document_url, timeout=30)
     
-    soup = BeautifulSoup(response.content, "html.parser")
+    soup = BeautifulSoup(content, "html.parser")
     
     # Extraire les transactions
     trades = extract_form4_trades(soup)
     
     print(f"Extracted {len(trades)} trades from Form 4")
     
-    # Insérer les trades dans insider_trades
-    for trade in trades:
+    # Insérer les trades dans insider_trades (un seul POST en masse)
+    if trades:
         try:
-            supabase_request("POST", "insider_trades", {
+            supabase_bulk_insert("insider_trades", [{
                 "company_id": company_id,
                 "filing_id": filing_id,
                 "insider_name": trade.get("insider_name"),
@@ -524,16 +622,12 @@ def parse_form4(filing_id: int, company_id: int, document_url: str):
                 "price_per_share": trade.get("price_per_share"),
                 "total_value": trade.get("total_value"),
                 "transaction_date": trade.get("transaction_date")
-            })
-            print(f"Inserted trade: {trade.get('transaction_type')} - {trade.get('shares')} shares")
+            } for trade in trades])
         except Exception as e:
-            print(f"Error inserting trade: {e}")
-            continue
+            print(f"Error inserting trades: {e}")
     
     # Marquer le filing comme parsé
-    supabase_request("PATCH", "company_filings",
-                    {"status": "PARSED"},
-                    {"id": filing_id})
+    mark_filing_parsed(filing_id, raw_storage_path)
 
 
 def extract_form4_trades(soup: BeautifulSoup) -> List[Dict[str, Any]]:
@@ -645,28 +739,60 @@ def extract_form4_trades(soup: BeautifulSoup) -> List[Dict[str, Any]]:
     return trades
 
 
-def extract_earnings_metrics(soup: BeautifulSoup, text: str) -> Dict[str, Any]:
+def document_quarter_end(doc: ParsedDocument) -> Optional[str]:
+    """Fin du trimestre des faits iXBRL de résultats du document (contexte sans dimension), ou None"""
+    for concepts in companyfacts_store.METRIC_CONCEPTS.values():
+        for concept in concepts:
+            fact = doc.xbrl_facts.best(concept)
+            context = fact.context if fact is not None else None
+            if context is None or context.dimensional or not context.start or not context.end:
+                continue
+            try:
+                days = (datetime.fromisoformat(context.end) - datetime.fromisoformat(context.start)).days
+            except ValueError:
+                continue
+            if companyfacts_store.QUARTER_DAYS[0] <= days <= companyfacts_store.QUARTER_DAYS[1]:
+                return context.end
+    return None
+
+
+def extract_earnings_metrics(doc: ParsedDocument, text, detail: Optional[dict] = None) -> Dict[str, Any]:
     """
-    Extraire les métriques financières - PRIORITÉ ABSOLUE XBRL
+    Extraire les métriques financières
+    Store companyfacts local d'abord (lecture O(1) par CIK et trimestre), puis XBRL du document
+    Le trimestre lu dans le store est celui des faits iXBRL du document s'il en a; sinon il est
+    déduit de la date de l'événement (dei:DocumentPeriodEndDate), à défaut de la date de dépôt.
     """
+    detail = detail or {}
+    ticker = detail.get("ticker") or "NVDA"
+    if companyfacts_store.is_enabled():
+        companyfacts_data = companyfacts_store.lookup_earnings(
+            detail.get("cik"), doc.document_period_end or detail.get("filing_date"), document_quarter_end(doc))
+        if companyfacts_data:
+            print(f"[EARNINGS] Donnees companyfacts (store local): {companyfacts_data}")
+            validated_data = validate_earnings_data(companyfacts_data, ticker)
+            if validated_data:
+                return validated_data
+            print("[EARNINGS] Donnees companyfacts invalides, essai XBRL...")
+    
     print("[EARNINGS] Debut extraction avec priorite XBRL...")
     
     # OPTION A: XBRL AMÉLIORÉ (TOUJOURS PRIORITAIRE)
-    xbrl_data = extract_xbrl_metrics(soup)
+    xbrl_data = extract_xbrl_metrics(doc)
     if xbrl_data:
         print(f"[EARNINGS] Donnees XBRL trouvees: {xbrl_data}")
         
         # VALIDATION FINALE DES DONNÉES XBRL
-        validated_data = validate_earnings_data(xbrl_data, "NVDA")
+        validated_data = validate_earnings_data(xbrl_data, ticker)
         if validated_data:
             return validated_data
         else:
             print("[EARNINGS] Donnees XBRL invalides, essai press release...")
     
     # OPTION B: Press Release SÉCURISÉ
-    press_release_data = extract_press_release_metrics(soup)
+    press_release_data = extract_press_release_metrics(doc)
     if press_release_data:
-        validated_data = validate_earnings_data(press_release_data, "NVDA")
+        validated_data = validate_earnings_data(press_release_data, ticker)
         if validated_data:
             print(f"[EARNINGS] Donnees Press Release validees: {validated_data}")
             return validated_data
@@ -682,8 +808,8 @@ def extract_earnings_metrics(soup: BeautifulSoup, text: str) -> Dict[str, Any]:
     return {}
 
 
-def extract_xbrl_metrics(soup: BeautifulSoup) -> Dict[str, Any]:
-    """Extraire les métriques depuis les tags XBRL - VERSION CORRIGÉE"""
+def extract_xbrl_metrics(doc: ParsedDocument) -> Dict[str, Any]:
+    """Extraire les métriques depuis les faits iXBRL (index construit en une passe, voir xbrl_facts)"""
     xbrl_data = {}
     
     print("[XBRL] Debut extraction XBRL amelioree...")
@@ -692,6 +818,7 @@ def extract_xbrl_metrics(soup: BeautifulSoup) -> Dict[str, Any]:
     xbrl_tags = {
         'revenue': [
             'us-gaap:Revenues',  # Majuscules importantes
+            'us-gaap:RevenueFromContractWithCustomerExcludingAssessedTax',
             'us-gaap:SalesRevenueNet',
             'Revenues',  # Sans namespace
             'SalesRevenueNet'
@@ -710,118 +837,44 @@ def extract_xbrl_metrics(soup: BeautifulSoup) -> Dict[str, Any]:
         ]
     }
     
-    # STRATÉGIE AMÉLIORÉE : Chercher dans TOUTES les balises
-    all_elements = soup.find_all(True)  # Toutes les balises
+    facts = doc.xbrl_facts
+    print(f"[XBRL] {len(facts)} faits indexes, {len(facts.contexts)} contextes, {len(facts.units)} unites")
     
     for metric, tags in xbrl_tags.items():
         for tag in tags:
-            print(f"[XBRL] Recherche tag: {tag}")
-            
-            # Méthode 1: Chercher par name attribute
-            elements = soup.find_all(attrs={"name": tag})
-            
-            # Méthode 2: Chercher le tag directement
-            if not elements:
-                elements = soup.find_all(tag)
+            # Fait le plus représentatif du concept (contexte sans dimension, période la plus récente)
+            fact = facts.best(tag)
+            if fact is None:
+                continue
             
-            # Méthode 3: Chercher dans tout le contenu
-            if not elements:
-                for elem in all_elements:
-                    if tag in str(elem):
-                        elements = [elem]
-                        break
+            value = fact.value
+            context = fact.context
+            print(f"[XBRL] VALEUR TROUVEE {tag}: {value} (contexte {fact.context_ref}"
+                  f"{f' {context.start} -> {context.end}' if context else ''}, unite {facts.unit(fact)})")
             
-            for element in elements:
-                if element.text and element.text.strip():
-                    try:
-                        value_text = element.text.strip()
-                        print(f"[XBRL] VALEUR TROUVEE {tag}: '{value_text}'")
-                        
-                        # NETTOYAGE AMÉLIORÉ
-                        value_text = re.sub(r'[\(\)\$,]', '', value_text)
-                        value_text = re.sub(r'[^\d\.\-]', '', value_text)  # Garder seulement chiffres, point, négatif
-                        
-                        if not value_text or value_text == '-':
-                            continue
-                            
-                        value = float(value_text)
-                        
-                        # DÉTERMINER L'ÉCHELLE - LOGIQUE AMÉLIORÉE
-                        scale = 1
-                        
-                        # 1. Vérifier unitRef d'abord
-                        unit_ref = element.get('unitref')
-                        if unit_ref:
-                            # Chercher la définition de l'unité
-                            unit_elem = soup.find(attrs={"id": unit_ref})
-                            if unit_elem:
-                                unit_text = unit_elem.get_text().lower()
-                                print(f"[XBRL] Unit text: {unit_text}")
-                                if 'million' in unit_text:
-                                    scale = 1_000_000
-                                elif 'billion' in unit_text:
-                                    scale = 1_000_000_000
-                                elif 'thousand' in unit_text:
-                                    scale = 1_000
-                        
-                        # 2. Vérifier le contexte pour deviner l'échelle
-                        context_ref = element.get('contextref', '')
-                        if context_ref and not unit_ref:
-                            # Si pas d'unité, estimer par la valeur
-                            if metric == 'revenue' and value < 1000:
-                                scale = 1_000_000  # Probablement en millions
-                            elif metric == 'revenue' and value < 10:
-                                scale = 1_000_000_000  # Probablement en billions
-                        
-                        # 3. Vérifications de plausibilité
-                        final_value = value * scale
-                        
-                        # FILTRES DE PLAUSIBILITÉ CRITIQUES
-                        if metric == 'revenue':
-                            if final_value < 1_000_000_000:  # < 1B
-                                print(f"[XBRL] FILTRE: Revenue {final_value} trop bas, ajustement automatique")
-                                # Essayer avec échelle supérieure
-                                if value < 1000:
-                                    final_value = value * 1_000_000_000  # Forcer billions
-                                    print(f"[XBRL] Revenue ajuste a: {final_value:,.0f}")
-                            
-                            # NVIDIA devrait avoir > 10B de revenue
-                            if final_value < 10_000_000_000:
-                                print(f"[XBRL] ATTENTION: Revenue {final_value:,.0f} semble bas pour NVIDIA")
-                        
-                        elif metric == 'eps_basic' or metric == 'eps_diluted':
-                            if value > 100:  # EPS > 100 improbable
-                                print(f"[XBRL] FILTRE: EPS {value} trop eleve")
-                                continue
-                        
-                        print(f"[XBRL] {metric} = {final_value:,.0f} (valeur: {value}, echelle: {scale})")
-                        xbrl_data[metric] = final_value
-                        break
-                        
-                    except ValueError as e:
-                        print(f"[XBRL] ERREUR conversion {tag}: '{value_text}' - {e}")
-                        continue
-                    except Exception as e:
-                        print(f"[XBRL] ERREUR inattendue: {e}")
-                        continue
+            # FILTRES DE PLAUSIBILITÉ CRITIQUES
+            if metric in ('eps_basic', 'eps_diluted') and abs(value) > 100:  # EPS > 100 improbable
+                print(f"[XBRL] FILTRE: EPS {value} trop eleve")
+                continue
             
-            if metric in xbrl_data:
-                break
+            print(f"[XBRL] {metric} = {value:,.2f} (decimals: {fact.decimals})")
+            xbrl_data[metric] = value
+            break
     
     # SI AUCUNE DONNÉE TROUVÉE, ESSAYER UNE MÉTHODE PLUS AGRESSIVE
     if not xbrl_data:
         print("[XBRL] Aucune donnee trouvee, methode agressive...")
-        xbrl_data = extract_xbrl_aggressive(soup)
+        xbrl_data = extract_xbrl_aggressive(doc)
     
     return xbrl_data
 
 
-def extract_xbrl_aggressive(soup: BeautifulSoup) -> Dict[str, Any]:
+def extract_xbrl_aggressive(doc: ParsedDocument) -> Dict[str, Any]:
     """Méthode agressive pour extraire les données XBRL"""
     aggressive_data = {}
     
     # Chercher tous les textes qui ressemblent à des valeurs financières
-    text = soup.get_text()
+    text = doc.text
     
     # Patterns pour trouver des valeurs dans le contexte XBRL
     patterns = [
@@ -855,14 +908,14 @@ def extract_xbrl_aggressive(soup: BeautifulSoup) -> Dict[str, Any]:
     return aggressive_data
 
 
-def extract_press_release_metrics(soup: BeautifulSoup) -> Dict[str, Any]:
+def extract_press_release_metrics(doc: ParsedDocument) -> Dict[str, Any]:
     """Extraire depuis communiqués de presse - VERSION SÉCURISÉE"""
     press_data = {}
     
     print("[PRESS] Recherche dans communiques de presse (securise)...")
     
     # Obtenir le texte complet
-    text = soup.get_text()
+    text = doc.text
     
     # D'ABORD: Chercher des patterns spécifiques NVIDIA avec valeurs réalistes
     nvidia_patterns = [
@@ -1072,16 +1125,20 @@ def analyze_earnings_and_create_alerts(company_id: int, filing_id: int, earnings
         print(f"[ERROR] Erreur creation alerte: {e}")
 
 
-def extract_date_from_text(text: str) -> Optional[str]:
-    """Extraire une date d'un texte"""
-    # Patterns de dates communs
-    patterns = [
-        r"(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})",
-        r"(\w+)\s+(\d{1,2}),\s+(\d{4})",
-    ]
+# Patterns de dates communs
+DATE_PATTERNS = [
+    re.compile(r"(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})"),
+    re.compile(r"(\w+)\s+(\d{1,2}),\s+(\d{4})"),
+]
+
+
+def extract_date_from_text(text: str, pos: int = 0, endpos: Optional[int] = None) -> Optional[str]:
+    """Extraire une date d'un texte (ou de text[pos:endpos], sans copie)"""
+    if endpos is None:
+        endpos = len(text)
     
-    for pattern in patterns:
-        match = re.search(pattern, text)
+    for pattern in DATE_PATTERNS:
+        match = pattern.search(text, pos, endpos)
         if match:
             try:
                 # Essayer de parser la date
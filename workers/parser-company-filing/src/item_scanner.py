@@ -0,0 +1,79 @@
+"""
+Scan des en-têtes "Item X.XX" d'un 8-K en une passe
+Une seule regex précompilée (séparateurs "-", "–", ":" ou espaces) remplace les
+trois patterns appliqués l'un après l'autre, qui renvoyaient le même en-tête
+jusqu'à trois fois. Un en-tête commence une ligne du texte par blocs: les
+renvois dans le corps ("the information in this Item 2.02 ...") ne créent pas
+d'item. Chaque numéro d'item n'est retenu qu'une fois (en cas de répétition,
+comme un sommaire, l'en-tête suivi du plus long texte); son corps court
+jusqu'à l'en-tête retenu suivant.
+
+Les corps sont des TextView (texte, début, fin) sur le texte du document: rien
+n'est copié avant la persistance (aperçu, résumé).
+"""
+
+import re
+from typing import List, NamedTuple
+
+ITEM_HEADING = re.compile(r"^[ \t]*Item\s+(\d+)\.(\d+)(?:\s*[-–:]\s*|\s+)(.+)", re.IGNORECASE | re.MULTILINE)
+
+
+class TextView:
+    """Portion [start, end) d'un texte, sans copie"""
+
+    __slots__ = ("text", "start", "end")
+
+    def __init__(self, text: str, start: int = 0, end: int = None):
+        self.text = text
+        self.start = start
+        self.end = len(text) if end is None else end
+
+    def strip(self) -> "TextView":
+        start, end = self.start, self.end
+        while start < end and self.text[start].isspace():
+            start += 1
+        while end > start and self.text[end - 1].isspace():
+            end -= 1
+        return TextView(self.text, start, end)
+
+    def head(self, length: int) -> str:
+        """Les length premiers caractères (copie bornée)"""
+        return self.text[self.start:min(self.end, self.start + length)]
+
+    def search(self, pattern: re.Pattern):
+        return pattern.search(self.text, self.start, self.end)
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def __str__(self) -> str:
+        return self.text[self.start:self.end]
+
+
+class ItemSpan(NamedTuple):
+    offset: int      # position de l'en-tête dans le texte
+    item: str        # "2.02"
+    title: str
+    body: TextView   # texte entre la fin de l'en-tête et l'en-tête suivant (espaces retirés)
+
+
+def scan_items(text: str) -> List[ItemSpan]:
+    """Items du document dans l'ordre, un par numéro"""
+    matches = list(ITEM_HEADING.finditer(text))
+
+    # Numéro répété (sommaire puis corps): garder l'en-tête suivi du plus long texte
+    best = {}
+    for i, match in enumerate(matches):
+        item = f"{match.group(1)}.{match.group(2)}"
+        following = (matches[i + 1].start() if i + 1 < len(matches) else len(text)) - match.end()
+        if item not in best or following > best[item][0]:
+            best[item] = (following, match)
+
+    headings = sorted((match.start(), item, match.group(3).strip(), match.end())
+                      for item, (_, match) in best.items())
+
+    spans = []
+    for i, (offset, item, title, body_start) in enumerate(headings):
+        body_end = headings[i + 1][0] if i + 1 < len(headings) else len(text)
+        spans.append(ItemSpan(offset, item, title, TextView(text, body_start, max(body_start, body_end)).strip()))
+    return spans
@@ -0,0 +1,91 @@
+"""
+Document 8-K parsé une seule fois
+Le HTML est parsé à la première demande, puis chaque vue (texte brut, texte
+par blocs, texte en minuscules, faits iXBRL) est calculée paresseusement
+et gardée en cache: les extracteurs (items, XBRL, communiqué de presse)
+reçoivent le même ParsedDocument au lieu de refaire soup.get_text() chacun.
+Le texte par blocs et les faits iXBRL viennent chacun d'une passe en flux sur
+le HTML, sans l'arbre (voir block_text et xbrl_facts).
+
+Le temps passé dans chaque vue (temps propre, hors vues dont elle dépend) et
+dans chaque étape du pipeline (stage(), temps total) est cumulé dans timings,
+pour le rapport par document.
+"""
+
+import time
+from contextlib import contextmanager
+
+from bs4 import BeautifulSoup
+
+from block_text import extract_blocks
+from xbrl_facts import XbrlFacts, document_period_end, index_facts
+
+
+class ParsedDocument:
+    """HTML d'un document EDGAR et ses vues dérivées, calculées au plus une fois"""
+
+    def __init__(self, content, url: str = ""):
+        self.content = content
+        self.url = url
+        self.timings = {}
+        self._cache = {}
+        self._nested_seconds = 0.0
+
+    def _cached(self, name: str, build):
+        if name not in self._cache:
+            outer_nested = self._nested_seconds
+            self._nested_seconds = 0.0
+            start = time.perf_counter()
+            self._cache[name] = build()
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed - self._nested_seconds
+            self._nested_seconds = outer_nested + elapsed
+        return self._cache[name]
+
+    @contextmanager
+    def stage(self, name: str):
+        """Cumuler le temps d'une étape (vues construites et étapes imbriquées comprises)"""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        return self._cached("soup", lambda: BeautifulSoup(self.content, "html.parser"))
+
+    @property
+    def text(self) -> str:
+        """soup.get_text()"""
+        return self._cached("text", lambda: self.soup.get_text())
+
+    @property
+    def lower_text(self) -> str:
+        return self._cached("lower_text", lambda: self.text.lower())
+
+    def _blocks(self) -> tuple:
+        return self._cached("block_text", lambda: extract_blocks(self.content))
+
+    @property
+    def block_text(self) -> str:
+        """Texte de chaque bloc (div, p, td, ...) sur sa propre ligne, sans répétition des blocs imbriqués"""
+        return self._blocks()[0]
+
+    @property
+    def blocks(self) -> list:
+        """TextBlock (offsets dans block_text et dans le HTML source) de chaque ligne de block_text"""
+        return self._blocks()[1]
+
+    @property
+    def xbrl_facts(self) -> XbrlFacts:
+        """Faits iXBRL numériques, contextes et unités (une passe en flux sur le HTML)"""
+        return self._cached("xbrl_facts", lambda: index_facts(self.content))
+
+    @property
+    def document_period_end(self):
+        """dei:DocumentPeriodEndDate (ISO) ou None; pour un 8-K, la date de l'événement"""
+        return self._cached("document_period_end", lambda: document_period_end(self.content))
+
+    def timings_ms(self) -> dict:
+        return {name: round(seconds * 1000, 1) for name, seconds in self.timings.items()}
@@ -0,0 +1,410 @@
+"""
+Archive des documents EDGAR bruts, adressée par contenu
+Chaque document téléchargé (information table, index.json, 8-K, Form 4) est
+stocké une seule fois sous le SHA-256 de son contenu, compressé en zlib avec un
+dictionnaire écrit à la main (balises et valeurs fréquentes des 13F XML). Une
+référence URL → digest permet aux workers de relire l'archive avant sec.gov.
+
+Backends (RAW_ARCHIVE_URI):
+- file:///tmp/edgar-archive   système de fichiers local
+- s3://bucket/prefix          S3 ou compatible S3 (RAW_ARCHIVE_S3_ENDPOINT)
+- vide / "none"               archive désactivée
+
+Disposition:
+- objects/<aa>/<sha256>.z     contenu: b"EDZ" + id du dictionnaire + flux zlib
+- refs/<aa>/<sha256(url)>     digest du dernier contenu vu pour l'URL
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import zlib
+from urllib.parse import urlsplit
+
+import http_client
+
+RAW_ARCHIVE_URI = os.environ.get("RAW_ARCHIVE_URI", "file:///tmp/edgar-archive")
+RAW_ARCHIVE_S3_ENDPOINT = os.environ.get("RAW_ARCHIVE_S3_ENDPOINT")
+RAW_ARCHIVE_LEVEL = int(os.environ.get("RAW_ARCHIVE_LEVEL", "6"))
+
+BLOB_MAGIC = b"EDZ"
+READ_CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+# Dictionnaire 13F v1, écrit à la main (pas entraîné sur un corpus): schéma de
+# l'information table (forme namespacée et forme nue) et valeurs fréquentes. zlib
+# privilégie la fin du dictionnaire: les chaînes les plus utiles y sont.
+# Ne jamais modifier un dictionnaire publié: ajouter un nouvel id.
+_ZDICT_13F_V1_VALUES = (
+    " INC", " CORP", " CO", " LTD", " PLC", " HLDGS", " HOLDINGS", " GROUP", " TR", " ETF",
+    " FD", " FUND", " INDEX", " SHS", " CL A", " CL B", " COM NEW", " SPONSORED ADR",
+    " ISHARES", " SPDR", " VANGUARD", "DFND", "OTR", "PRN", "CALL", "PUT",
+)
+_ZDICT_13F_V1_DOCUMENT = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<informationTable xmlns="http://www.sec.gov/edgar/document/thirteenf/informationtable" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+    'xsi:schemaLocation="http://www.sec.gov/edgar/document/thirteenf/informationtable eis_13FDocument.xsd">\n'
+    '<ns1:informationTable xmlns:ns1="http://www.sec.gov/edgar/document/thirteenf/informationtable">\n'
+    '<ns1:infoTable><ns1:nameOfIssuer></ns1:nameOfIssuer><ns1:titleOfClass>COM</ns1:titleOfClass>'
+    '<ns1:cusip></ns1:cusip><ns1:figi></ns1:figi><ns1:value></ns1:value>'
+    '<ns1:shrsOrPrnAmt><ns1:sshPrnamt></ns1:sshPrnamt><ns1:sshPrnamtType>SH</ns1:sshPrnamtType></ns1:shrsOrPrnAmt>'
+    '<ns1:putCall></ns1:putCall><ns1:investmentDiscretion>SOLE</ns1:investmentDiscretion>'
+    '<ns1:otherManager></ns1:otherManager>'
+    '<ns1:votingAuthority><ns1:Sole>0</ns1:Sole><ns1:Shared>0</ns1:Shared><ns1:None>0</ns1:None></ns1:votingAuthority>'
+    '</ns1:infoTable>\n'
+    '</ns1:informationTable>\n'
+    '  <infoTable>\n'
+    '    <nameOfIssuer></nameOfIssuer>\n'
+    '    <titleOfClass>COM</titleOfClass>\n'
+    '    <cusip></cusip>\n'
+    '    <value></value>\n'
+    '    <shrsOrPrnAmt>\n'
+    '      <sshPrnamt></sshPrnamt>\n'
+    '      <sshPrnamtType>SH</sshPrnamtType>\n'
+    '    </shrsOrPrnAmt>\n'
+    '    <investmentDiscretion>SOLE</investmentDiscretion>\n'
+    '    <votingAuthority>\n'
+    '      <Sole>0</Sole>\n'
+    '      <Shared>0</Shared>\n'
+    '      <None>0</None>\n'
+    '    </votingAuthority>\n'
+    '  </infoTable>\n'
+)
+ZDICT_13F_V1 = ("".join(_ZDICT_13F_V1_VALUES) + _ZDICT_13F_V1_DOCUMENT).encode("utf-8")
+
+# id 0: pas de dictionnaire
+ZDICTS = {0: b"", 1: ZDICT_13F_V1}
+ZDICT_DEFAULT_ID = 1
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _object_key(digest: str) -> str:
+    return f"objects/{digest[:2]}/{digest}.z"
+
+
+def _ref_key(url: str) -> str:
+    url_digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return f"refs/{url_digest[:2]}/{url_digest}"
+
+
+def _compressor(zdict_id: int):
+    zdict = ZDICTS[zdict_id]
+    if zdict:
+        return zlib.compressobj(RAW_ARCHIVE_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+    return zlib.compressobj(RAW_ARCHIVE_LEVEL)
+
+
+def compress(data: bytes, zdict_id: int = ZDICT_DEFAULT_ID) -> bytes:
+    compressor = _compressor(zdict_id)
+    return BLOB_MAGIC + bytes([zdict_id]) + compressor.compress(data) + compressor.flush()
+
+
+def decompress(blob: bytes) -> bytes:
+    reader = DecompressingReader(_BytesSource(blob))
+    return reader.read()
+
+
+class _BytesSource:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self.data) - self.offset
+        chunk = self.data[self.offset:self.offset + size]
+        self.offset += len(chunk)
+        return chunk
+
+    def close(self):
+        pass
+
+
+class DecompressingReader:
+    """Flux en lecture qui décompresse un objet de l'archive au fil de l'eau"""
+
+    def __init__(self, source, storage_path: str = None):
+        self.source = source
+        self.storage_path = storage_path
+        header = source.read(len(BLOB_MAGIC) + 1)
+        if len(header) != len(BLOB_MAGIC) + 1 or not header.startswith(BLOB_MAGIC):
+            raise ValueError("Objet d'archive invalide (en-tête)")
+        zdict = ZDICTS.get(header[-1])
+        if zdict is None:
+            raise ValueError(f"Dictionnaire d'archive inconnu: {header[-1]}")
+        self.decompressor = zlib.decompressobj(zlib.MAX_WBITS, zdict) if zdict else zlib.decompressobj()
+        # Données décompressées non lues: buffer[offset:] (compacté au lieu d'être retranché à chaque read)
+        self.buffer = bytearray()
+        self.offset = 0
+        self.eof = False
+
+    def _available(self) -> int:
+        return len(self.buffer) - self.offset
+
+    def _fill(self, size: int):
+        while not self.eof and (size < 0 or self._available() < size):
+            chunk = self.source.read(READ_CHUNK_SIZE)
+            if not chunk:
+                self.buffer += self.decompressor.flush()
+                self.eof = True
+                break
+            self.buffer += self.decompressor.decompress(chunk)
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None:
+            size = -1
+        self._fill(size)
+        end = len(self.buffer) if size < 0 else min(self.offset + size, len(self.buffer))
+        data = bytes(self.buffer[self.offset:end])
+        self.offset = end
+        if self.offset == len(self.buffer):
+            self.buffer.clear()
+            self.offset = 0
+        elif self.offset > READ_CHUNK_SIZE and self.offset * 2 > len(self.buffer):
+            del self.buffer[:self.offset]
+            self.offset = 0
+        return data
+
+    def close(self):
+        self.source.close()
+
+
+class ArchiveWriter:
+    """
+    Flux en lecture qui recopie tout ce qui est lu depuis la source (réponse
+    HTTP) dans l'archive: hash et compression au fil de l'eau, contenu
+    compressé spoolé sur disque au-delà de SPOOL_MAX_SIZE.
+    """
+
+    def __init__(self, archive, url: str, source, zdict_id: int = ZDICT_DEFAULT_ID):
+        self.archive = archive
+        self.url = url
+        self.source = source
+        self.zdict_id = zdict_id
+        self.hasher = hashlib.sha256()
+        self.compressor = _compressor(zdict_id)
+        self.spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self.spool.write(BLOB_MAGIC + bytes([zdict_id]))
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.source.read(size)
+        if data:
+            self.hasher.update(data)
+            self.spool.write(self.compressor.compress(data))
+        return data
+
+    def commit(self):
+        """Consommer le reste de la source et écrire l'objet + la référence URL"""
+        try:
+            while self.read(READ_CHUNK_SIZE):
+                pass
+            self.spool.write(self.compressor.flush())
+            self.spool.seek(0)
+            return self.archive.put_blob(self.url, self.hasher.hexdigest(), self.spool)
+        finally:
+            self.spool.close()
+
+    def discard(self):
+        self.spool.close()
+
+
+class LocalBackend:
+    """Archive sur le système de fichiers local (écritures atomiques via os.replace)"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.uri = f"file://{root}"
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def put(self, key: str, fileobj):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, "wb") as f:
+            while True:
+                chunk = fileobj.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                f.write(chunk)
+        os.replace(tmp_path, path)
+
+    def open(self, key: str):
+        try:
+            return open(self._path(key), "rb")
+        except FileNotFoundError:
+            return None
+
+
+class S3Backend:
+    """Archive S3 ou compatible S3 (MinIO, R2...) via boto3, importé paresseusement"""
+
+    def __init__(self, bucket: str, prefix: str, endpoint_url: str = None):
+        import boto3
+        from botocore.exceptions import ClientError
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.uri = f"s3://{bucket}/{self.prefix}" if self.prefix else f"s3://{bucket}"
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client_error = ClientError
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def _is_missing(self, error) -> bool:
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except self.client_error as e:
+            if self._is_missing(e):
+                return False
+            raise
+
+    def put(self, key: str, fileobj):
+        self.client.upload_fileobj(fileobj, self.bucket, self._key(key))
+
+    def open(self, key: str):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"]
+        except self.client_error as e:
+            if self._is_missing(e):
+                return None
+            raise
+
+
+class RawArchive:
+    """Magasin adressé par contenu au-dessus d'un backend (local ou S3)"""
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def storage_path(self, digest: str) -> str:
+        return f"{self.backend.uri}/{_object_key(digest)}"
+
+    def lookup(self, url: str):
+        """Digest du contenu archivé pour l'URL, ou None"""
+        ref = self.backend.open(_ref_key(url))
+        if ref is None:
+            return None
+        try:
+            return ref.read().decode("ascii").strip() or None
+        finally:
+            ref.close()
+
+    def open(self, url: str):
+        """Flux décompressé du document archivé pour l'URL, ou None"""
+        digest = self.lookup(url)
+        if digest is None:
+            return None
+        blob = self.backend.open(_object_key(digest))
+        if blob is None:
+            return None
+        return DecompressingReader(blob, self.storage_path(digest))
+
+    def open_object(self, storage_path: str):
+        """Flux décompressé d'un objet depuis son storage path (raw_storage_path), ou None"""
+        prefix = f"{self.backend.uri}/"
+        if not storage_path or not storage_path.startswith(prefix):
+            return None
+        blob = self.backend.open(storage_path[len(prefix):])
+        if blob is None:
+            return None
+        return DecompressingReader(blob, storage_path)
+
+    def read(self, url: str):
+        reader = self.open(url)
+        if reader is None:
+            return None
+        try:
+            return reader.read()
+        finally:
+            reader.close()
+
+    def put_blob(self, url: str, digest: str, fileobj) -> str:
+        """Écrire un objet déjà compressé (si absent) puis la référence URL → digest"""
+        key = _object_key(digest)
+        if not self.backend.exists(key):
+            self.backend.put(key, fileobj)
+        self.backend.put(_ref_key(url), _BytesSource(digest.encode("ascii")))
+        return self.storage_path(digest)
+
+    def put(self, url: str, data: bytes) -> str:
+        return self.put_blob(url, content_digest(data), _BytesSource(compress(data)))
+
+    def writer(self, url: str, source) -> ArchiveWriter:
+        return ArchiveWriter(self, url, source)
+
+
+def create_archive(uri: str):
+    """Construire l'archive décrite par une URI (file://, s3://), None si vide ou "none" """
+    if not uri or uri.lower() == "none":
+        return None
+    parts = urlsplit(uri)
+    if parts.scheme == "s3":
+        return RawArchive(S3Backend(parts.netloc, parts.path, RAW_ARCHIVE_S3_ENDPOINT))
+    if parts.scheme in ("file", ""):
+        return RawArchive(LocalBackend(parts.path or uri))
+    raise ValueError(f"RAW_ARCHIVE_URI non supportée: {uri}")
+
+
+def get_archive():
+    """Archive partagée du conteneur (RAW_ARCHIVE_URI), None si désactivée ou indisponible"""
+    global _archive
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                try:
+                    _archive = create_archive(RAW_ARCHIVE_URI) or False
+                except Exception as e:
+                    print(f"[ARCHIVE] Archive indisponible ({RAW_ARCHIVE_URI}): {e}")
+                    _archive = False
+    return _archive or None
+
+
+def fetch(url: str, headers: dict = None, timeout: int = 30):
+    """
+    Contenu d'un document: archive d'abord, sec.gov sinon (puis archivage)
+    Retourne (content, storage_path); storage_path est None sans archive.
+    Une archive en panne ne fait jamais échouer le téléchargement.
+    """
+    archive = get_archive()
+    if archive is not None:
+        try:
+            reader = archive.open(url)
+            if reader is not None:
+                try:
+                    content = reader.read()
+                finally:
+                    reader.close()
+                print(f"[ARCHIVE] Hit: {url}")
+                return content, reader.storage_path
+        except Exception as e:
+            print(f"[ARCHIVE] Lecture impossible pour {url}: {e}")
+
+    response = http_client.get(url, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    content = response.content
+
+    storage_path = None
+    if archive is not None:
+        try:
+            storage_path = archive.put(url, content)
+        except Exception as e:
+            print(f"[ARCHIVE] Écriture impossible pour {url}: {e}")
+    return content, storage_path
@@ -0,0 +1,229 @@
+"""
+Index des faits inline XBRL d'un document, construit en une passe
+Un parseur événementiel (html.parser.HTMLParser, sans arbre) relève:
+- les contextes (xbrli:context: période instant / début-fin, dimensions)
+- les unités (xbrli:unit: mesure simple ou numérateur/dénominateur)
+- les faits numériques ix:nonFraction, indexés par concept (nom complet et nom
+  local, sans casse), avec contextRef, unitRef, scale, decimals, sign et format
+Une recherche de métrique est ensuite une lecture de dictionnaire. Un document
+sans ix:nonFraction n'est pas parcouru.
+dei:DocumentPeriodEndDate (ix:nonNumeric, date du rapport) est lu à part.
+"""
+
+import re
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import Dict, List, NamedTuple, Optional
+
+from block_text import FEED_CHUNK_SIZE, decode_html
+
+NUMBER_CLEANUP = re.compile(r"[^\d.\-]")
+NON_FRACTION_TAG = re.compile(r"<ix:nonfraction\b", re.IGNORECASE)
+DOCUMENT_PERIOD_END_TAG = re.compile(
+    r"<ix:nonnumeric\b[^>]*\bname=[\"']dei:DocumentPeriodEndDate[\"'][^>]*>(.*?)</ix:nonnumeric>",
+    re.IGNORECASE | re.DOTALL
+)
+DATE_FORMATS = ("%Y-%m-%d", "%B %d, %Y", "%b %d, %Y", "%B %d %Y", "%d %B %Y", "%m/%d/%Y")
+
+
+class XbrlContext(NamedTuple):
+    start: Optional[str]   # None pour un instant
+    end: Optional[str]     # date de fin, ou de l'instant
+    dimensional: bool      # segment / scénario (membre de dimension): pas un total
+
+
+class XbrlFact(NamedTuple):
+    concept: str
+    value: float           # valeur affichée × 10^scale, signe appliqué
+    context_ref: str
+    unit_ref: str
+    decimals: Optional[str]
+    context: Optional[XbrlContext]
+
+
+def parse_fact_value(text: str, scale: str, sign: str, fmt: str) -> Optional[float]:
+    """Valeur numérique d'un ix:nonFraction selon ses attributs format / scale / sign"""
+    fmt = (fmt or "").lower()
+    if "zerodash" in fmt or "fixed-zero" in fmt or "fixedzero" in fmt:
+        number = 0.0
+    else:
+        text = text.strip()
+        if "comma-decimal" in fmt or "commadecimal" in fmt:
+            text = text.replace(".", "").replace(" ", "").replace(",", ".")
+        cleaned = NUMBER_CLEANUP.sub("", text)
+        if not cleaned or cleaned in ("-", "."):
+            return None
+        try:
+            number = float(cleaned)
+        except ValueError:
+            return None
+    try:
+        number *= 10 ** int(scale or 0)
+    except ValueError:
+        pass
+    return -number if sign == "-" else number
+
+
+def _decimals_rank(decimals: Optional[str]) -> float:
+    if decimals is None:
+        return float("-inf")
+    if decimals.upper() == "INF":
+        return float("inf")
+    try:
+        return float(decimals)
+    except ValueError:
+        return float("-inf")
+
+
+class XbrlFacts:
+    """Faits, contextes et unités d'un document"""
+
+    def __init__(self, facts: List[XbrlFact], contexts: Dict[str, XbrlContext], units: Dict[str, str]):
+        self.facts = facts
+        self.contexts = contexts
+        self.units = units
+        self.by_concept = {}
+        for fact in facts:
+            key = fact.concept.lower()
+            self.by_concept.setdefault(key, []).append(fact)
+            local = key.split(":", 1)[1] if ":" in key else None
+            if local:
+                self.by_concept.setdefault(local, []).append(fact)
+
+    def __len__(self) -> int:
+        return len(self.facts)
+
+    def lookup(self, concept: str) -> List[XbrlFact]:
+        """Faits d'un concept ("us-gaap:Revenues" ou nom local "Revenues")"""
+        return self.by_concept.get(concept.lower(), [])
+
+    def best(self, concept: str) -> Optional[XbrlFact]:
+        """
+        Fait le plus représentatif: contexte sans dimension, période la plus récente,
+        durée la plus courte (trimestre plutôt que cumul annuel), puis le plus précis (decimals)
+        """
+        def rank(fact: XbrlFact):
+            context = fact.context or XbrlContext(None, None, True)
+            return (not context.dimensional, context.end or "", context.start or context.end or "",
+                    _decimals_rank(fact.decimals))
+        candidates = self.lookup(concept)
+        return max(candidates, key=rank) if candidates else None
+
+    def unit(self, fact: XbrlFact) -> str:
+        return self.units.get(fact.unit_ref, "")
+
+
+class _FactParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.raw_facts = []       # (concept, texte, attributs)
+        self.contexts = {}
+        self.units = {}
+        self.fact = None          # [concept, morceaux de texte, attributs, profondeur]
+        self.context = None       # [id, start, end, dimensional]
+        self.unit = None          # [id, numérateur, dénominateur, section courante]
+        self.capture = None       # liste recevant le texte de l'élément courant (date, mesure)
+
+    def handle_starttag(self, tag, attrs):
+        if self.fact is not None:
+            if tag == "ix:nonfraction":
+                self.fact[3] += 1
+            return
+        if tag == "ix:nonfraction":
+            attributes = dict(attrs)
+            self.fact = [attributes.get("name") or "", [], attributes, 0]
+        elif tag == "xbrli:context":
+            self.context = [dict(attrs).get("id"), None, None, False]
+        elif self.context is not None:
+            if tag in ("xbrli:startdate", "xbrli:enddate", "xbrli:instant"):
+                self.capture = []
+            elif tag in ("xbrli:segment", "xbrli:scenario", "xbrldi:explicitmember", "xbrldi:typedmember"):
+                self.context[3] = True
+        elif tag == "xbrli:unit":
+            self.unit = [dict(attrs).get("id"), [], [], "numerator"]
+        elif self.unit is not None:
+            if tag == "xbrli:unitdenominator":
+                self.unit[3] = "denominator"
+            elif tag == "xbrli:unitnumerator":
+                self.unit[3] = "numerator"
+            elif tag == "xbrli:measure":
+                self.capture = []
+
+    def handle_endtag(self, tag):
+        if self.fact is not None:
+            if tag == "ix:nonfraction":
+                if self.fact[3]:
+                    self.fact[3] -= 1
+                else:
+                    concept, parts, attributes, _ = self.fact
+                    self.raw_facts.append((concept, "".join(parts), attributes))
+                    self.fact = None
+            return
+        if self.context is not None:
+            if tag in ("xbrli:startdate", "xbrli:enddate", "xbrli:instant") and self.capture is not None:
+                value = "".join(self.capture).strip()
+                self.capture = None
+                if tag == "xbrli:startdate":
+                    self.context[1] = value
+                else:
+                    self.context[2] = value
+            elif tag == "xbrli:context":
+                context_id, start, end, dimensional = self.context
+                if context_id:
+                    self.contexts[context_id] = XbrlContext(start, end, dimensional)
+                self.context = None
+        elif self.unit is not None:
+            if tag == "xbrli:measure" and self.capture is not None:
+                measure = "".join(self.capture).strip()
+                self.capture = None
+                self.unit[1 if self.unit[3] == "numerator" else 2].append(measure)
+            elif tag == "xbrli:unit":
+                unit_id, numerator, denominator, _ = self.unit
+                if unit_id:
+                    self.units[unit_id] = "*".join(numerator) + ("/" + "*".join(denominator) if denominator else "")
+                self.unit = None
+
+    def handle_data(self, data):
+        if self.fact is not None:
+            self.fact[1].append(data)
+        elif self.capture is not None:
+            self.capture.append(data)
+
+
+def index_facts(content) -> XbrlFacts:
+    """Index des faits iXBRL numériques du document (HTML en bytes ou str)"""
+    html = decode_html(content)
+    # Document sans fait numérique (communiqué HTML simple): pas de passe
+    if not NON_FRACTION_TAG.search(html):
+        return XbrlFacts([], {}, {})
+
+    parser = _FactParser()
+    for start in range(0, len(html), FEED_CHUNK_SIZE):
+        parser.feed(html[start:start + FEED_CHUNK_SIZE])
+    parser.close()
+
+    facts = []
+    for concept, text, attributes in parser.raw_facts:
+        if not concept:
+            continue
+        value = parse_fact_value(text, attributes.get("scale"), attributes.get("sign"), attributes.get("format"))
+        if value is None:
+            continue
+        context_ref = attributes.get("contextref") or ""
+        facts.append(XbrlFact(concept, value, context_ref, attributes.get("unitref") or "",
+                              attributes.get("decimals"), parser.contexts.get(context_ref)))
+    return XbrlFacts(facts, parser.contexts, parser.units)
+
+
+def document_period_end(content) -> Optional[str]:
+    """dei:DocumentPeriodEndDate du document (ISO), ou None (absent ou format inconnu)"""
+    match = DOCUMENT_PERIOD_END_TAG.search(decode_html(content))
+    if not match:
+        return None
+    text = " ".join(re.sub(r"<[^>]+>", " ", match.group(1)).split())
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None